@@ -48,6 +48,7 @@ class ComprehensiveSystemTest:
             ("Exchange Integration Test", self.test_exchange_integration),
             ("Session Management Test", self.test_session_management),
             ("Data Processing Test", self.test_data_processing),
+            ("Feature Store Test", self.test_feature_store),
             ("API Endpoints Test", self.test_api_endpoints),
             ("Database Integrity Test", self.test_database_integrity),
             ("Performance Test", self.test_performance),
@@ -283,6 +284,34 @@ class ComprehensiveSystemTest:
             self.logger.error(f"❌ Data Processing Test Failed: {e}")
             return False
     
+    async def test_feature_store(self) -> bool:
+        """Test that cached features match a direct feature build"""
+        try:
+            import tempfile
+            import pandas as pd
+            from features.build_features import FeatureEngineer
+            from features.feature_store import FeatureStore
+            
+            # Stock data carries non-OHLCV columns (dividends, stock splits)
+            df = pd.read_parquet('data/live_data_AAPL.parquet')
+            expected = FeatureEngineer().build_all_features(df)
+            
+            with tempfile.TemporaryDirectory() as store_root:
+                store = FeatureStore(root=store_root)
+                cold = store.get_features(df)
+                warm = store.get_features(df)
+            
+            columns_match = (list(cold.columns) == list(expected.columns)
+                             and list(warm.columns) == list(expected.columns))
+            values_match = cold.equals(expected) and warm.equals(expected)
+            
+            self.logger.info(f"✅ Feature Store: Columns match={columns_match}, Values match={values_match}")
+            return columns_match and values_match
+            
+        except Exception as e:
+            self.logger.error(f"❌ Feature Store Test Failed: {e}")
+            return False
+    
     async def test_api_endpoints(self) -> bool:
         """Test API endpoints availability and responses"""
         try:
@@ -1,11 +1,18 @@
 import pandas as pd
 import numpy as np
-import joblib
 from datetime import datetime, timedelta
 import json
 import logging
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
+import os
+import sys
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from features.build_features import FeatureEngineer
+from services.model_registry import model_registry
 
 class TradingAgent:
     """AI Trading Agent that makes trading decisions"""
@@ -24,6 +31,7 @@ class TradingAgent:
         self.max_risk_per_trade = self.config.get("max_risk_per_trade", 0.02)
         self.max_total_risk = self.config.get("max_total_risk", 0.1)
         self.confidence_threshold = self.config.get("confidence_threshold", 0.6)
+        self.feature_engineer = FeatureEngineer()
         
         # Setup logging first
         self._setup_logging()
@@ -32,16 +40,23 @@ class TradingAgent:
         self._load_model()
     
     def _load_model(self):
-        """Load the trained ML model"""
+        """Load the trained ML model
+        
+        Goes through the shared model registry: a cache hit while the file
+        is unchanged, a fresh load once it is retrained.
+        """
         try:
-            self.model_data = joblib.load(self.model_path)
+            model_data = model_registry.load(self.model_path)
+        except Exception as e:
+            self.logger.error(f"Failed to load model: {e}")
+            raise
+        
+        if model_data is not self.model_data:
+            self.model_data = model_data
             self.model = self.model_data['model']
             self.scaler = self.model_data['scaler']
             self.feature_names = self.model_data['feature_names']
             self.logger.info(f"Model loaded successfully from {self.model_path}")
-        except Exception as e:
-            self.logger.error(f"Failed to load model: {e}")
-            raise
     
     def _setup_logging(self):
         """Setup logging for the agent"""
@@ -59,10 +74,22 @@ class TradingAgent:
         self.logger = logging.getLogger(f"TradingAgent_{self.agent_id}")
     
     def analyze_market(self, features_df: pd.DataFrame) -> pd.DataFrame:
-        """Analyze market conditions and generate trading signals"""
+        """Analyze market conditions and generate trading signals.
+
+        features_df may be raw OHLCV bars: any model feature it lacks is
+        computed on the fly, evaluating only what the model uses.
+        """
         
         self.logger.info(f"Analyzing market with {len(features_df)} data points")
         
+        # Swap in a retrained model; keep the current one if it can't be read
+        try:
+            self._load_model()
+        except Exception:
+            pass
+        
+        features_df = self._add_model_features(features_df)
+        
         # Prepare features for prediction
         X = self._prepare_features(features_df)
         
@@ -83,6 +110,16 @@ class TradingAgent:
         
         return filtered_signals
     
+    def _add_model_features(self, features_df: pd.DataFrame) -> pd.DataFrame:
+        """Compute the model features missing from features_df from its raw bars"""
+        
+        missing = [col for col in self.feature_names
+                   if col not in features_df.columns and col in self.feature_engineer.registry]
+        if not missing:
+            return features_df
+        
+        return self.feature_engineer.build_features(features_df, missing)
+    
     def _prepare_features(self, features_df: pd.DataFrame) -> pd.DataFrame:
         """Prepare features for model prediction"""
         
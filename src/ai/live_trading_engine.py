@@ -26,8 +26,8 @@ from services.instrument_manager import InstrumentManager
 
 # Optional ML imports
 try:
-    import joblib
     from sklearn.ensemble import RandomForestClassifier
+    from services.model_registry import model_registry
     ML_AVAILABLE = True
 except ImportError:
     ML_AVAILABLE = False
@@ -35,12 +35,19 @@ except ImportError:
 class LiveTradingEngine:
     """AI Trading Engine that generates real signals and places live orders"""
     
+    MODEL_FILES = [
+        'models/trading_model.joblib',
+        'models/lightgbm_model.joblib', 
+        'models/random_forest_model.joblib'
+    ]
+    
     def __init__(self):
         self.exchange_connector = EnhancedExchangeConnector()
         self.instrument_manager = InstrumentManager()
         self.active_users = {}  # user_id -> trading_state
         self.models = {}  # strategy -> model
         self.running = False
+        self.inference_latency_ms = None  # last generate_ai_signals cycle
         
         # Setup logging
         logging.basicConfig(
@@ -56,36 +63,59 @@ class LiveTradingEngine:
         self.load_models()
         
     def load_models(self):
-        """Load trained AI models"""
-        model_files = [
-            'models/trading_model.joblib',
-            'models/lightgbm_model.joblib', 
-            'models/random_forest_model.joblib'
-        ]
+        """Load trained AI models
+        
+        Model files and registered models come through the shared model
+        registry, which keeps them cached and reloads a file or registered
+        model once a new version is written. The trading loop calls this
+        every cycle, so retrained models are swapped in without a restart.
+        """
+        first_load = not self.models
+        if not ML_AVAILABLE:
+            if first_load:
+                self.logger.warning("⚠️  ML libraries not available, no models loaded")
+            return
+            
+        models = {}
         
-        for model_file in model_files:
+        for model_file in self.MODEL_FILES:
             if os.path.exists(model_file):
                 try:
-                    model = joblib.load(model_file)
                     strategy_name = os.path.basename(model_file).replace('.joblib', '')
-                    self.models[strategy_name] = model
-                    self.logger.info(f"✅ Loaded model: {strategy_name}")
+                    models[strategy_name] = model_registry.load(model_file)
                 except Exception as e:
                     self.logger.error(f"❌ Failed to load {model_file}: {e}")
-            else:
+            elif first_load:
                 self.logger.warning(f"⚠️  Model file not found: {model_file}")
                 
+        for model_name in model_registry.names():
+            try:
+                artifact = model_registry.get(model_name)
+                # TradingModelTrainer registers a dict around the estimator
+                models[model_name] = artifact['model'] if isinstance(artifact, dict) else artifact
+            except Exception as e:
+                self.logger.error(f"❌ Failed to load registered model {model_name}: {e}")
+                
         # Create simple backup model if no models loaded
-        if not self.models and ML_AVAILABLE:
+        if not models and 'backup' in self.models:
+            models['backup'] = self.models['backup']
+        elif not models:
             self.logger.info("🔧 Creating backup AI model...")
             backup_model = RandomForestClassifier(n_estimators=50, random_state=42)
             # Train on simple synthetic data
             X = np.random.randn(100, 6)  # 6 features
             y = np.random.choice([0, 1], 100)  # Binary signals
             backup_model.fit(X, y)
-            self.models['backup'] = backup_model
+            models['backup'] = backup_model
             self.logger.info("✅ Backup AI model created")
             
+        for model_name, model in models.items():
+            if self.models.get(model_name) is not model:
+                self.logger.info(f"✅ Loaded model: {model_name}")
+                
+        # One assignment, so a cycle never sees a mix of old and new models
+        self.models = models
+            
     def start_trading_for_user(self, user_id: str) -> Dict[str, Any]:
         """Start AI trading for a specific user"""
         try:
@@ -226,54 +256,77 @@ class LiveTradingEngine:
         return features
         
     def generate_ai_signals(self, features: Dict[str, np.ndarray]) -> Dict[str, Dict]:
-        """Generate AI trading signals"""
+        """Generate AI trading signals
+        
+        All symbols' feature vectors are stacked into one matrix so each model
+        runs a single predict_proba per cycle; the ensemble mean and spread
+        are taken across models for every symbol at once. Symbols whose vector
+        length differs from the majority are skipped, not the whole cycle.
+        """
         signals = {}
+        if not features:
+            return signals
+            
+        started = time.perf_counter()
+        vectors = {symbol: np.ravel(vector) for symbol, vector in features.items()}
+        lengths = [len(vector) for vector in vectors.values()]
+        n_features = max(lengths, key=lengths.count)
         
-        for symbol, feature_vector in features.items():
+        symbols = []
+        for symbol, vector in vectors.items():
+            if len(vector) == n_features:
+                symbols.append(symbol)
+            else:
+                self.logger.error(f"❌ Skipping {symbol}: {len(vector)} features, expected {n_features}")
+        feature_matrix = np.vstack([vectors[symbol] for symbol in symbols])
+            
+        # Use available models to generate signals (one row per model)
+        model_predictions = []
+        
+        for model_name, model in self.models.items():
             try:
-                # Use available models to generate signals
-                model_predictions = []
-                
-                for model_name, model in self.models.items():
-                    try:
-                        if hasattr(model, 'predict_proba'):
-                            prob = model.predict_proba([feature_vector])[0]
-                            prediction = prob[1] if len(prob) > 1 else prob[0]
-                        else:
-                            prediction = model.predict([feature_vector])[0]
-                            
-                        model_predictions.append(prediction)
-                        
-                    except Exception as e:
-                        self.logger.error(f"❌ Model {model_name} prediction failed: {e}")
-                        
-                if model_predictions:
-                    # Ensemble prediction
-                    avg_prediction = np.mean(model_predictions)
-                    confidence = 1.0 - np.std(model_predictions)  # Higher confidence if models agree
-                    
-                    # Generate signal based on prediction
-                    if avg_prediction > 0.6 and confidence > 0.5:
-                        signal_type = 'BUY'
-                        strength = min(avg_prediction * confidence, 1.0)
-                    elif avg_prediction < 0.4 and confidence > 0.5:
-                        signal_type = 'SELL'
-                        strength = min((1 - avg_prediction) * confidence, 1.0)
-                    else:
-                        signal_type = 'HOLD'
-                        strength = 0.0
-                        
-                    signals[symbol] = {
-                        'signal': signal_type,
-                        'strength': strength,
-                        'confidence': confidence,
-                        'prediction': avg_prediction,
-                        'timestamp': datetime.now().isoformat(),
-                        'models_used': list(self.models.keys())
-                    }
+                if hasattr(model, 'predict_proba'):
+                    prob = model.predict_proba(feature_matrix)
+                    prediction = prob[:, 1] if prob.shape[1] > 1 else prob[:, 0]
+                else:
+                    prediction = model.predict(feature_matrix)
                     
+                model_predictions.append(np.asarray(prediction, dtype=float))
+                
             except Exception as e:
-                self.logger.error(f"❌ Failed to generate signal for {symbol}: {e}")
+                self.logger.error(f"❌ Model {model_name} prediction failed: {e}")
+                
+        if model_predictions:
+            # Ensemble prediction
+            model_predictions = np.vstack(model_predictions)
+            avg_prediction = model_predictions.mean(axis=0)
+            confidence = 1.0 - model_predictions.std(axis=0)  # Higher confidence if models agree
+            
+            # Generate signal based on prediction
+            buy = (avg_prediction > 0.6) & (confidence > 0.5)
+            sell = (avg_prediction < 0.4) & (confidence > 0.5)
+            signal_type = np.select([buy, sell], ['BUY', 'SELL'], 'HOLD')
+            strength = np.select(
+                [buy, sell],
+                [np.minimum(avg_prediction * confidence, 1.0), np.minimum((1 - avg_prediction) * confidence, 1.0)],
+                0.0
+            )
+            
+            timestamp = datetime.now().isoformat()
+            models_used = list(self.models.keys())
+            for i, symbol in enumerate(symbols):
+                signals[symbol] = {
+                    'signal': str(signal_type[i]),
+                    'strength': float(strength[i]),
+                    'confidence': float(confidence[i]),
+                    'prediction': float(avg_prediction[i]),
+                    'timestamp': timestamp,
+                    'models_used': models_used
+                }
+                
+        self.inference_latency_ms = (time.perf_counter() - started) * 1000
+        self.logger.info(f"⏱️  Inference for {len(symbols)} symbols x {len(model_predictions)} models "
+                         f"took {self.inference_latency_ms:.1f} ms")
                 
         return signals
         
@@ -375,6 +428,9 @@ class LiveTradingEngine:
                 # Calculate features
                 features = self.calculate_features(market_data)
                 
+                # Pick up retrained models (cache hits when nothing changed)
+                self.load_models()
+                
                 # Generate AI signals
                 signals = self.generate_ai_signals(features)
                 self.logger.info(f"🤖 Generated {len(signals)} signals")
@@ -431,6 +487,8 @@ class LiveTradingEngine:
                     'timestamp': datetime.now().isoformat(),
                     'active_users': len(self.active_users),
                     'total_models': len(self.models),
+                    'inference_latency_ms': self.inference_latency_ms,
+                    'model_cache': model_registry.stats() if ML_AVAILABLE else None,
                     'users': serializable_state
                 }, f, indent=2)
                 
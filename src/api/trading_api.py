@@ -24,6 +24,7 @@ from agents.trading_agent import TradingAgent
 from execution.order_gateway import OrderGateway, place_market_order, place_limit_order
 from data.sample_generator import SyntheticDataGenerator
 from ingestion.load_sample import DataLoader
+from backtest.trade_log import read_trade_log, trade_log_path
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -483,10 +484,42 @@ async def get_backtest_results():
         
         return results
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error reading backtest results: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/performance/backtest/trades")
+async def get_backtest_trades(strategy: Optional[str] = None, instrument: Optional[str] = None,
+                              start: Optional[str] = None, end: Optional[str] = None,
+                              offset: int = 0, limit: int = 100):
+    """Get one page of the latest backtest's trade log, filtered by strategy,
+    instrument and entry time"""
+    try:
+        log_path = trade_log_path("reports/backtest_results.json")
+        if not os.path.isdir(log_path):
+            raise HTTPException(status_code=404, detail="No backtest trade log found")
+        
+        offset = max(0, offset)
+        limit = max(0, min(limit, 1000))
+        page, total = read_trade_log(log_path, strategy=strategy, instrument=instrument,
+                                     start=start, end=end, offset=offset, limit=limit)
+        return {
+            "trades": json.loads(page.to_json(orient="records", date_format="iso")),
+            "count": len(page),
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error reading backtest trades: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ====================
 # CONFIGURATION ENDPOINTS
 # ====================
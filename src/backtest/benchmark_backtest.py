@@ -0,0 +1,216 @@
+import pandas as pd
+import argparse
+import sys
+import os
+import time
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backtest.vector_backtest import VectorBacktester, BAR_COLUMNS
+
+
+class LoopVectorBacktester(VectorBacktester):
+    """Reference per-label implementation the array engine must reproduce"""
+
+    def run_trades(self, raw_data, labels):
+        trade_results = []
+        for _, label in labels.iterrows():
+            result = self._simulate_single_trade(raw_data, label)
+            if result:
+                trade_results.append(result)
+        return trade_results
+    
+    def _simulate_single_trade(self, raw_data, label):
+        """Simulate a single trade"""
+        
+        instrument = label["instrument"]
+        entry_time = label["ts"]
+        side = label["side"]
+        entry_price = label["entry"]
+        stop_loss = label["stop_loss"]
+        take_profit = label["take_profit"]
+        horizon_minutes = label.get("horizon_minutes", 60)
+        
+        # Get instrument data
+        inst_data = raw_data[raw_data["instrument"] == instrument].copy()
+        inst_data = inst_data.sort_values("ts").reset_index(drop=True)
+        
+        # Find entry point
+        entry_idx = inst_data[inst_data["ts"] >= entry_time].index
+        if len(entry_idx) == 0:
+            return None
+        
+        entry_idx = entry_idx[0]
+        
+        # Calculate actual entry price with slippage
+        actual_entry = entry_price * (1 + self.slippage if side == 1 else 1 - self.slippage)
+        
+        # Determine exit point
+        max_idx = min(len(inst_data) - 1, entry_idx + horizon_minutes // 5)  # Assuming 5min bars
+        
+        exit_result = self._find_exit_point(inst_data, entry_idx, max_idx, 
+                                          side, stop_loss, take_profit)
+        
+        if not exit_result:
+            return None
+        
+        exit_idx, exit_price, exit_reason = exit_result
+        
+        # Calculate trade results
+        trade_result = self._calculate_trade_pnl(
+            side, actual_entry, exit_price, 
+            inst_data.iloc[entry_idx]["ts"], 
+            inst_data.iloc[exit_idx]["ts"],
+            exit_reason, label
+        )
+        
+        return trade_result
+    
+    def _find_exit_point(self, data, entry_idx, max_idx, side, stop_loss, take_profit):
+        """Find where the trade exits (SL, TP, or timeout)"""
+        
+        for i in range(entry_idx + 1, max_idx + 1):
+            if i >= len(data):
+                break
+                
+            candle = data.iloc[i]
+            high, low = candle["high"], candle["low"]
+            
+            if side == 1:  # Long position
+                if low <= stop_loss:
+                    return i, stop_loss, "STOP_LOSS"
+                elif high >= take_profit:
+                    return i, take_profit, "TAKE_PROFIT"
+            else:  # Short position
+                if high >= stop_loss:
+                    return i, stop_loss, "STOP_LOSS"
+                elif low <= take_profit:
+                    return i, take_profit, "TAKE_PROFIT"
+        
+        # If no SL/TP hit, exit at market close
+        if max_idx < len(data):
+            return max_idx, data.iloc[max_idx]["close"], "TIMEOUT"
+        
+        return None
+    
+    def _calculate_trade_pnl(self, side, entry_price, exit_price, entry_time, exit_time, exit_reason, label):
+        """Calculate PnL and other trade metrics"""
+        
+        # Calculate returns
+        if side == 1:  # Long
+            gross_return = (exit_price - entry_price) / entry_price
+        else:  # Short
+            gross_return = (entry_price - exit_price) / entry_price
+        
+        # Account for costs
+        total_commission = 2 * self.commission  # Entry + exit
+        net_return = gross_return - total_commission
+        
+        # Position size (assuming equal dollar amounts)
+        position_size = self.initial_capital * 0.02  # 2% of capital per trade
+        pnl_dollars = position_size * net_return
+        
+        # Trade duration
+        duration = (pd.to_datetime(exit_time) - pd.to_datetime(entry_time)).total_seconds() / 60
+        
+        # Create trade record
+        trade_record = {
+            "instrument": label["instrument"],
+            "strategy": label.get("strategy", "UNKNOWN"),
+            "entry_time": entry_time,
+            "exit_time": exit_time,
+            "duration_minutes": duration,
+            "side": side,
+            "entry_price": entry_price,
+            "exit_price": exit_price,
+            "exit_reason": exit_reason,
+            "gross_return_pct": gross_return * 100,
+            "net_return_pct": net_return * 100,
+            "pnl_dollars": pnl_dollars,
+            "position_size": position_size,
+            "commission_cost": position_size * total_commission,
+            "is_winner": net_return > 0,
+            "risk_reward_actual": abs(gross_return) / abs((label["entry"] - label["stop_loss"]) / label["entry"]) if label["entry"] != label["stop_loss"] else 0,
+            "confidence": label.get("confidence", 0.5)
+        }
+        
+        return trade_record
+
+
+def run_benchmark(raw_data, labels, repeats=1, scale=1):
+    """Time loop vs array trade simulation and check the trade records agree exactly.
+
+    With scale > 1 the array engine is also timed on the labels tiled scale
+    times, which the loop engine would take far too long to get through.
+    """
+    raw_data = raw_data.sort_values(["instrument", "ts"])
+    labels = labels.sort_values("ts")
+
+    start = time.perf_counter()
+    expected = LoopVectorBacktester().run_trades(raw_data, labels)
+    loop_time = time.perf_counter() - start
+
+    backtester = VectorBacktester()
+    vector_time = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        actual = backtester.run_trades(raw_data, labels)
+        vector_time = min(vector_time, time.perf_counter() - start)
+
+    try:
+        pd.testing.assert_frame_equal(pd.DataFrame(actual), pd.DataFrame(expected), check_exact=True)
+        identical = True
+    except AssertionError as e:
+        print(f"trade records differ\n{e}")
+        identical = False
+
+    result = {
+        "labels": len(labels),
+        "trades": len(actual),
+        "loop_seconds": loop_time,
+        "vectorized_seconds": vector_time,
+        "speedup": loop_time / vector_time if vector_time > 0 else float("inf"),
+        "identical": identical,
+    }
+
+    if scale > 1:
+        tiled = pd.concat([labels] * scale, ignore_index=True)
+        start = time.perf_counter()
+        backtester.run_trades(raw_data, tiled)
+        result["scaled_labels"] = len(tiled)
+        result["scaled_seconds"] = time.perf_counter() - start
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the array backtest engine against the per-label loop")
+    parser.add_argument("--raw", default="data/sample_5m.parquet",
+                       help="Path to raw OHLCV data")
+    parser.add_argument("--labels", default="data/labels.parquet",
+                       help="Path to trading labels")
+    parser.add_argument("--repeats", type=int, default=3,
+                       help="Repetitions for the vectorized timing (best is reported)")
+    parser.add_argument("--scale", type=int, default=1,
+                       help="Also time the array engine on the labels tiled this many times")
+    args = parser.parse_args()
+
+    raw_data = pd.read_parquet(args.raw, columns=BAR_COLUMNS)
+    labels = pd.read_parquet(args.labels)
+    r = run_benchmark(raw_data, labels, args.repeats, args.scale)
+
+    print(f"{'labels':>8}{'trades':>8}{'loop (s)':>10}{'vector (s)':>12}{'speedup':>10}  identical")
+    print(f"{r['labels']:>8}{r['trades']:>8}{r['loop_seconds']:>10.3f}"
+          f"{r['vectorized_seconds']:>12.4f}{r['speedup']:>9.1f}x  {r['identical']}")
+    if "scaled_labels" in r:
+        print(f"\nArray engine on {r['scaled_labels']} labels: {r['scaled_seconds']:.2f}s")
+
+    if not r["identical"]:
+        sys.exit(1)
+
+    print("\nArray engine matches the per-label loop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+import pandas as pd
+import numpy as np
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import sys
+import tempfile
+import time
+import yaml
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backtest.vector_backtest import VectorBacktester, BAR_COLUMNS, FILL_COLUMNS, load_global_settings
+from data.parquet_io import read_parquet
+from data.arrow_ipc import PYARROW_AVAILABLE, IPC_TMP_ROOT, read_ipc, write_ipc
+from features.build_features import FeatureEngineer
+from labeling.label_pipeline import LabelingPipeline
+from labeling.ob_tap_labeler import OrderBlockTapStrategy
+from labeling.vwap_revert_labeler import VWAPReversionStrategy
+from strategies.ma_crossover import MACrossoverStrategy
+from strategies.rsi_divergence_strategy import RSIDivergenceStrategy
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+# Optional Bayesian search
+try:
+    import optuna
+    OPTUNA_AVAILABLE = True
+except ImportError:
+    OPTUNA_AVAILABLE = False
+
+# Strategies that can be optimized, by their strategies.yaml name
+STRATEGIES = {
+    "ob_tap": OrderBlockTapStrategy,
+    "vwap_revert": VWAPReversionStrategy,
+    "ma_crossover": MACrossoverStrategy,
+    "rsi_divergence": RSIDivergenceStrategy,
+}
+
+SEARCH_METHODS = ("grid", "random", "bayes")
+
+# Rows buffered per strategy before they are appended to its results table
+FLUSH_ROWS = 256
+
+# Metric columns every results table carries, NaN when a run had no trades
+METRIC_COLUMNS = [
+    "total_trades", "win_rate", "total_pnl_dollars", "avg_return_pct", "sharpe_ratio",
+    "max_drawdown_pct", "profit_factor", "total_return_pct",
+    "portfolio_taken_trades", "portfolio_final_equity", "portfolio_total_return_pct",
+    "portfolio_max_drawdown_pct", "portfolio_bar_sharpe_ratio", "portfolio_win_rate",
+]
+
+# Evaluation columns besides the metrics; error is set on runs that raised
+RUN_COLUMNS = ["labels", "seconds", "error"]
+
+# Per-process state set up by _init_worker
+_WORKER = {}
+
+
+def load_search_spaces(path, strategies=None):
+    """Search space of each strategy in the optimizer config"""
+    with open(path, 'r') as f:
+        spaces = yaml.safe_load(f) or {}
+
+    for name, space in spaces.items():
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {name!r} in {path}, expected one of {list(STRATEGIES)}")
+        if space.get("method", "grid") not in SEARCH_METHODS:
+            raise ValueError(f"Unknown search method {space['method']!r} for {name}, expected one of {SEARCH_METHODS}")
+
+    if strategies:
+        spaces = {name: space for name, space in spaces.items() if name in strategies}
+    return spaces
+
+
+def grid_configs(params):
+    """Every combination of the listed values"""
+    ranges = [name for name, values in params.items() if not isinstance(values, list)]
+    if ranges:
+        raise ValueError(f"Grid search needs value lists, got ranges for {ranges}")
+    names = list(params)
+    return [dict(zip(names, values)) for values in itertools.product(*params.values())]
+
+
+def random_configs(params, samples, rng):
+    """`samples` independent draws from the search space"""
+    return [{name: _sample(spec, rng) for name, spec in params.items()} for _ in range(samples)]
+
+
+def _sample(spec, rng):
+    if isinstance(spec, list):
+        return spec[rng.integers(len(spec))]
+    if spec.get("int"):
+        return int(rng.integers(spec["low"], spec["high"] + 1))
+    if spec.get("log"):
+        return float(np.exp(rng.uniform(np.log(spec["low"]), np.log(spec["high"]))))
+    return float(rng.uniform(spec["low"], spec["high"]))
+
+
+def _suggest(trial, name, spec):
+    if isinstance(spec, list):
+        return trial.suggest_categorical(name, spec)
+    if spec.get("int"):
+        return trial.suggest_int(name, spec["low"], spec["high"], log=spec.get("log", False))
+    return trial.suggest_float(name, spec["low"], spec["high"], log=spec.get("log", False))
+
+
+def _param_dtype(spec):
+    """Results-table dtype of a parameter, fixed up front so streamed batches share a schema"""
+    values = spec if isinstance(spec, list) else [spec["low"], spec["high"]]
+    if isinstance(spec, dict) and not spec.get("int"):
+        return "float64"
+    if all(isinstance(v, (bool, np.bool_)) for v in values):
+        return "bool"
+    if all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in values):
+        return "int64"
+    if all(isinstance(v, (int, float, np.number)) for v in values):
+        return "float64"
+    return "object"
+
+
+def walk_forward_segments(ts, folds):
+    """(fold, segment, start, end) time ranges to evaluate every configuration on.
+
+    With no folds the whole history is one "full" segment. Otherwise it is
+    cut into folds + 1 chunks of equal duration; fold i trains on chunk i and
+    is tested on chunk i + 1.
+    """
+    first, last = ts.min(), ts.max()
+    if not folds:
+        return [(0, "full", first, last + pd.Timedelta(1, "ns"))]
+
+    edges = pd.date_range(first, last, periods=folds + 2)
+    edges = list(edges[:-1]) + [last + pd.Timedelta(1, "ns")]
+    segments = []
+    for fold in range(folds):
+        segments.append((fold, "train", edges[fold], edges[fold + 1]))
+        segments.append((fold, "test", edges[fold + 1], edges[fold + 2]))
+    return segments
+
+
+def _init_worker(frame_path, backtest_config):
+    """Process-pool initializer: map the shared frame once per worker"""
+    df = read_ipc(frame_path).to_pandas()
+    starts, ends = FeatureEngineer.instrument_offsets(df)
+
+    _WORKER["frame"] = df
+    _WORKER["ts"] = df["ts"].to_numpy()
+    _WORKER["ranges"] = list(zip(starts, ends))
+    _WORKER["backtester"] = VectorBacktester(**backtest_config)
+    with contextlib.redirect_stdout(io.StringIO()):
+        _WORKER["pipeline"] = LabelingPipeline()
+
+
+def _evaluate(strategy_name, params, start, end):
+    """Label rows in [start, end) with one configuration and backtest the labels.
+
+    Each instrument is labeled on its own, fed required_lookback() bars
+    before start; trades may exit on bars after end. Errors propagate to
+    the caller, so a crashed configuration is not recorded as a no-trade run.
+    """
+    begin = time.perf_counter()
+    df, ts = _WORKER["frame"], _WORKER["ts"]
+    pipeline, backtester = _WORKER["pipeline"], _WORKER["backtester"]
+
+    strategy = STRATEGIES[strategy_name]()
+    strategy.params = {**strategy.params, **params}
+    lookback = strategy.required_lookback()
+
+    signals, bar_slices = [], []
+    for first, last in _WORKER["ranges"]:
+        lo = first + np.searchsorted(ts[first:last], np.datetime64(start), side="left")
+        hi = first + np.searchsorted(ts[first:last], np.datetime64(end), side="left")
+        if hi <= lo:
+            continue
+        instrument_signals = pipeline.strategy_manager.run_strategy(strategy, df.iloc[max(first, lo - lookback):hi])
+        if instrument_signals is not None and not instrument_signals.empty:
+            signals.append(instrument_signals[instrument_signals["ts"] >= start])
+        bar_slices.append(df.iloc[lo:last][BAR_COLUMNS])
+
+    row = {"labels": 0}
+    signals = [frame for frame in signals if not frame.empty]
+    if signals:
+        combined = pipeline.strategy_manager.validator.filter_signals_by_quality(pd.concat(signals, ignore_index=True))
+        labels = pipeline.convert_to_labels(combined.sort_values("ts", kind="stable").reset_index(drop=True))
+        bars = pd.concat(bar_slices, ignore_index=True)
+        trades = backtester.trade_frame(bars, labels)
+
+        row["labels"] = len(labels)
+        summary = backtester.calculate_portfolio_metrics(trades.drop(columns=FILL_COLUMNS))
+        row.update(_metric_columns(summary))
+        if len(trades):
+            _, portfolio = backtester.simulate_portfolio(bars, trades)
+            row.update(_metric_columns(portfolio, prefix="portfolio_"))
+
+    row["seconds"] = time.perf_counter() - begin
+    return row
+
+
+def _metric_columns(summary, prefix=""):
+    """Scalar metrics of a backtest summary as float columns"""
+    columns = {}
+    for key, value in summary.items():
+        if key == "profit_factor" and value == "∞":
+            value = float("inf")
+        if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+            columns[prefix + key] = float(value)
+    return columns
+
+
+class ResultsTable:
+    """Per-strategy parquet results tables, appended to in row batches"""
+
+    def __init__(self, out_dir, param_dtypes):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.param_dtypes = param_dtypes
+        self.buffers = {name: [] for name in param_dtypes}
+        self.writers = {}
+        self.schemas = {}
+
+    def path(self, strategy_name):
+        return self.out_dir / f"{strategy_name}_results.parquet"
+
+    def append(self, strategy_name, row):
+        self.buffers[strategy_name].append(row)
+        if len(self.buffers[strategy_name]) >= FLUSH_ROWS:
+            self.flush(strategy_name)
+
+    def flush(self, strategy_name):
+        rows = self.buffers[strategy_name]
+        if not rows:
+            return
+        self.buffers[strategy_name] = []
+
+        batch = pd.DataFrame(rows)
+        for name, dtype in self.param_dtypes[strategy_name].items():
+            batch[f"param_{name}"] = batch[f"param_{name}"].astype(dtype)
+        # Columns a strategy never produced in this batch still get one;
+        # failed runs leave labels null and successful ones leave error null
+        for column in RUN_COLUMNS + METRIC_COLUMNS:
+            if column not in batch.columns:
+                batch[column] = np.nan
+        batch["labels"] = batch["labels"].astype("Int64")
+        batch["error"] = batch["error"].astype("string")
+
+        if strategy_name not in self.writers:
+            table = pa.Table.from_pandas(batch, preserve_index=False)
+            self.schemas[strategy_name] = table.schema
+            self.writers[strategy_name] = pq.ParquetWriter(self.path(strategy_name), table.schema)
+        else:
+            schema = self.schemas[strategy_name]
+            batch = batch.reindex(columns=schema.names)
+            table = pa.Table.from_pandas(batch, schema=schema, preserve_index=False)
+        self.writers[strategy_name].write_table(table)
+
+    def close(self):
+        for strategy_name in self.buffers:
+            self.flush(strategy_name)
+        for writer in self.writers.values():
+            writer.close()
+
+
+class StrategyOptimizer:
+    """Parameter sweeps and walk-forward evaluation of strategies on a process pool"""
+
+    def __init__(self, spaces, workers=1, folds=0, objective="portfolio_total_return_pct",
+                 seed=42, backtest_config=None):
+        """
+        spaces: search space per strategy, as read by load_search_spaces.
+        folds: walk-forward folds; 0 evaluates every configuration on the full history.
+        objective: results column to maximize when picking the best configuration.
+        backtest_config: VectorBacktester keyword arguments.
+        """
+        self.spaces = spaces
+        self.workers = max(1, int(workers))
+        self.folds = folds
+        self.objective = objective
+        self.rng = np.random.default_rng(seed)
+        self.backtest_config = backtest_config or {}
+
+    def run(self, features_path, out_dir="reports/optimizer", instruments=None, start=None, end=None):
+        """Run every search and stream results to <out_dir>/<strategy>_results.parquet"""
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required to share the feature frame and stream results")
+
+        df = read_parquet(features_path, instruments=instruments, start=start, end=end)
+        df = df.sort_values(["instrument", "ts"], kind="stable").reset_index(drop=True)
+        segments = walk_forward_segments(df["ts"], self.folds)
+        print(f"Optimizing {list(self.spaces)} on {len(df)} rows, {len(segments)} segments per configuration")
+
+        results = ResultsTable(out_dir, {
+            name: {param: _param_dtype(spec) for param, spec in space["params"].items()}
+            for name, space in self.spaces.items()
+        })
+
+        # Workers memory-map one RAM-backed copy of the frame instead of each
+        # receiving a pickled one
+        with tempfile.TemporaryDirectory(dir=IPC_TMP_ROOT) as tmp_dir:
+            frame_path = os.path.join(tmp_dir, "features.arrow")
+            write_ipc(pa.Table.from_pandas(df, preserve_index=False), frame_path)
+            del df
+
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(frame_path, self.backtest_config)) as pool:
+                try:
+                    for name, space in self.spaces.items():
+                        self._search(pool, name, space, segments, results)
+                finally:
+                    results.close()
+
+        return {name: results.path(name) for name in self.spaces}
+
+    def _search(self, pool, name, space, segments, results):
+        method = space.get("method", "grid")
+        samples = space.get("samples", 20)
+        params = space["params"]
+        started = time.perf_counter()
+
+        if method == "bayes" and not OPTUNA_AVAILABLE:
+            print(f"optuna not installed, using random search for {name}")
+            method = "random"
+
+        if method == "bayes":
+            study = optuna.create_study(direction="maximize",
+                                        sampler=optuna.samplers.TPESampler(seed=int(self.rng.integers(2**31))))
+            config_id = 0
+            while config_id < samples:
+                trials = [study.ask() for _ in range(min(self.workers, samples - config_id))]
+                configs = [{param: _suggest(trial, param, spec) for param, spec in params.items()} for trial in trials]
+                scores = self._evaluate_configs(pool, name, configs, segments, results, config_id)
+                for trial, score in zip(trials, scores):
+                    if np.isfinite(score):
+                        study.tell(trial, score)
+                    else:
+                        study.tell(trial, state=optuna.trial.TrialState.FAIL)
+                config_id += len(configs)
+        else:
+            configs = grid_configs(params) if method == "grid" else random_configs(params, samples, self.rng)
+            self._evaluate_configs(pool, name, configs, segments, results, 0)
+
+        print(f"{name}: {method} search done in {time.perf_counter() - started:.1f}s")
+
+    def _evaluate_configs(self, pool, name, configs, segments, results, first_id):
+        """Evaluate configs on every segment; returns each config's mean
+        objective over its in-sample (train or full) segments"""
+        futures = {}
+        for offset, config in enumerate(configs):
+            for fold, segment, seg_start, seg_end in segments:
+                future = pool.submit(_evaluate, name, config, seg_start, seg_end)
+                futures[future] = (first_id + offset, config, fold, segment, seg_start, seg_end)
+
+        in_sample = {}
+        for future in as_completed(futures):
+            config_id, config, fold, segment, seg_start, seg_end = futures[future]
+            try:
+                metrics = future.result()
+            except Exception as e:
+                print(f"{name} config {config_id} failed on fold {fold} {segment}: {e}")
+                metrics = {"error": f"{type(e).__name__}: {e}"}
+
+            row = {"strategy": name, "config_id": config_id, "fold": fold, "segment": segment,
+                   "start": seg_start, "end": seg_end}
+            row.update({f"param_{param}": value for param, value in config.items()})
+            row.update(metrics)
+            results.append(name, row)
+
+            if segment != "test":
+                in_sample.setdefault(config_id, []).append(metrics.get(self.objective, np.nan))
+
+        return [float(np.nanmean(in_sample[first_id + offset])) if not np.all(np.isnan(in_sample[first_id + offset]))
+                else float("nan") for offset in range(len(configs))]
+
+
+def summarize(results_path, objective):
+    """Best configuration per fold by in-sample objective, with its out-of-sample score"""
+    results = pd.read_parquet(results_path)
+    param_cols = [col for col in results.columns if col.startswith("param_")]
+    if objective not in results.columns:
+        return pd.DataFrame()
+
+    summary = []
+    for fold, rows in results.groupby("fold"):
+        in_sample = rows[rows["segment"] != "test"].dropna(subset=[objective])
+        if in_sample.empty:
+            continue
+        best = in_sample.loc[in_sample[objective].idxmax()]
+        record = {"fold": fold, "config_id": best["config_id"], f"in_sample_{objective}": best[objective]}
+        record.update({col: best[col] for col in param_cols})
+
+        test = rows[(rows["segment"] == "test") & (rows["config_id"] == best["config_id"])]
+        if not test.empty:
+            record[f"out_of_sample_{objective}"] = test[objective].iloc[0]
+        summary.append(record)
+
+    return pd.DataFrame(summary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep strategy parameters and backtest every configuration")
+    parser.add_argument("--features", default="data/features.parquet",
+                       help="Feature (or OHLCV) parquet to label and backtest on")
+    parser.add_argument("--spaces", default="configs/optimizer.yaml",
+                       help="Search space config")
+    parser.add_argument("--strategies", nargs="+", default=None,
+                       help=f"Only optimize these strategies ({', '.join(STRATEGIES)})")
+    parser.add_argument("--out-dir", default="reports/optimizer",
+                       help="Directory for the per-strategy results tables")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                       help="Number of worker processes")
+    parser.add_argument("--walk-forward", type=int, default=0,
+                       help="Number of walk-forward folds (0 evaluates on the full history)")
+    parser.add_argument("--objective", default="portfolio_total_return_pct",
+                       help="Results column to maximize")
+    parser.add_argument("--seed", type=int, default=42,
+                       help="Seed for random and Bayesian search")
+    parser.add_argument("--instruments", nargs="+", default=None,
+                       help="Only use these instruments")
+    parser.add_argument("--start", default=None,
+                       help="Only use bars at or after this timestamp")
+    parser.add_argument("--end", default=None,
+                       help="Only use bars at or before this timestamp")
+    parser.add_argument("--capital", type=float, default=100000,
+                       help="Initial capital")
+    parser.add_argument("--commission", type=float, default=0.001,
+                       help="Commission rate")
+    parser.add_argument("--slippage", type=float, default=0.0005,
+                       help="Slippage rate")
+    parser.add_argument("--config", default="configs/strategies.yaml",
+                       help="Strategy config holding global_settings")
+    args = parser.parse_args()
+
+    spaces = load_search_spaces(args.spaces, args.strategies)
+    if not spaces:
+        print(f"No search spaces to run in {args.spaces}")
+        sys.exit(1)
+
+    backtest_config = {
+        "initial_capital": args.capital,
+        "commission": args.commission,
+        "slippage": args.slippage,
+        "max_concurrent_trades": load_global_settings(args.config).get("max_concurrent_trades", 5),
+    }
+    optimizer = StrategyOptimizer(spaces, workers=args.workers, folds=args.walk_forward,
+                                  objective=args.objective, seed=args.seed, backtest_config=backtest_config)
+    paths = optimizer.run(args.features, args.out_dir, instruments=args.instruments,
+                          start=args.start, end=args.end)
+
+    for name, path in paths.items():
+        print(f"\n{name}: results in {path}")
+        summary = summarize(path, args.objective)
+        if summary.empty:
+            print("  no configuration produced trades")
+        else:
+            print(summary.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import os
+import shutil
+import sys
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from data.parquet_io import ROW_GROUP_SIZE
+
+# Trade log partition column; each strategy's trades live in strategy=<name>/
+PARTITION_COLUMN = "strategy"
+
+
+def trade_log_path(output_path):
+    """Trade log directory kept next to a backtest summary file"""
+    root, _ = os.path.splitext(output_path)
+    return f"{root}_trades"
+
+
+def write_trade_log(trades, path, row_group_size=ROW_GROUP_SIZE):
+    """Write trade records as a parquet dataset partitioned by strategy.
+
+    Rows are sorted by (instrument, entry_time) so row group statistics let
+    read_trade_log skip groups outside an instrument or date filter. An
+    existing log at path is replaced.
+    """
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+
+    trades = trades.sort_values(["instrument", "entry_time"], kind="stable").reset_index(drop=True)
+    trades[PARTITION_COLUMN] = trades[PARTITION_COLUMN].astype(str)
+    ds.write_dataset(
+        pa.Table.from_pandas(trades, preserve_index=False), path, format="parquet",
+        partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive"),
+        max_rows_per_group=row_group_size, min_rows_per_group=min(row_group_size, max(len(trades), 1)),
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def read_trade_log(path, strategy=None, instrument=None, start=None, end=None, offset=0, limit=100):
+    """One page of a trade log, filtered by strategy, instrument and entry time.
+
+    The strategy filter prunes partitions and the instrument and inclusive
+    [start, end] entry_time filters skip row groups from their statistics;
+    batches are streamed only until the page is filled. Returns the page
+    and the number of trades matching the filters (an empty page and 0 for
+    a log without trades).
+    """
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    if "entry_time" not in dataset.schema.names:
+        # A backtest without trades writes no files
+        return pd.DataFrame(), 0
+
+    row_filter = None
+    for condition in _conditions(dataset.schema, strategy, instrument, start, end):
+        row_filter = condition if row_filter is None else row_filter & condition
+
+    total = dataset.count_rows(filter=row_filter)
+    batches, skip, remaining = [], offset, limit
+    for batch in dataset.to_batches(filter=row_filter):
+        if remaining <= 0:
+            break
+        if skip >= batch.num_rows:
+            skip -= batch.num_rows
+            continue
+        batch = batch.slice(skip, remaining)
+        skip = 0
+        remaining -= batch.num_rows
+        batches.append(batch)
+
+    if batches:
+        page = pa.Table.from_batches(batches).to_pandas()
+    else:
+        page = dataset.schema.empty_table().to_pandas()
+    return page, total
+
+
+def _conditions(schema, strategy, instrument, start, end):
+    if strategy is not None:
+        yield ds.field(PARTITION_COLUMN) == strategy
+    if instrument is not None:
+        yield ds.field("instrument") == instrument
+    ts_type = schema.field("entry_time").type
+    if start is not None:
+        yield ds.field("entry_time") >= pa.scalar(pd.Timestamp(start), type=ts_type)
+    if end is not None:
+        yield ds.field("entry_time") <= pa.scalar(pd.Timestamp(end), type=ts_type)
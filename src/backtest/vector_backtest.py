@@ -1,43 +1,85 @@
 import pandas as pd
 import numpy as np
 import argparse
+import heapq
 import json
+import yaml
 from pathlib import Path
+import os
+import sys
 from datetime import datetime, timedelta
 
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from data.parquet_io import read_parquet
+from backtest.trade_log import write_trade_log, trade_log_path
+
+# Raw bar columns the trade simulation reads
+BAR_COLUMNS = ["ts", "instrument", "high", "low", "close"]
+
+# Exit reason codes, indexing EXIT_REASONS
+STOP_LOSS, TAKE_PROFIT, TIMEOUT = 0, 1, 2
+EXIT_REASONS = ["STOP_LOSS", "TAKE_PROFIT", "TIMEOUT"]
+
+# Fields of each trade record, in order
+TRADE_COLUMNS = [
+    "instrument", "strategy", "entry_time", "exit_time", "duration_minutes", "side",
+    "entry_price", "exit_price", "exit_reason", "gross_return_pct", "net_return_pct",
+    "pnl_dollars", "position_size", "commission_cost", "is_winner", "risk_reward_actual",
+    "confidence",
+]
+
+# Extra trade_frame columns used by the portfolio simulation
+FILL_COLUMNS = ["entry_bar", "exit_bar", "net_return"]
+
 class VectorBacktester:
     """Vectorized backtesting engine for trading strategies"""
     
-    def __init__(self, initial_capital=100000, commission=0.001, slippage=0.0005):
+    def __init__(self, initial_capital=100000, commission=0.001, slippage=0.0005,
+                 max_concurrent_trades=5, position_pct=0.02):
         self.initial_capital = initial_capital
         self.commission = commission  # 0.1% commission
         self.slippage = slippage      # 0.05% slippage
+        self.max_concurrent_trades = max_concurrent_trades
+        self.position_pct = position_pct  # Share of equity per portfolio trade
         self.results = {}
         
-    def simulate_trades(self, raw_data_path, labels_path, output_path="reports/backtest_results.json"):
-        """Simulate all trades and calculate performance"""
+    def simulate_trades(self, raw_data_path, labels_path, output_path="reports/backtest_results.json",
+                        instruments=None, start=None, end=None, portfolio=False):
+        """Simulate all trades and calculate performance.
         
-        # Load data
+        output_path gets a JSON summary; the trade records go to a parquet
+        trade log next to it (<name>_trades/, partitioned by strategy), which
+        read_trade_log pages through. The returned results also hold the
+        trade records as a DataFrame under "trades".
+        
+        portfolio also runs simulate_portfolio over the same trades, adds its
+        summary to the results and saves the equity curve next to
+        output_path as <name>.equity.parquet.
+        """
+        
+        # Load only the bar columns the simulation uses, for the requested scope
         print("Loading data for backtesting...")
-        raw_data = pd.read_parquet(raw_data_path).sort_values(["instrument", "ts"])
-        labels = pd.read_parquet(labels_path).sort_values("ts")
+        raw_data = read_parquet(raw_data_path, columns=BAR_COLUMNS, instruments=instruments,
+                                start=start).sort_values(["instrument", "ts"])
+        labels = read_parquet(labels_path, instruments=instruments, start=start, end=end).sort_values("ts")
         
         print(f"Backtesting {len(labels)} trades on {len(raw_data)} data points")
         
-        # Simulate each trade
-        trade_results = []
-        for _, label in labels.iterrows():
-            result = self._simulate_single_trade(raw_data, label)
-            if result:
-                trade_results.append(result)
+        # Simulate all trades at once
+        trades = self.trade_frame(raw_data, labels)
+        trade_records = trades.drop(columns=FILL_COLUMNS)
         
         # Calculate portfolio metrics
-        portfolio_results = self._calculate_portfolio_metrics(trade_results)
+        portfolio_results = self.calculate_portfolio_metrics(trade_records)
         
         # Combine results
+        log_path = trade_log_path(output_path)
         results = {
             "backtest_summary": portfolio_results,
-            "trade_results": trade_results,
+            "trade_log": log_path,
+            "trade_count": len(trade_records),
             "backtest_date": datetime.now().isoformat(),
             "parameters": {
                 "initial_capital": self.initial_capital,
@@ -46,97 +88,115 @@ class VectorBacktester:
             }
         }
         
+        if portfolio:
+            equity, portfolio_summary = self.simulate_portfolio(raw_data, trades)
+            results["portfolio_summary"] = portfolio_summary
+            results["parameters"].update({
+                "max_concurrent_trades": self.max_concurrent_trades,
+                "position_pct": self.position_pct
+            })
+        
         # Save results
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        write_trade_log(trade_records, log_path)
         with open(output_path, 'w') as f:
             json.dump(results, f, indent=2, default=str)
         
-        print(f"Backtest results saved to {output_path}")
+        print(f"Backtest results saved to {output_path}, trade log to {log_path}")
         self._print_summary(portfolio_results)
         
+        if portfolio:
+            equity_path = Path(output_path).with_suffix(".equity.parquet")
+            equity.to_parquet(equity_path, index=False)
+            print(f"Equity curve saved to {equity_path}")
+            self._print_portfolio_summary(portfolio_summary)
+        
+        results["trades"] = trade_records
         return results
     
-    def _simulate_single_trade(self, raw_data, label):
-        """Simulate a single trade"""
-        
-        instrument = label["instrument"]
-        entry_time = label["ts"]
-        side = label["side"]
-        entry_price = label["entry"]
-        stop_loss = label["stop_loss"]
-        take_profit = label["take_profit"]
-        horizon_minutes = label.get("horizon_minutes", 60)
-        
-        # Get instrument data
-        inst_data = raw_data[raw_data["instrument"] == instrument].copy()
-        inst_data = inst_data.sort_values("ts").reset_index(drop=True)
-        
-        # Find entry point
-        entry_idx = inst_data[inst_data["ts"] >= entry_time].index
-        if len(entry_idx) == 0:
-            return None
-        
-        entry_idx = entry_idx[0]
+    def run_trades(self, raw_data, labels):
+        """Simulate every label as a trade and return one record per filled trade.
+        
+        raw_data must be sorted by (instrument, ts). Records keep the label
+        order; see trade_frame.
+        """
+        trades = self.trade_frame(raw_data, labels)
+        return trades.drop(columns=FILL_COLUMNS).to_dict("records")
+    
+    def _bar_arrays(self, raw_data):
+        """Bar columns as arrays, plus the (start, end) row range of each
+        instrument in raw_data, which must be sorted by (instrument, ts)"""
+        bar_ts = raw_data["ts"].to_numpy()
+        instruments = raw_data["instrument"].astype(str).to_numpy()
+        starts = np.flatnonzero(np.r_[True, instruments[1:] != instruments[:-1]]) if len(instruments) else np.array([], dtype=np.int64)
+        ends = np.r_[starts[1:], len(instruments)]
+        return {
+            "ts": bar_ts,
+            "ns": bar_ts.astype("datetime64[ns]").view(np.int64),
+            "high": raw_data["high"].to_numpy(dtype=float),
+            "low": raw_data["low"].to_numpy(dtype=float),
+            "close": raw_data["close"].to_numpy(dtype=float),
+            "ranges": dict(zip(instruments[starts], zip(starts, ends))),
+        }
+    
+    def trade_frame(self, raw_data, labels):
+        """Simulate every label as a trade, one row per filled trade.
+        
+        Trades are simulated together on per-instrument bar arrays: entries
+        are located with searchsorted, exits with _find_exits. Labels with no
+        bar at or after their ts are skipped. Besides the trade record
+        columns, entry_bar and exit_bar hold the raw_data rows of the fills
+        and net_return the unrounded return after costs.
+        """
+        if labels.empty or raw_data.empty:
+            return pd.DataFrame(columns=TRADE_COLUMNS + FILL_COLUMNS)
+        
+        bars = self._bar_arrays(raw_data)
+        bar_ts, bar_ns, ranges = bars["ts"], bars["ns"], bars["ranges"]
+        high, low, close = bars["high"], bars["low"], bars["close"]
+        
+        n = len(labels)
+        label_ts = labels["ts"].to_numpy().astype("datetime64[ns]")
+        label_ns = label_ts.view(np.int64)
+        entry_bar = np.full(n, -1, dtype=np.int64)
+        last_bar = np.full(n, -1, dtype=np.int64)
+        label_instruments = labels["instrument"].astype(str).to_numpy()
+        for instrument in np.unique(label_instruments):
+            if instrument not in ranges:
+                continue
+            start, end = ranges[instrument]
+            rows = np.flatnonzero(label_instruments == instrument)
+            entry_bar[rows] = start + np.searchsorted(bar_ns[start:end], label_ns[rows], side="left")
+            last_bar[rows] = end - 1
+        
+        filled = (entry_bar >= 0) & (entry_bar <= last_bar) & ~np.isnat(label_ts)
+        rows = np.flatnonzero(filled)
+        entry_bar = entry_bar[rows]
+        
+        def label_column(name, default):
+            if name in labels.columns:
+                return labels[name].to_numpy()[rows]
+            return np.full(len(rows), default)
+        
+        side = labels["side"].to_numpy()[rows]
+        entry_price = labels["entry"].to_numpy(dtype=float)[rows]
+        stop_loss = labels["stop_loss"].to_numpy(dtype=float)[rows]
+        take_profit = labels["take_profit"].to_numpy(dtype=float)[rows]
+        horizon_minutes = label_column("horizon_minutes", 60).astype(np.int64)
+        long = side == 1
         
         # Calculate actual entry price with slippage
-        actual_entry = entry_price * (1 + self.slippage if side == 1 else 1 - self.slippage)
+        actual_entry = entry_price * np.where(long, 1 + self.slippage, 1 - self.slippage)
         
-        # Determine exit point
-        max_idx = min(len(inst_data) - 1, entry_idx + horizon_minutes // 5)  # Assuming 5min bars
-        
-        exit_result = self._find_exit_point(inst_data, entry_idx, max_idx, 
-                                          side, stop_loss, take_profit)
-        
-        if not exit_result:
-            return None
-        
-        exit_idx, exit_price, exit_reason = exit_result
-        
-        # Calculate trade results
-        trade_result = self._calculate_trade_pnl(
-            side, actual_entry, exit_price, 
-            inst_data.iloc[entry_idx]["ts"], 
-            inst_data.iloc[exit_idx]["ts"],
-            exit_reason, label
-        )
-        
-        return trade_result
-    
-    def _find_exit_point(self, data, entry_idx, max_idx, side, stop_loss, take_profit):
-        """Find where the trade exits (SL, TP, or timeout)"""
-        
-        for i in range(entry_idx + 1, max_idx + 1):
-            if i >= len(data):
-                break
-                
-            candle = data.iloc[i]
-            high, low = candle["high"], candle["low"]
-            
-            if side == 1:  # Long position
-                if low <= stop_loss:
-                    return i, stop_loss, "STOP_LOSS"
-                elif high >= take_profit:
-                    return i, take_profit, "TAKE_PROFIT"
-            else:  # Short position
-                if high >= stop_loss:
-                    return i, stop_loss, "STOP_LOSS"
-                elif low <= take_profit:
-                    return i, take_profit, "TAKE_PROFIT"
-        
-        # If no SL/TP hit, exit at market close
-        if max_idx < len(data):
-            return max_idx, data.iloc[max_idx]["close"], "TIMEOUT"
-        
-        return None
-    
-    def _calculate_trade_pnl(self, side, entry_price, exit_price, entry_time, exit_time, exit_reason, label):
-        """Calculate PnL and other trade metrics"""
+        # Exit search window, assuming 5min bars
+        max_bar = np.minimum(last_bar[rows], entry_bar + horizon_minutes // 5)
+        exit_bar, exit_code = self._find_exits(high, low, entry_bar, max_bar, long, stop_loss, take_profit)
+        exit_price = np.select([exit_code == STOP_LOSS, exit_code == TAKE_PROFIT],
+                               [stop_loss, take_profit], default=close[exit_bar])
         
         # Calculate returns
-        if side == 1:  # Long
-            gross_return = (exit_price - entry_price) / entry_price
-        else:  # Short
-            gross_return = (entry_price - exit_price) / entry_price
+        gross_return = np.where(long, (exit_price - actual_entry) / actual_entry,
+                                (actual_entry - exit_price) / actual_entry)
         
         # Account for costs
         total_commission = 2 * self.commission  # Entry + exit
@@ -144,40 +204,197 @@ class VectorBacktester:
         
         # Position size (assuming equal dollar amounts)
         position_size = self.initial_capital * 0.02  # 2% of capital per trade
-        pnl_dollars = position_size * net_return
         
-        # Trade duration
-        duration = (pd.to_datetime(exit_time) - pd.to_datetime(entry_time)).total_seconds() / 60
+        entry_time = pd.Series(bar_ts[entry_bar])
+        exit_time = pd.Series(bar_ts[exit_bar])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            risk_reward_actual = np.where(entry_price != stop_loss,
+                                          np.abs(gross_return) / np.abs((entry_price - stop_loss) / entry_price), 0)
         
-        # Create trade record
-        trade_record = {
-            "instrument": label["instrument"],
-            "strategy": label.get("strategy", "UNKNOWN"),
+        trades = pd.DataFrame({
+            "instrument": label_column("instrument", None),
+            "strategy": label_column("strategy", "UNKNOWN"),
             "entry_time": entry_time,
             "exit_time": exit_time,
-            "duration_minutes": duration,
+            "duration_minutes": (exit_time - entry_time).dt.total_seconds() / 60,
             "side": side,
-            "entry_price": entry_price,
+            "entry_price": actual_entry,
             "exit_price": exit_price,
-            "exit_reason": exit_reason,
+            "exit_reason": np.asarray(EXIT_REASONS, dtype=object)[exit_code],
             "gross_return_pct": gross_return * 100,
             "net_return_pct": net_return * 100,
-            "pnl_dollars": pnl_dollars,
+            "pnl_dollars": position_size * net_return,
             "position_size": position_size,
             "commission_cost": position_size * total_commission,
             "is_winner": net_return > 0,
-            "risk_reward_actual": abs(gross_return) / abs((label["entry"] - label["stop_loss"]) / label["entry"]) if label["entry"] != label["stop_loss"] else 0,
-            "confidence": label.get("confidence", 0.5)
-        }
+            "risk_reward_actual": risk_reward_actual,
+            "confidence": label_column("confidence", 0.5),
+            "entry_bar": entry_bar,
+            "exit_bar": exit_bar,
+            "net_return": net_return,
+        })
+        return trades
+    
+    def _find_exits(self, high, low, entry_bar, max_bar, long, stop_loss, take_profit,
+                    max_block_cells=4_000_000):
+        """Exit bar and reason of each trade: the first bar after entry_bar, up
+        to max_bar, that touches the stop (checked first) or the target, else
+        TIMEOUT at max_bar.
+        
+        Trades are searched together over growing blocks of forward offsets;
+        most exit within a few bars, so only the few still open are carried
+        into the larger blocks.
+        """
+        exit_bar = max_bar.copy()
+        exit_code = np.full(len(entry_bar), TIMEOUT, dtype=np.int8)
+        pending = np.flatnonzero(max_bar > entry_bar)
+        offset = 1
+        block = 8
+        
+        while len(pending):
+            # Bound the (trades x offsets) temporaries
+            block = max(1, min(block, max_block_cells // len(pending)))
+            limit = max_bar[pending][:, None]
+            bars = entry_bar[pending][:, None] + np.arange(offset, offset + block)
+            in_range = bars <= limit
+            bars = np.minimum(bars, limit)
+            
+            is_long = long[pending][:, None]
+            stop = stop_loss[pending][:, None]
+            target = take_profit[pending][:, None]
+            stop_hit = np.where(is_long, low[bars] <= stop, high[bars] >= stop)
+            target_hit = np.where(is_long, high[bars] >= target, low[bars] <= target)
+            touched = in_range & (stop_hit | target_hit)
+            
+            hit = touched.any(axis=1)
+            first = touched[hit].argmax(axis=1)
+            exit_bar[pending[hit]] = bars[hit, first]
+            exit_code[pending[hit]] = np.where(stop_hit[hit, first], STOP_LOSS, TAKE_PROFIT)
+            
+            pending = pending[~hit & (entry_bar[pending] + offset + block <= max_bar[pending])]
+            offset += block
+            block *= 2
+        
+        return exit_bar, exit_code
+    
+    def simulate_portfolio(self, raw_data, trades):
+        """Replay trades against one capital account.
+        
+        Entries and exits are processed in time order: exits free their slot
+        and book their PnL before entries at the same time are considered,
+        and simultaneous entries are taken by descending confidence, as the
+        orchestrator prioritizes signals. An entry is skipped while
+        max_concurrent_trades positions are open or when its size,
+        position_pct of realized equity, exceeds the uncommitted cash.
+        
+        Returns the bar-level equity curve (open positions marked to the bar
+        close, costs booked at exit) and a summary dict.
+        """
+        n = len(trades)
+        entry_ns = trades["entry_time"].to_numpy().astype("datetime64[ns]").view(np.int64)
+        exit_ns = trades["exit_time"].to_numpy().astype("datetime64[ns]").view(np.int64)
+        net_return = trades["net_return"].to_numpy(dtype=float)
+        confidence = trades["confidence"].to_numpy(dtype=float)
+        
+        size = np.zeros(n)
+        open_trades = []  # heap of (exit_ns, trade)
+        realized = float(self.initial_capital)
+        committed = 0.0
+        for i in np.lexsort((np.arange(n), -confidence, entry_ns)).tolist():
+            while open_trades and open_trades[0][0] <= entry_ns[i]:
+                _, j = heapq.heappop(open_trades)
+                realized += size[j] * net_return[j]
+                committed -= size[j]
+            
+            position_size = realized * self.position_pct
+            if (len(open_trades) >= self.max_concurrent_trades or position_size <= 0
+                    or committed + position_size > realized):
+                continue
+            
+            size[i] = position_size
+            committed += position_size
+            heapq.heappush(open_trades, (exit_ns[i], i))
+        
+        taken = size > 0
+        equity = self._equity_curve(raw_data, trades[taken], size[taken])
+        return equity, self._portfolio_summary(equity, trades[taken], size[taken], n)
+    
+    def _equity_curve(self, raw_data, trades, size):
+        """Equity and open positions at every distinct bar time.
+        
+        Each position contributes its mark-to-close PnL on the bars of its
+        instrument from entry up to exit, then its realized PnL from the exit
+        bar on. Changes are accumulated per bar time and summed once.
+        """
+        bars = self._bar_arrays(raw_data)
+        times, bar_time = np.unique(bars["ns"], return_inverse=True)
+        close = bars["close"]
+        
+        entry_bar = trades["entry_bar"].to_numpy(dtype=np.int64)
+        exit_bar = trades["exit_bar"].to_numpy(dtype=np.int64)
+        entry_price = trades["entry_price"].to_numpy(dtype=float)
+        direction = np.where(trades["side"].to_numpy() == 1, 1.0, -1.0)
+        pnl = size * trades["net_return"].to_numpy(dtype=float)
+        
+        # One (position, bar) pair per bar a position is open over
+        held = exit_bar - entry_bar
+        owner = np.repeat(np.arange(len(trades)), held)
+        first_pair = np.repeat(np.cumsum(held) - held, held)
+        offset = np.arange(held.sum()) - first_pair
+        pair_bar = entry_bar[owner] + offset
+        mark = size[owner] * direction[owner] * (close[pair_bar] - entry_price[owner]) / entry_price[owner]
+        
+        # Each bar adds the change in its position's mark; the exit bar swaps
+        # the last mark for the realized PnL
+        previous_mark = np.where(offset > 0, np.r_[0.0, mark[:-1]], 0.0)
+        last_mark = np.zeros(len(trades))
+        last_mark[held > 0] = mark[np.cumsum(held)[held > 0] - 1]
+        
+        change = np.zeros(len(times))
+        np.add.at(change, bar_time[pair_bar], mark - previous_mark)
+        np.add.at(change, bar_time[exit_bar], pnl - last_mark)
+        
+        positions = np.zeros(len(times), dtype=np.int64)
+        np.add.at(positions, bar_time[entry_bar], 1)
+        np.add.at(positions, bar_time[exit_bar], -1)
+        
+        return pd.DataFrame({
+            "ts": pd.to_datetime(times),
+            "equity": self.initial_capital + np.cumsum(change),
+            "open_positions": np.cumsum(positions),
+        })
+    
+    def _portfolio_summary(self, equity, trades, size, candidate_trades):
+        """Capital-constrained performance of the trades simulate_portfolio took"""
+        if equity.empty:
+            return {"error": "No bars to build an equity curve on"}
+        
+        curve = equity["equity"].to_numpy()
+        drawdown = curve / np.maximum.accumulate(curve) - 1
+        bar_returns = np.diff(curve) / curve[:-1]
+        std_return = bar_returns.std(ddof=1) if len(bar_returns) > 1 else 0.0
+        final_equity = curve[-1]
         
-        return trade_record
+        return {
+            "candidate_trades": candidate_trades,
+            "taken_trades": len(trades),
+            "skipped_trades": candidate_trades - len(trades),
+            "max_open_positions": int(equity["open_positions"].max()),
+            "final_equity": round(float(final_equity), 2),
+            "total_return_pct": round(float((final_equity / self.initial_capital - 1) * 100), 4),
+            "max_drawdown_pct": round(float(drawdown.min() * 100), 4),
+            "bar_sharpe_ratio": round(float(bar_returns.mean() / std_return), 4) if std_return > 0 else 0,
+            "avg_position_size": round(float(size.mean()), 2) if len(size) else 0,
+            "win_rate": round(float((trades["net_return"] > 0).mean()), 4) if len(trades) else 0,
+        }
     
-    def _calculate_portfolio_metrics(self, trade_results):
+    def calculate_portfolio_metrics(self, trade_results):
         """Calculate overall portfolio performance metrics"""
         
-        if not trade_results:
+        if len(trade_results) == 0:
             return {"error": "No trades to analyze"}
         
+        # Trade records as a list of dicts or a frame
         df = pd.DataFrame(trade_results)
         
         # Basic statistics
@@ -263,6 +480,32 @@ class VectorBacktester:
         print(f"Average Winner: ${results['avg_winner_dollars']:,.2f}")
         print(f"Losing Trades: {results['losing_trades']}")
         print(f"Average Loser: ${results['avg_loser_dollars']:,.2f}")
+    
+    def _print_portfolio_summary(self, summary):
+        """Print portfolio simulation summary"""
+        print("\n" + "="*50)
+        print("PORTFOLIO SIMULATION")
+        print("="*50)
+        
+        if "error" in summary:
+            print(summary["error"])
+            return
+        
+        print(f"Trades Taken: {summary['taken_trades']} of {summary['candidate_trades']}")
+        print(f"Max Open Positions: {summary['max_open_positions']}")
+        print(f"Final Equity: ${summary['final_equity']:,.2f}")
+        print(f"Total Return: {summary['total_return_pct']:.2f}%")
+        print(f"Max Drawdown: {summary['max_drawdown_pct']:.2f}%")
+        print(f"Bar Sharpe Ratio: {summary['bar_sharpe_ratio']:.4f}")
+
+def load_global_settings(config_path):
+    """global_settings section of the strategy config, as the orchestrator reads it"""
+    try:
+        with open(config_path, 'r') as f:
+            return (yaml.safe_load(f) or {}).get("global_settings", {})
+    except FileNotFoundError:
+        print(f"Config file not found: {config_path}")
+        return {}
 
 def main():
     parser = argparse.ArgumentParser(description="Run vectorized backtest")
@@ -278,17 +521,39 @@ def main():
                        help="Commission rate")
     parser.add_argument("--slippage", type=float, default=0.0005,
                        help="Slippage rate")
+    parser.add_argument("--instruments", nargs="+", default=None,
+                       help="Only backtest these instruments")
+    parser.add_argument("--start", default=None,
+                       help="Only backtest labels at or after this timestamp")
+    parser.add_argument("--end", default=None,
+                       help="Only backtest labels at or before this timestamp")
+    parser.add_argument("--portfolio", action="store_true",
+                       help="Also replay the trades against one capital account with an equity curve")
+    parser.add_argument("--max-concurrent", type=int, default=None,
+                       help="Open position limit for --portfolio (default: max_concurrent_trades from --config)")
+    parser.add_argument("--position-pct", type=float, default=0.02,
+                       help="Share of equity allocated per trade in --portfolio")
+    parser.add_argument("--config", default="configs/strategies.yaml",
+                       help="Strategy config holding global_settings")
     
     args = parser.parse_args()
     
     # Run backtest
+    max_concurrent = args.max_concurrent
+    if max_concurrent is None:
+        max_concurrent = load_global_settings(args.config).get("max_concurrent_trades", 5)
+    
     backtester = VectorBacktester(
         initial_capital=args.capital,
         commission=args.commission,
-        slippage=args.slippage
+        slippage=args.slippage,
+        max_concurrent_trades=max_concurrent,
+        position_pct=args.position_pct
     )
     
-    results = backtester.simulate_trades(args.raw, args.labels, args.out)
+    results = backtester.simulate_trades(args.raw, args.labels, args.out,
+                                         instruments=args.instruments, start=args.start, end=args.end,
+                                         portfolio=args.portfolio)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,23 @@
+import os
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Prefer RAM-backed storage for IPC files shared with process pools
+IPC_TMP_ROOT = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def write_ipc(table, path):
+    """Write an Arrow table as an IPC file that workers can memory-map"""
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def read_ipc(path):
+    """Memory-map an IPC file written by write_ipc; columns are not copied"""
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
@@ -0,0 +1,88 @@
+import pandas as pd
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from data.parquet_io import write_parquet, read_parquet
+
+DEFAULT_PATTERNS = ["features.parquet", "live_features*.parquet", "labels.parquet"]
+
+
+def _timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def measure_file(path, tmp_dir, repeats=3):
+    """Compare a parquet file against its compact rewrite"""
+    original, read_seconds = _timed(lambda: pd.read_parquet(path), repeats)
+    compact_path = os.path.join(tmp_dir, os.path.basename(path))
+    write_parquet(original, compact_path, compact=True)
+    compact, compact_read_seconds = _timed(lambda: read_parquet(compact_path), repeats)
+
+    result = {
+        "file": os.path.basename(path),
+        "rows": len(original),
+        "disk_kb": os.path.getsize(path) / 1024,
+        "compact_disk_kb": os.path.getsize(compact_path) / 1024,
+        "memory_kb": original.memory_usage(deep=True).sum() / 1024,
+        "compact_memory_kb": compact.memory_usage(deep=True).sum() / 1024,
+        "read_seconds": read_seconds,
+        "compact_read_seconds": compact_read_seconds,
+    }
+
+    # A typical scoped load: a few columns of one instrument over the later half
+    if "instrument" in original.columns and "ts" in original.columns and len(original):
+        instrument = original["instrument"].iloc[0]
+        start = original["ts"].quantile(0.5)
+        columns = [col for col in original.columns if col not in ("instrument", "ts")][:5] + ["instrument", "ts"]
+        scoped, result["scoped_read_seconds"] = _timed(
+            lambda: read_parquet(compact_path, columns=columns, instruments=[instrument], start=start), repeats)
+        result["scoped_memory_kb"] = scoped.memory_usage(deep=True).sum() / 1024
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report disk, memory and read-time savings of the compact parquet schema")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--patterns", nargs="+", default=DEFAULT_PATTERNS)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = sorted({p for pattern in args.patterns for p in glob.glob(os.path.join(args.data_dir, pattern))})
+    if not paths:
+        print(f"No parquet files matching {args.patterns} in {args.data_dir}")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = [measure_file(path, tmp_dir, args.repeats) for path in paths]
+
+    print(f"\n{'file':<32}{'rows':>7}{'disk KB':>16}{'memory KB':>18}{'read ms':>14}{'scoped ms':>11}")
+    for r in results:
+        scoped = f"{r['scoped_read_seconds'] * 1000:>11.1f}" if "scoped_read_seconds" in r else f"{'-':>11}"
+        print(f"{r['file']:<32}{r['rows']:>7}"
+              f"{r['disk_kb']:>8.0f}->{r['compact_disk_kb']:<6.0f}"
+              f"{r['memory_kb']:>9.0f}->{r['compact_memory_kb']:<7.0f}"
+              f"{r['read_seconds'] * 1000:>6.1f}->{r['compact_read_seconds'] * 1000:<6.1f}{scoped}")
+
+    totals = {key: sum(r[key] for r in results)
+              for key in ["disk_kb", "compact_disk_kb", "memory_kb", "compact_memory_kb"]}
+    print(f"\nTotal disk:   {totals['disk_kb']:.0f} KB -> {totals['compact_disk_kb']:.0f} KB "
+          f"({1 - totals['compact_disk_kb'] / totals['disk_kb']:.0%} smaller)")
+    print(f"Total memory: {totals['memory_kb']:.0f} KB -> {totals['compact_memory_kb']:.0f} KB "
+          f"({1 - totals['compact_memory_kb'] / totals['memory_kb']:.0%} smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import pandas as pd
+import numpy as np
+
+# Price levels keep float64 in the compact schema: stops and targets are
+# compared against bar highs/lows and must not pick up float32 rounding
+PRICE_COLUMNS = ["open", "high", "low", "close", "entry", "stop_loss", "take_profit"]
+
+# Low-cardinality string columns stored dictionary-encoded (categorical in pandas)
+DICTIONARY_COLUMNS = ["instrument", "strategy", "strategy_type"]
+
+# Integer columns with a known small range
+INT8_COLUMNS = ["side"]
+
+# Rows per parquet row group; smaller groups make instrument/time filters
+# skip more data, larger ones compress better
+ROW_GROUP_SIZE = 65536
+
+
+def to_compact(df):
+    """Compact in-memory schema for feature and label frames.
+
+    float64 features become float32 (price levels excepted), instrument and
+    strategy names become categoricals, side becomes int8 and ts is stored
+    with millisecond resolution.
+    """
+    df = df.copy()
+    for col in df.columns:
+        values = df[col]
+        if col == "ts":
+            df[col] = pd.to_datetime(values).dt.as_unit("ms")
+        elif col in DICTIONARY_COLUMNS:
+            df[col] = values.astype("category")
+        elif col in INT8_COLUMNS:
+            df[col] = values.astype(np.int8)
+        elif values.dtype == np.float64 and col not in PRICE_COLUMNS:
+            df[col] = values.astype(np.float32)
+    return df
+
+
+def write_parquet(df, path, compact=False, row_group_size=ROW_GROUP_SIZE):
+    """Write df to parquet, optionally in the compact schema.
+
+    Compact files are sorted by (instrument, ts) so every row group covers a
+    narrow instrument and time range, which lets read_parquet's filters skip
+    whole row groups from their statistics.
+    """
+    if not compact:
+        df.to_parquet(path, index=False)
+        return
+
+    sort_cols = [col for col in ["instrument", "ts"] if col in df.columns]
+    if sort_cols:
+        df = df.sort_values(sort_cols, kind="stable").reset_index(drop=True)
+    to_compact(df).to_parquet(path, index=False, row_group_size=row_group_size)
+
+
+def read_parquet(path, columns=None, instruments=None, start=None, end=None):
+    """Read a feature or label parquet, loading only what is asked for.
+
+    columns projects the read to those columns; instruments and the inclusive
+    [start, end] ts range are pushed down to the parquet reader so row groups
+    outside them are never decoded.
+    """
+    filters = []
+    if instruments is not None:
+        filters.append(("instrument", "in", list(instruments)))
+    if start is not None:
+        filters.append(("ts", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("ts", "<=", pd.Timestamp(end)))
+
+    df = pd.read_parquet(path, columns=columns, filters=filters or None)
+
+    # The dictionary read back lists every instrument in the file, not just
+    # the ones that passed the filter
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.remove_unused_categories()
+    return df
@@ -14,6 +14,7 @@ import logging
 import threading
 import time
 import queue
+from collections import deque
 import os
 import sys
 from pathlib import Path
@@ -25,6 +26,8 @@ import yfinance as yf
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from features.build_features import FeatureEngineer
+from features.incremental_features import IncrementalFeatureEngine
+from features.feature_store import FeatureStore
 from labeling.label_pipeline import LabelingPipeline
 
 class RealTimeDataStreamer:
@@ -37,6 +40,10 @@ class RealTimeDataStreamer:
         self.streams = {}
         self.data_buffer = {}
         self.feature_engineer = FeatureEngineer()
+        # Exports cover the latest 10000 bars, a sliding window: keep it in memory
+        self.feature_store = FeatureStore(feature_engineer=self.feature_engineer, persist=False)
+        self.incremental_features = IncrementalFeatureEngine()
+        self.feature_buffer = {}
         self.labeling_pipeline = LabelingPipeline()
         
         # Setup logging
@@ -200,6 +207,12 @@ class RealTimeDataStreamer:
             if len(self.data_buffer[instrument]) > 200:
                 self.data_buffer[instrument] = self.data_buffer[instrument][-200:]
             
+            # Update rolling feature state with the new bar only
+            feature_row = self.incremental_features.update(dict(data, ts=data['timestamp']))
+            if instrument not in self.feature_buffer:
+                self.feature_buffer[instrument] = deque(maxlen=200)
+            self.feature_buffer[instrument].append(feature_row)
+            
             # Process features and signals if we have enough data
             if len(self.data_buffer[instrument]) >= 100:
                 await self.generate_features_and_signals(instrument)
@@ -236,20 +249,15 @@ class RealTimeDataStreamer:
         """Generate features and trading signals for instrument"""
         
         try:
-            # Convert buffer to DataFrame
-            df = pd.DataFrame(self.data_buffer[instrument])
-            df['ts'] = df['timestamp']
-            df = df.sort_values('ts').reset_index(drop=True)
-            
-            # Generate features
-            features_df = self.feature_engineer.build_all_features(df)
+            # Feature rows are maintained incrementally in process_data_point
+            features_df = pd.DataFrame(list(self.feature_buffer[instrument]))
             
             if not features_df.empty:
                 # Store features
                 latest_features = features_df.iloc[-1]
                 feature_data = {
                     col: float(latest_features[col]) 
-                    for col in self.feature_engineer.feature_columns 
+                    for col in self.incremental_features.feature_columns 
                     if pd.notna(latest_features[col])
                 }
                 
@@ -396,7 +404,7 @@ class RealTimeDataStreamer:
                     market_df.to_parquet("data/realtime_market_data.parquet", index=False)
                     
                     # Generate features for the exported data
-                    features_df = self.feature_engineer.build_all_features(market_df)
+                    features_df = self.feature_store.get_features(market_df)
                     features_df.to_parquet("data/realtime_features.parquet", index=False)
                     
                     # Export signals
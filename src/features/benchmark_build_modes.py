@@ -0,0 +1,83 @@
+import pandas as pd
+import argparse
+import sys
+import os
+import io
+import time
+import resource
+import contextlib
+import multiprocessing as mp
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from features.build_features import FeatureEngineer
+from features.benchmark_indicators import generate_bars
+
+
+def make_universe(n_instruments, bars_per_instrument):
+    """Synthetic multi-instrument OHLCV frame"""
+    frames = []
+    for i in range(n_instruments):
+        inst = generate_bars(bars_per_instrument, seed=i)
+        inst["instrument"] = f"BENCH_{i:04d}"
+        frames.append(inst)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_mode(mode, dtype, n_instruments, bars_per_instrument, queue):
+    df = make_universe(n_instruments, bars_per_instrument)
+    rss_before = _peak_rss_mb()
+
+    engineer = FeatureEngineer(build_mode=mode, feature_dtype=dtype)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = engineer.build_all_features(df)
+    elapsed = time.perf_counter() - start
+
+    queue.put({
+        "mode": f"{mode}/{dtype}" if mode == "columnar" else mode,
+        "seconds": elapsed,
+        "peak_rss_mb": _peak_rss_mb(),
+        "build_rss_mb": _peak_rss_mb() - rss_before,
+        "result_mb": result.memory_usage(deep=False).sum() / 1024 ** 2,
+    })
+
+
+def run_benchmark(n_instruments, bars_per_instrument):
+    """Run every build mode in a fresh process so peak RSS is not shared"""
+    ctx = mp.get_context("spawn")
+    results = []
+    for mode, dtype in [("stages", "float64"), ("columnar", "float64"), ("columnar", "float32")]:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_mode, args=(mode, dtype, n_instruments, bars_per_instrument, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare wall time and peak RSS of feature build modes")
+    parser.add_argument("--instruments", type=int, default=20,
+                       help="Number of synthetic instruments")
+    parser.add_argument("--bars", type=int, default=50_000,
+                       help="Bars per instrument")
+    args = parser.parse_args()
+
+    print(f"Building features for {args.instruments} instruments x {args.bars} bars...")
+    results = run_benchmark(args.instruments, args.bars)
+
+    print(f"\n{'mode':<18}{'wall (s)':>10}{'peak RSS (MB)':>15}{'build RSS (MB)':>16}{'output (MB)':>13}")
+    for r in results:
+        print(f"{r['mode']:<18}{r['seconds']:>10.2f}{r['peak_rss_mb']:>15.0f}"
+              f"{r['build_rss_mb']:>16.0f}{r['result_mb']:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import pandas as pd
+import numpy as np
+import argparse
+import sys
+import os
+import time
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from features.build_features import FeatureEngineer
+from features.rolling_kernels import rolling_mean_abs_deviation, NUMBA_AVAILABLE
+
+
+class LoopIndicators:
+    """Reference bar-by-bar implementations the vectorized indicators must reproduce"""
+
+    def obv(self, df):
+        obv = [0]
+        for i in range(1, len(df)):
+            if df["close"].iloc[i] > df["close"].iloc[i-1]:
+                obv.append(obv[-1] + df["volume"].iloc[i])
+            elif df["close"].iloc[i] < df["close"].iloc[i-1]:
+                obv.append(obv[-1] - df["volume"].iloc[i])
+            else:
+                obv.append(obv[-1])
+        return pd.Series(obv, index=df.index)
+
+    def vpt(self, df):
+        vpt = [0]
+        for i in range(1, len(df)):
+            vpt.append(vpt[-1] + df["volume"].iloc[i] *
+                      (df["close"].iloc[i] - df["close"].iloc[i-1]) / df["close"].iloc[i-1])
+        return pd.Series(vpt, index=df.index)
+
+    def fractal_high(self, df, period=5):
+        highs = df["high"]
+        fractal_high = pd.Series(index=df.index, dtype=float)
+
+        for i in range(period, len(df) - period):
+            if highs.iloc[i] == highs.iloc[i-period:i+period+1].max():
+                fractal_high.iloc[i] = highs.iloc[i]
+
+        return fractal_high.ffill()
+
+    def fractal_low(self, df, period=5):
+        lows = df["low"]
+        fractal_low = pd.Series(index=df.index, dtype=float)
+
+        for i in range(period, len(df) - period):
+            if lows.iloc[i] == lows.iloc[i-period:i+period+1].min():
+                fractal_low.iloc[i] = lows.iloc[i]
+
+        return fractal_low.ffill()
+
+    def rolling_mad(self, series, period=20):
+        return series.rolling(period).apply(lambda x: np.mean(np.abs(x - x.mean())))
+
+    def cci(self, df, period=20):
+        typical_price = (df["high"] + df["low"] + df["close"]) / 3
+        sma = typical_price.rolling(period).mean()
+        mad = self.rolling_mad(typical_price, period)
+        return (typical_price - sma) / (0.015 * mad)
+
+
+def generate_bars(n_bars, seed=42):
+    """Generate a random-walk OHLCV frame with repeated prices so ties are exercised"""
+    rng = np.random.default_rng(seed)
+    # Round to the tick so equal closes and equal window extremes actually occur
+    close = np.round(100 + np.cumsum(rng.normal(0, 0.1, n_bars)), 2)
+    spread = np.round(np.abs(rng.normal(0, 0.05, n_bars)), 2)
+    return pd.DataFrame({
+        "ts": pd.date_range("2020-01-01", periods=n_bars, freq="5min"),
+        "open": close,
+        "high": close + spread,
+        "low": close - spread,
+        "close": close,
+        "volume": rng.integers(1000, 50000, n_bars),
+        "instrument": "BENCH",
+    })
+
+
+def run_benchmark(df, repeats=1, indicators=None):
+    """Time loop vs vectorized indicators and check they agree exactly"""
+    engineer = FeatureEngineer()
+    reference = LoopIndicators()
+    typical_price = (df["high"] + df["low"] + df["close"]) / 3
+
+    def mad_kernel(use_numba):
+        return lambda d: pd.Series(rolling_mean_abs_deviation(typical_price, 20, use_numba=use_numba),
+                                   index=d.index)
+
+    # name -> (reference key, vectorized implementation)
+    cases = {
+        "obv": ("obv", engineer._obv),
+        "vpt": ("vpt", engineer._vpt),
+        "fractal_high": ("fractal_high", lambda d: engineer._fractal_high(d, 5)),
+        "fractal_low": ("fractal_low", lambda d: engineer._fractal_low(d, 5)),
+        "cci": ("cci", lambda d: engineer._cci(d, 20)),
+        "rolling_mad/numpy": ("rolling_mad", mad_kernel(False)),
+    }
+    if NUMBA_AVAILABLE:
+        cases["rolling_mad/numba"] = ("rolling_mad", mad_kernel(True))
+        # Compile outside the timed region
+        rolling_mean_abs_deviation(np.arange(64, dtype=float), 20, use_numba=True)
+
+    references = {
+        "obv": reference.obv,
+        "vpt": reference.vpt,
+        "fractal_high": lambda d: reference.fractal_high(d, 5),
+        "fractal_low": lambda d: reference.fractal_low(d, 5),
+        "cci": lambda d: reference.cci(d, 20),
+        "rolling_mad": lambda d: reference.rolling_mad(typical_price, 20),
+    }
+
+    # Each reference runs once even when several kernels are checked against it
+    expected_cache = {}
+    results = []
+    for name, (ref_key, vector_fn) in cases.items():
+        if indicators and name not in indicators:
+            continue
+
+        if ref_key not in expected_cache:
+            start = time.perf_counter()
+            expected_cache[ref_key] = (references[ref_key](df), time.perf_counter() - start)
+        expected, loop_time = expected_cache[ref_key]
+
+        vector_time = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            actual = vector_fn(df)
+            vector_time = min(vector_time, time.perf_counter() - start)
+
+        try:
+            pd.testing.assert_series_equal(actual, expected, check_exact=True, check_names=False)
+            identical = True
+        except AssertionError as e:
+            print(f"{name}: outputs differ\n{e}")
+            identical = False
+
+        results.append({
+            "indicator": name,
+            "loop_seconds": loop_time,
+            "vectorized_seconds": vector_time,
+            "speedup": loop_time / vector_time if vector_time > 0 else float("inf"),
+            "identical": identical,
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized indicators against the loop implementations")
+    parser.add_argument("--bars", type=int, default=1_000_000,
+                       help="Number of synthetic bars to generate")
+    parser.add_argument("--input", default=None,
+                       help="Optional OHLCV parquet to benchmark instead of synthetic bars")
+    parser.add_argument("--repeats", type=int, default=3,
+                       help="Repetitions for the vectorized timing (best is reported)")
+    parser.add_argument("--indicators", nargs="+", default=None,
+                       help="Only benchmark these indicators (e.g. cci rolling_mad/numba)")
+    args = parser.parse_args()
+
+    if args.input:
+        df = pd.read_parquet(args.input).sort_values(["instrument", "ts"]).reset_index(drop=True)
+    else:
+        df = generate_bars(args.bars)
+    print(f"Benchmarking indicators on {len(df)} bars...")
+
+    results = run_benchmark(df, repeats=args.repeats, indicators=args.indicators)
+
+    print(f"\n{'indicator':<20}{'loop (s)':>12}{'vector (s)':>12}{'speedup':>10}  identical")
+    for r in results:
+        print(f"{r['indicator']:<20}{r['loop_seconds']:>12.3f}{r['vectorized_seconds']:>12.4f}"
+              f"{r['speedup']:>9.1f}x  {r['identical']}")
+
+    failed = [r["indicator"] for r in results
+              if not r["identical"] or r["vectorized_seconds"] >= r["loop_seconds"]]
+    if failed:
+        print(f"\nFAILED: {', '.join(failed)}")
+        sys.exit(1)
+
+    print("\nAll vectorized indicators are identical and faster")
+
+
+if __name__ == "__main__":
+    main()
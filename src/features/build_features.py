@@ -1,7 +1,23 @@
 import pandas as pd
 import numpy as np
 import argparse
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from pandas.api.indexers import BaseIndexer
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from features.rolling_kernels import rolling_mean_abs_deviation
+from features.feature_registry import FeatureRegistry
+from data.parquet_io import write_parquet
+from data.arrow_ipc import PYARROW_AVAILABLE, IPC_TMP_ROOT, read_ipc, write_ipc
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
 
 # Optional TA library imports
 try:
@@ -16,169 +32,349 @@ try:
 except ImportError:
     TA_AVAILABLE = False
 
+
+# Raw input columns that are never treated as features
+BASE_COLUMNS = ["ts", "instrument", "open", "high", "low", "close", "volume"]
+
+# Feature columns in the order build_all_features produces them
+FEATURE_COLUMNS = [
+    "hl2", "hlc3", "ohlc4", "returns_1", "returns_5", "log_returns",
+    "volatility_10", "volatility_20", "volatility_50",
+    "sma_5", "sma_9", "sma_21", "sma_50", "sma_100", "sma_200",
+    "ema_9", "ema_21", "ema_50", "sma_9_21_ratio", "ema_9_21_ratio", "price_sma_50_ratio",
+    "rsi_14", "rsi_21", "stoch_k", "stoch_d", "williams_r", "cci",
+    "macd", "macd_signal", "macd_histogram", "roc_10", "roc_20", "momentum_10", "momentum_20",
+    "volume_sma_20", "volume_ratio", "obv", "vpt", "mfi",
+    "bb_upper", "bb_middle", "bb_lower", "bb_width", "bb_position", "atr", "atr_ratio",
+    "vwap_20", "vwap_deviation_20", "vwap_60", "vwap_deviation_60", "vwap_100", "vwap_deviation_100",
+    "pivot", "support_1", "resistance_1", "fractal_high", "fractal_low",
+    "hour", "minute", "day_of_week", "day_of_month", "month",
+    "hour_sin", "hour_cos", "day_sin", "day_cos",
+]
+
+BUILD_MODES = ["stages", "columnar"]
+
+class GroupWindowIndexer(BaseIndexer):
+    """Fixed-size rolling windows that never cross an instrument boundary.
+
+    group_start / group_end hold, for every row, the first and one-past-last
+    row of its instrument in a frame sorted by (instrument, ts).
+    """
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        rows = np.arange(num_values, dtype=np.int64)
+        if self.center:
+            offset = (self.window_size - 1) // 2
+            start = np.maximum(rows - offset, self.group_start)
+            end = np.minimum(rows - offset + self.window_size, self.group_end)
+        else:
+            start = np.maximum(rows - self.window_size + 1, self.group_start)
+            end = rows + 1
+        return start, end
+
+class SeriesOps:
+    """Window operations on a frame holding a single instrument"""
+
+    def rolling(self, series, window, min_periods=None, center=False):
+        return series.rolling(window, min_periods=min_periods, center=center)
+
+    def rolling_kernel(self, series, window, kernel):
+        """Apply a custom rolling kernel(values, window) -> ndarray"""
+        return pd.Series(kernel(series.to_numpy(dtype=float), window), index=series.index)
+
+    def ewm_mean(self, series, span):
+        return series.ewm(span=span).mean()
+
+    def shift(self, series, periods=1):
+        return series.shift(periods)
+
+    def diff(self, series):
+        return series.diff()
+
+    def pct_change(self, series, periods=1):
+        return series.pct_change(periods=periods)
+
+    def cumsum(self, values):
+        return np.cumsum(values)
+
+    def ffill(self, series):
+        return series.ffill()
+
+    def group_starts(self, n):
+        return np.array([0] if n else [], dtype=np.int64)
+
+    def edge_mask(self, n, period):
+        """Rows within `period` bars of either end of their instrument"""
+        mask = np.zeros(n, dtype=bool)
+        mask[:period] = True
+        mask[max(n - period, 0):] = True
+        return mask
+
+class GroupedOps(SeriesOps):
+    """Window operations over many instruments stacked in contiguous row ranges,
+    so each indicator runs once over the whole frame instead of once per instrument"""
+
+    def __init__(self, starts, ends):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        lengths = self.ends - self.starts
+        self.codes = np.repeat(np.arange(len(self.starts)), lengths)
+        self.row_start = np.repeat(self.starts, lengths)
+        self.row_end = np.repeat(self.ends, lengths)
+        self.position = np.arange(len(self.row_start)) - self.row_start
+
+    def rolling(self, series, window, min_periods=None, center=False):
+        indexer = GroupWindowIndexer(window_size=window, group_start=self.row_start,
+                                     group_end=self.row_end, center=center)
+        return series.rolling(indexer, min_periods=window if min_periods is None else min_periods)
+
+    def rolling_kernel(self, series, window, kernel):
+        # Kernels evaluate each window independently, so running over the stacked
+        # frame is exact once windows that reach into the previous instrument are dropped
+        result = super().rolling_kernel(series, window, kernel)
+        return result.where(self.position >= window - 1)
+
+    def ewm_mean(self, series, span):
+        result = series.groupby(self.codes, sort=False).ewm(span=span).mean()
+        return pd.Series(result.to_numpy(), index=series.index)
+
+    def shift(self, series, periods=1):
+        return series.shift(periods).where(self.position >= periods)
+
+    def diff(self, series):
+        return series - self.shift(series)
+
+    def pct_change(self, series, periods=1):
+        return series / self.shift(series, periods) - 1
+
+    def cumsum(self, values):
+        out = np.empty_like(values)
+        for start, end in zip(self.starts, self.ends):
+            np.cumsum(values[start:end], out=out[start:end])
+        return out
+
+    def ffill(self, series):
+        return series.groupby(self.codes, sort=False).ffill()
+
+    def group_starts(self, n):
+        return self.starts
+
+    def edge_mask(self, n, period):
+        return (self.position < period) | (self.row_end - np.arange(n) <= period)
+
+SERIES_OPS = SeriesOps()
+
 class FeatureEngineer:
-    def __init__(self):
+    def __init__(self, build_mode="stages", feature_dtype="float64", group_rolling=False, workers=1):
+        """
+        build_mode: "stages" runs the calculate_* methods one after another on a
+        copied frame; "columnar" writes every indicator straight into one
+        preallocated NumPy block and wraps it into a DataFrame once.
+        feature_dtype: float dtype of the feature block in columnar mode.
+        group_rolling: compute each indicator once over all instruments with
+        group-aware windows instead of looping over instrument slices.
+        workers: number of processes to shard instruments across.
+        """
+        if build_mode not in BUILD_MODES:
+            raise ValueError(f"Unknown build_mode {build_mode!r}, expected one of {BUILD_MODES}")
+        self.build_mode = build_mode
+        self.feature_dtype = np.dtype(feature_dtype)
+        self.group_rolling = group_rolling
+        self.workers = max(1, int(workers))
         self.feature_columns = []
+        self.registry = self._build_registry()
 
-    def calculate_basic_features(self, df):
+    def calculate_basic_features(self, df, ops=SERIES_OPS):
         """Calculate basic technical indicators"""
+        return self._apply_stage(df, self._basic_features, ops)
+
+    def calculate_moving_averages(self, df, ops=SERIES_OPS):
+        """Calculate various moving averages"""
+        return self._apply_stage(df, self._moving_averages, ops)
+
+    def calculate_oscillators(self, df, ops=SERIES_OPS):
+        """Calculate oscillator indicators"""
+        return self._apply_stage(df, self._oscillators, ops)
+
+    def calculate_momentum_indicators(self, df, ops=SERIES_OPS):
+        """Calculate momentum indicators"""
+        return self._apply_stage(df, self._momentum_indicators, ops)
+
+    def calculate_volume_indicators(self, df, ops=SERIES_OPS):
+        """Calculate volume-based indicators"""
+        return self._apply_stage(df, self._volume_indicators, ops)
+
+    def calculate_volatility_indicators(self, df, ops=SERIES_OPS):
+        """Calculate volatility indicators"""
+        return self._apply_stage(df, self._volatility_indicators, ops)
+
+    def calculate_vwap(self, df, ops=SERIES_OPS):
+        """Calculate VWAP and related metrics"""
+        return self._apply_stage(df, self._vwap, ops)
+
+    def calculate_support_resistance(self, df, ops=SERIES_OPS):
+        """Calculate support and resistance levels"""
+        return self._apply_stage(df, self._support_resistance, ops)
+
+    def calculate_time_features(self, df, ops=SERIES_OPS):
+        """Calculate time-based features"""
+        df = self._apply_stage(df, self._time_features, ops)
+        df["ts"] = pd.to_datetime(df["ts"])
+        return df
+
+    def _apply_stage(self, df, stage, ops):
         df = df.copy()
-        
+        for name, values in stage(df, ops):
+            df[name] = values
+        return df
+
+    def _feature_stages(self):
+        return [
+            self._basic_features,
+            self._moving_averages,
+            self._oscillators,
+            self._momentum_indicators,
+            self._volume_indicators,
+            self._volatility_indicators,
+            self._vwap,
+            self._support_resistance,
+            self._time_features,
+        ]
+
+    # Each stage yields (column, values) pairs in output column order
+    def _basic_features(self, df, ops=SERIES_OPS):
         # Price-based features
-        df["hl2"] = (df["high"] + df["low"]) / 2
-        df["hlc3"] = (df["high"] + df["low"] + df["close"]) / 3
-        df["ohlc4"] = (df["open"] + df["high"] + df["low"] + df["close"]) / 4
+        yield "hl2", (df["high"] + df["low"]) / 2
+        yield "hlc3", (df["high"] + df["low"] + df["close"]) / 3
+        yield "ohlc4", (df["open"] + df["high"] + df["low"] + df["close"]) / 4
         
         # Returns
-        df["returns_1"] = df["close"].pct_change()
-        df["returns_5"] = df["close"].pct_change(periods=5)
-        df["log_returns"] = np.log(df["close"] / df["close"].shift(1))
+        returns_1 = ops.pct_change(df["close"])
+        yield "returns_1", returns_1
+        yield "returns_5", ops.pct_change(df["close"], periods=5)
+        yield "log_returns", np.log(df["close"] / ops.shift(df["close"], 1))
         
         # Volatility
-        df["volatility_10"] = df["returns_1"].rolling(10).std()
-        df["volatility_20"] = df["returns_1"].rolling(20).std()
-        df["volatility_50"] = df["returns_1"].rolling(50).std()
-        
-        return df
+        for period in [10, 20, 50]:
+            yield f"volatility_{period}", ops.rolling(returns_1, period).std()
 
-    def calculate_moving_averages(self, df):
-        """Calculate various moving averages"""
-        df = df.copy()
-        
+    def _moving_averages(self, df, ops=SERIES_OPS):
         # Simple Moving Averages
+        sma = {}
         for period in [5, 9, 21, 50, 100, 200]:
-            df[f"sma_{period}"] = df["close"].rolling(period).mean()
+            sma[period] = ops.rolling(df["close"], period).mean()
+            yield f"sma_{period}", sma[period]
         
         # Exponential Moving Averages
+        ema = {}
         for period in [9, 21, 50]:
-            df[f"ema_{period}"] = df["close"].ewm(span=period).mean()
+            ema[period] = ops.ewm_mean(df["close"], period)
+            yield f"ema_{period}", ema[period]
         
         # Moving Average relationships
-        df["sma_9_21_ratio"] = df["sma_9"] / df["sma_21"]
-        df["ema_9_21_ratio"] = df["ema_9"] / df["ema_21"]
-        df["price_sma_50_ratio"] = df["close"] / df["sma_50"]
-        
-        return df
+        yield "sma_9_21_ratio", sma[9] / sma[21]
+        yield "ema_9_21_ratio", ema[9] / ema[21]
+        yield "price_sma_50_ratio", df["close"] / sma[50]
 
-    def calculate_oscillators(self, df):
-        """Calculate oscillator indicators"""
-        df = df.copy()
-        
+    def _oscillators(self, df, ops=SERIES_OPS):
         # RSI
         for period in [14, 21]:
-            df[f"rsi_{period}"] = self._rsi(df["close"], period)
+            yield f"rsi_{period}", self._rsi(df["close"], period, ops)
         
         # Stochastic
-        df["stoch_k"], df["stoch_d"] = self._stochastic(df, 14, 3, 3)
+        stoch_k, stoch_d = self._stochastic(df, 14, 3, 3, ops)
+        yield "stoch_k", stoch_k
+        yield "stoch_d", stoch_d
         
         # Williams %R
-        df["williams_r"] = self._williams_r(df, 14)
+        yield "williams_r", self._williams_r(df, 14, ops)
         
         # CCI
-        df["cci"] = self._cci(df, 20)
-        
-        return df
+        yield "cci", self._cci(df, 20, ops)
 
-    def calculate_momentum_indicators(self, df):
-        """Calculate momentum indicators"""
-        df = df.copy()
-        
+    def _momentum_indicators(self, df, ops=SERIES_OPS):
         # MACD
-        df["macd"], df["macd_signal"], df["macd_histogram"] = self._macd(df["close"])
+        macd, macd_signal, macd_histogram = self._macd(df["close"], ops=ops)
+        yield "macd", macd
+        yield "macd_signal", macd_signal
+        yield "macd_histogram", macd_histogram
         
         # Rate of Change
         for period in [10, 20]:
-            df[f"roc_{period}"] = df["close"].pct_change(periods=period)
+            yield f"roc_{period}", ops.pct_change(df["close"], periods=period)
         
         # Momentum
         for period in [10, 20]:
-            df[f"momentum_{period}"] = df["close"] / df["close"].shift(period)
-        
-        return df
+            yield f"momentum_{period}", df["close"] / ops.shift(df["close"], period)
 
-    def calculate_volume_indicators(self, df):
-        """Calculate volume-based indicators"""
-        df = df.copy()
-        
+    def _volume_indicators(self, df, ops=SERIES_OPS):
         # Volume Moving Averages
-        df["volume_sma_20"] = df["volume"].rolling(20).mean()
-        df["volume_ratio"] = df["volume"] / df["volume_sma_20"]
+        volume_sma_20 = ops.rolling(df["volume"], 20).mean()
+        yield "volume_sma_20", volume_sma_20
+        yield "volume_ratio", df["volume"] / volume_sma_20
         
         # On Balance Volume
-        df["obv"] = self._obv(df)
+        yield "obv", self._obv(df, ops)
         
         # Volume Price Trend
-        df["vpt"] = self._vpt(df)
+        yield "vpt", self._vpt(df, ops)
         
         # Money Flow Index
-        df["mfi"] = self._mfi(df, 14)
-        
-        return df
+        yield "mfi", self._mfi(df, 14, ops)
 
-    def calculate_volatility_indicators(self, df):
-        """Calculate volatility indicators"""
-        df = df.copy()
-        
+    def _volatility_indicators(self, df, ops=SERIES_OPS):
         # Bollinger Bands
-        df["bb_upper"], df["bb_middle"], df["bb_lower"] = self._bollinger_bands(df["close"], 20, 2)
-        df["bb_width"] = (df["bb_upper"] - df["bb_lower"]) / df["bb_middle"]
-        df["bb_position"] = (df["close"] - df["bb_lower"]) / (df["bb_upper"] - df["bb_lower"])
+        bb_upper, bb_middle, bb_lower = self._bollinger_bands(df["close"], 20, 2, ops)
+        yield "bb_upper", bb_upper
+        yield "bb_middle", bb_middle
+        yield "bb_lower", bb_lower
+        yield "bb_width", (bb_upper - bb_lower) / bb_middle
+        yield "bb_position", (df["close"] - bb_lower) / (bb_upper - bb_lower)
         
         # Average True Range
-        df["atr"] = self._atr(df, 14)
-        df["atr_ratio"] = df["atr"] / df["close"]
-        
-        return df
+        atr = self._atr(df, 14, ops)
+        yield "atr", atr
+        yield "atr_ratio", atr / df["close"]
 
-    def calculate_vwap(self, df):
-        """Calculate VWAP and related metrics"""
-        df = df.copy()
-        
+    def _vwap(self, df, ops=SERIES_OPS):
         # Typical price
         typical_price = (df["high"] + df["low"] + df["close"]) / 3
         
         # VWAP for different periods
+        pv = typical_price * df["volume"]
         for period in [20, 60, 100]:
-            pv = typical_price * df["volume"]
-            df[f"vwap_{period}"] = pv.rolling(period).sum() / df["volume"].rolling(period).sum()
-            df[f"vwap_deviation_{period}"] = (df["close"] - df[f"vwap_{period}"]) / df[f"vwap_{period}"]
-        
-        return df
+            vwap = ops.rolling(pv, period).sum() / ops.rolling(df["volume"], period).sum()
+            yield f"vwap_{period}", vwap
+            yield f"vwap_deviation_{period}", (df["close"] - vwap) / vwap
 
-    def calculate_support_resistance(self, df):
-        """Calculate support and resistance levels"""
-        df = df.copy()
-        
+    def _support_resistance(self, df, ops=SERIES_OPS):
         # Pivot points
-        df["pivot"] = (df["high"] + df["low"] + df["close"]) / 3
-        df["support_1"] = 2 * df["pivot"] - df["high"]
-        df["resistance_1"] = 2 * df["pivot"] - df["low"]
+        pivot = (df["high"] + df["low"] + df["close"]) / 3
+        yield "pivot", pivot
+        yield "support_1", 2 * pivot - df["high"]
+        yield "resistance_1", 2 * pivot - df["low"]
         
         # Fractal highs and lows
-        df["fractal_high"] = self._fractal_high(df, 5)
-        df["fractal_low"] = self._fractal_low(df, 5)
-        
-        return df
+        yield "fractal_high", self._fractal_high(df, 5, ops)
+        yield "fractal_low", self._fractal_low(df, 5, ops)
 
-    def calculate_time_features(self, df):
-        """Calculate time-based features"""
-        df = df.copy()
-        df["ts"] = pd.to_datetime(df["ts"])
+    def _time_features(self, df, ops=SERIES_OPS):
+        ts = pd.to_datetime(df["ts"])
         
         # Time components
-        df["hour"] = df["ts"].dt.hour
-        df["minute"] = df["ts"].dt.minute
-        df["day_of_week"] = df["ts"].dt.dayofweek
-        df["day_of_month"] = df["ts"].dt.day
-        df["month"] = df["ts"].dt.month
+        hour = ts.dt.hour
+        day_of_week = ts.dt.dayofweek
+        yield "hour", hour
+        yield "minute", ts.dt.minute
+        yield "day_of_week", day_of_week
+        yield "day_of_month", ts.dt.day
+        yield "month", ts.dt.month
         
         # Cyclical encoding
-        df["hour_sin"] = np.sin(2 * np.pi * df["hour"] / 24)
-        df["hour_cos"] = np.cos(2 * np.pi * df["hour"] / 24)
-        df["day_sin"] = np.sin(2 * np.pi * df["day_of_week"] / 7)
-        df["day_cos"] = np.cos(2 * np.pi * df["day_of_week"] / 7)
-        
-        return df
+        yield "hour_sin", np.sin(2 * np.pi * hour / 24)
+        yield "hour_cos", np.cos(2 * np.pi * hour / 24)
+        yield "day_sin", np.sin(2 * np.pi * day_of_week / 7)
+        yield "day_cos", np.cos(2 * np.pi * day_of_week / 7)
 
     def build_all_features(self, df):
         """Build comprehensive feature set"""
@@ -186,138 +382,406 @@ class FeatureEngineer:
         
         # Sort by timestamp
         df = df.sort_values(["instrument", "ts"]).reset_index(drop=True)
+        if df["instrument"].isna().any():
+            df = df[df["instrument"].notna()].reset_index(drop=True)
         
-        # Apply feature engineering by instrument
-        features_df = []
-        for instrument in df["instrument"].unique():
-            inst_df = df[df["instrument"] == instrument].copy()
-            
-            inst_df = self.calculate_basic_features(inst_df)
-            inst_df = self.calculate_moving_averages(inst_df)
-            inst_df = self.calculate_oscillators(inst_df)
-            inst_df = self.calculate_momentum_indicators(inst_df)
-            inst_df = self.calculate_volume_indicators(inst_df)
-            inst_df = self.calculate_volatility_indicators(inst_df)
-            inst_df = self.calculate_vwap(inst_df)
-            inst_df = self.calculate_support_resistance(inst_df)
-            inst_df = self.calculate_time_features(inst_df)
-            
-            features_df.append(inst_df)
-        
-        result = pd.concat(features_df, ignore_index=True)
+        if self.workers > 1 and df["instrument"].nunique() > 1:
+            result = self._build_parallel(df)
+        else:
+            result = self._build_sorted(df)
         
         # Store feature column names for later use
         self.feature_columns = [col for col in result.columns 
-                               if col not in ["ts", "instrument", "open", "high", "low", "close", "volume"]]
+                               if col not in BASE_COLUMNS]
         
         print(f"Generated {len(self.feature_columns)} features")
         return result
 
+    @staticmethod
+    def instrument_offsets(df):
+        """Start/end row offsets of each instrument in a frame sorted by instrument"""
+        codes, _ = pd.factorize(df["instrument"], sort=False)
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=np.int64)
+        ends = np.r_[starts[1:], len(codes)].astype(np.int64)
+        return starts, ends
+
+    def _build_sorted(self, df):
+        # df must already be sorted by (instrument, ts) with a fresh RangeIndex
+        if self.build_mode == "columnar":
+            return self._build_columnar(df)
+        return self._build_stages(df)
+
+    def _build_parallel(self, df):
+        """Shard contiguous instrument ranges across a process pool.
+
+        The sorted input is written once as an Arrow IPC file that every worker
+        memory-maps; each worker writes its shard's features back as IPC. Shards
+        are concatenated in row order, so the result matches the serial build.
+        """
+        if not PYARROW_AVAILABLE:
+            print("pyarrow not installed, building features serially")
+            return self._build_sorted(df)
+        
+        shards = self._shard_offsets(df, self.workers * 4)
+        config = {
+            "build_mode": self.build_mode,
+            "feature_dtype": self.feature_dtype.name,
+            "group_rolling": self.group_rolling,
+        }
+        
+        with tempfile.TemporaryDirectory(dir=IPC_TMP_ROOT) as tmp_dir:
+            input_path = os.path.join(tmp_dir, "input.arrow")
+            write_ipc(pa.Table.from_pandas(df, preserve_index=False), input_path)
+            
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [
+                    pool.submit(_build_shard, input_path, start, end,
+                                os.path.join(tmp_dir, f"shard_{i}.arrow"), config)
+                    for i, (start, end) in enumerate(shards)
+                ]
+                shard_paths = [future.result() for future in futures]
+            
+            results = [read_ipc(path).to_pandas() for path in shard_paths]
+        
+        return pd.concat(results, ignore_index=True)
+
+    def _shard_offsets(self, df, max_shards):
+        """Group whole instruments into contiguous row ranges of similar size"""
+        starts, ends = self.instrument_offsets(df)
+        n_shards = min(max_shards, len(starts))
+        target = len(df) / n_shards
+        
+        shards = []
+        shard_start = starts[0]
+        for end in ends:
+            if end - shard_start >= target or end == ends[-1]:
+                shards.append((int(shard_start), int(end)))
+                shard_start = end
+        return shards
+
+    def _build_stages(self, df):
+        starts, ends = self.instrument_offsets(df)
+        
+        if self.group_rolling:
+            return self._run_stages(df, GroupedOps(starts, ends))
+        
+        # Apply feature engineering by instrument on contiguous slices
+        features_df = []
+        for start, end in zip(starts, ends):
+            features_df.append(self._run_stages(df.iloc[start:end], SERIES_OPS))
+        
+        return pd.concat(features_df, ignore_index=True)
+
+    def _run_stages(self, df, ops):
+        df = self.calculate_basic_features(df, ops)
+        df = self.calculate_moving_averages(df, ops)
+        df = self.calculate_oscillators(df, ops)
+        df = self.calculate_momentum_indicators(df, ops)
+        df = self.calculate_volume_indicators(df, ops)
+        df = self.calculate_volatility_indicators(df, ops)
+        df = self.calculate_vwap(df, ops)
+        df = self.calculate_support_resistance(df, ops)
+        df = self.calculate_time_features(df, ops)
+        return df
+
+    def _build_columnar(self, df):
+        # One feature-major block for every row so each indicator is a contiguous
+        # write; each instrument fills its own row range
+        block = np.empty((len(FEATURE_COLUMNS), len(df)), dtype=self.feature_dtype)
+        positions = {name: j for j, name in enumerate(FEATURE_COLUMNS)}
+        starts, ends = self.instrument_offsets(df)
+        
+        if self.group_rolling:
+            self._fill_block(df, block, positions, GroupedOps(starts, ends))
+        else:
+            for start, end in zip(starts, ends):
+                self._fill_block(df.iloc[start:end], block[:, start:end], positions, SERIES_OPS)
+        
+        # Wrap without copying the block, then put the raw columns in front.
+        # (pd.concat along columns would copy the whole block.)
+        result = pd.DataFrame(block.T, columns=FEATURE_COLUMNS, index=df.index, copy=False)
+        for i, col in enumerate(df.columns):
+            values = pd.to_datetime(df[col]) if col == "ts" else df[col]
+            result.insert(i, col, values)
+        return result
+
+    def _fill_block(self, df, block, positions, ops):
+        for stage in self._feature_stages():
+            for name, values in stage(df, ops):
+                block[positions[name]] = np.asarray(values, dtype=self.feature_dtype)
+
+    def build_features(self, df, feature_names):
+        """Build only the requested features (and whatever they depend on).
+
+        Returns the input columns followed by feature_names, with the same
+        values build_all_features produces for those columns.
+        """
+        feature_names = list(dict.fromkeys(feature_names))
+        unknown = [name for name in feature_names if name not in self.registry]
+        if unknown:
+            raise KeyError(f"Unknown features: {unknown}")
+
+        df = df.sort_values(["instrument", "ts"]).reset_index(drop=True)
+        if df["instrument"].isna().any():
+            df = df[df["instrument"].notna()].reset_index(drop=True)
+        starts, ends = self.instrument_offsets(df)
+
+        if self.group_rolling:
+            columns = dict(self.registry.evaluate(df, feature_names, GroupedOps(starts, ends)))
+        else:
+            parts = {name: [] for name in feature_names}
+            for start, end in zip(starts, ends):
+                for name, values in self.registry.evaluate(df.iloc[start:end], feature_names, SERIES_OPS):
+                    parts[name].append(values)
+            columns = {name: pd.concat(values, ignore_index=True) if values else pd.Series(dtype=float)
+                       for name, values in parts.items()}
+
+        result = df.drop(columns=[name for name in feature_names if name in df.columns])
+        result["ts"] = pd.to_datetime(result["ts"])
+        features = pd.DataFrame({name: np.asarray(values) for name, values in columns.items()},
+                                index=result.index)
+        return pd.concat([result, features], axis=1)
+
+    def _build_registry(self):
+        """Declare every feature, and the intermediates they share, by its inputs.
+
+        Definitions mirror the stage methods exactly so build_features and
+        build_all_features agree bit for bit.
+        """
+        registry = FeatureRegistry()
+        add = registry.register
+
+        # Shared intermediates
+        add("typical_price", ["high", "low", "close"], lambda high, low, close, ops: (high + low + close) / 3)
+        add("prev_close", ["close"], lambda close, ops: ops.shift(close, 1))
+        add("close_diff", ["close"], lambda close, ops: ops.diff(close))
+        add("money_flow", ["typical_price", "volume"], lambda tp, volume, ops: tp * volume)
+        add("true_range", ["high", "low", "prev_close"], self._true_range)
+        add("highest_high_14", ["high"], lambda high, ops, period: ops.rolling(high, period).max(), period=14)
+        add("lowest_low_14", ["low"], lambda low, ops, period: ops.rolling(low, period).min(), period=14)
+        add("datetime", ["ts"], lambda ts, ops: pd.to_datetime(ts))
+
+        # Basic features
+        add("hl2", ["high", "low"], lambda high, low, ops: (high + low) / 2)
+        add("hlc3", ["typical_price"], lambda tp, ops: tp)
+        add("ohlc4", ["open", "high", "low", "close"],
+            lambda open_, high, low, close, ops: (open_ + high + low + close) / 4)
+        for period in [1, 5]:
+            add(f"returns_{period}", ["close"],
+                lambda close, ops, periods: ops.pct_change(close, periods=periods), periods=period)
+        add("log_returns", ["close", "prev_close"], lambda close, prev_close, ops: np.log(close / prev_close))
+        for period in [10, 20, 50]:
+            add(f"volatility_{period}", ["returns_1"],
+                lambda returns, ops, period: ops.rolling(returns, period).std(), period=period)
+
+        # Moving averages (ema_12 / ema_26 only feed MACD)
+        for period in [5, 9, 21, 50, 100, 200]:
+            add(f"sma_{period}", ["close"], lambda close, ops, period: ops.rolling(close, period).mean(), period=period)
+        for period in [9, 12, 21, 26, 50]:
+            add(f"ema_{period}", ["close"], lambda close, ops, span: ops.ewm_mean(close, span), span=period)
+        add("sma_9_21_ratio", ["sma_9", "sma_21"], lambda fast, slow, ops: fast / slow)
+        add("ema_9_21_ratio", ["ema_9", "ema_21"], lambda fast, slow, ops: fast / slow)
+        add("price_sma_50_ratio", ["close", "sma_50"], lambda close, sma, ops: close / sma)
+
+        # Oscillators
+        for period in [14, 21]:
+            add(f"rsi_{period}", ["close"], self._rsi, window=period)
+        add("stoch_k", ["close", "highest_high_14", "lowest_low_14"], self._stochastic_k, k_slowing=3)
+        add("stoch_d", ["stoch_k"], lambda k, ops, period: ops.rolling(k, period).mean(), period=3)
+        add("williams_r", ["close", "highest_high_14", "lowest_low_14"],
+            lambda close, hh, ll, ops: -100 * (hh - close) / (hh - ll))
+        add("cci", ["typical_price"], self._cci_from_typical_price, period=20)
+
+        # Momentum
+        add("macd", ["ema_12", "ema_26"], lambda fast, slow, ops: fast - slow)
+        add("macd_signal", ["macd"], lambda macd, ops, signal: ops.ewm_mean(macd, signal), signal=9)
+        add("macd_histogram", ["macd", "macd_signal"], lambda macd, signal, ops: macd - signal)
+        for period in [10, 20]:
+            add(f"roc_{period}", ["close"],
+                lambda close, ops, periods: ops.pct_change(close, periods=periods), periods=period)
+            add(f"momentum_{period}", ["close"],
+                lambda close, ops, periods: close / ops.shift(close, periods), periods=period)
+
+        # Volume
+        add("volume_sma_20", ["volume"], lambda volume, ops, period: ops.rolling(volume, period).mean(), period=20)
+        add("volume_ratio", ["volume", "volume_sma_20"], lambda volume, sma, ops: volume / sma)
+        add("obv", ["close_diff", "volume"], self._obv_from_diff)
+        add("vpt", ["close_diff", "prev_close", "volume"], self._vpt_from_diff)
+        add("mfi", ["typical_price", "money_flow"], self._mfi_from_flow, period=14)
+
+        # Volatility
+        add("bb_middle", ["close"], lambda close, ops, period: ops.rolling(close, period).mean(), period=20)
+        add("bb_std", ["close"], lambda close, ops, period: ops.rolling(close, period).std(), period=20)
+        add("bb_upper", ["bb_middle", "bb_std"], lambda middle, std_dev, ops, std: middle + (std_dev * std), std=2)
+        add("bb_lower", ["bb_middle", "bb_std"], lambda middle, std_dev, ops, std: middle - (std_dev * std), std=2)
+        add("bb_width", ["bb_upper", "bb_middle", "bb_lower"], lambda upper, middle, lower, ops: (upper - lower) / middle)
+        add("bb_position", ["close", "bb_upper", "bb_lower"],
+            lambda close, upper, lower, ops: (close - lower) / (upper - lower))
+        add("atr", ["true_range"], lambda true_range, ops, period: ops.rolling(true_range, period).mean(), period=14)
+        add("atr_ratio", ["atr", "close"], lambda atr, close, ops: atr / close)
+
+        # VWAP
+        for period in [20, 60, 100]:
+            add(f"vwap_{period}", ["money_flow", "volume"],
+                lambda pv, volume, ops, period: ops.rolling(pv, period).sum() / ops.rolling(volume, period).sum(),
+                period=period)
+            add(f"vwap_deviation_{period}", ["close", f"vwap_{period}"], lambda close, vwap, ops: (close - vwap) / vwap)
+
+        # Support and resistance
+        add("pivot", ["typical_price"], lambda tp, ops: tp)
+        add("support_1", ["pivot", "high"], lambda pivot, high, ops: 2 * pivot - high)
+        add("resistance_1", ["pivot", "low"], lambda pivot, low, ops: 2 * pivot - low)
+        add("fractal_high", ["high"], self._fractal_level, period=5, extreme="max")
+        add("fractal_low", ["low"], self._fractal_level, period=5, extreme="min")
+
+        # Time
+        for name, field in [("hour", "hour"), ("minute", "minute"), ("day_of_week", "dayofweek"),
+                            ("day_of_month", "day"), ("month", "month")]:
+            add(name, ["datetime"], lambda ts, ops, field: getattr(ts.dt, field), field=field)
+        add("hour_sin", ["hour"], lambda hour, ops: np.sin(2 * np.pi * hour / 24))
+        add("hour_cos", ["hour"], lambda hour, ops: np.cos(2 * np.pi * hour / 24))
+        add("day_sin", ["day_of_week"], lambda day, ops: np.sin(2 * np.pi * day / 7))
+        add("day_cos", ["day_of_week"], lambda day, ops: np.cos(2 * np.pi * day / 7))
+
+        return registry
+
     # Helper methods for technical indicators
-    def _rsi(self, series, window=14):
-        delta = series.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+    def _rsi(self, series, window=14, ops=SERIES_OPS):
+        delta = ops.diff(series)
+        gain = ops.rolling(delta.where(delta > 0, 0), window).mean()
+        loss = ops.rolling(-delta.where(delta < 0, 0), window).mean()
         rs = gain / loss
         return 100 - (100 / (1 + rs))
 
-    def _stochastic(self, df, k_period=14, k_slowing=3, d_period=3):
-        lowest_low = df["low"].rolling(k_period).min()
-        highest_high = df["high"].rolling(k_period).max()
-        k_percent = 100 * ((df["close"] - lowest_low) / (highest_high - lowest_low))
-        k_percent = k_percent.rolling(k_slowing).mean()
-        d_percent = k_percent.rolling(d_period).mean()
+    def _stochastic(self, df, k_period=14, k_slowing=3, d_period=3, ops=SERIES_OPS):
+        lowest_low = ops.rolling(df["low"], k_period).min()
+        highest_high = ops.rolling(df["high"], k_period).max()
+        k_percent = self._stochastic_k(df["close"], highest_high, lowest_low, ops, k_slowing)
+        d_percent = ops.rolling(k_percent, d_period).mean()
         return k_percent, d_percent
 
-    def _williams_r(self, df, period=14):
-        highest_high = df["high"].rolling(period).max()
-        lowest_low = df["low"].rolling(period).min()
+    def _stochastic_k(self, close, highest_high, lowest_low, ops=SERIES_OPS, k_slowing=3):
+        k_percent = 100 * ((close - lowest_low) / (highest_high - lowest_low))
+        return ops.rolling(k_percent, k_slowing).mean()
+
+    def _williams_r(self, df, period=14, ops=SERIES_OPS):
+        highest_high = ops.rolling(df["high"], period).max()
+        lowest_low = ops.rolling(df["low"], period).min()
         return -100 * (highest_high - df["close"]) / (highest_high - lowest_low)
 
-    def _cci(self, df, period=20):
+    def _cci(self, df, period=20, ops=SERIES_OPS):
         typical_price = (df["high"] + df["low"] + df["close"]) / 3
-        sma = typical_price.rolling(period).mean()
-        mad = typical_price.rolling(period).apply(lambda x: np.mean(np.abs(x - x.mean())))
+        return self._cci_from_typical_price(typical_price, ops, period)
+
+    def _cci_from_typical_price(self, typical_price, ops=SERIES_OPS, period=20):
+        sma = ops.rolling(typical_price, period).mean()
+        mad = ops.rolling_kernel(typical_price, period, rolling_mean_abs_deviation)
         return (typical_price - sma) / (0.015 * mad)
 
-    def _macd(self, series, fast=12, slow=26, signal=9):
-        exp1 = series.ewm(span=fast).mean()
-        exp2 = series.ewm(span=slow).mean()
+    def _macd(self, series, fast=12, slow=26, signal=9, ops=SERIES_OPS):
+        exp1 = ops.ewm_mean(series, fast)
+        exp2 = ops.ewm_mean(series, slow)
         macd = exp1 - exp2
-        macd_signal = macd.ewm(span=signal).mean()
+        macd_signal = ops.ewm_mean(macd, signal)
         macd_histogram = macd - macd_signal
         return macd, macd_signal, macd_histogram
 
-    def _obv(self, df):
-        obv = [0]
-        for i in range(1, len(df)):
-            if df["close"].iloc[i] > df["close"].iloc[i-1]:
-                obv.append(obv[-1] + df["volume"].iloc[i])
-            elif df["close"].iloc[i] < df["close"].iloc[i-1]:
-                obv.append(obv[-1] - df["volume"].iloc[i])
-            else:
-                obv.append(obv[-1])
-        return pd.Series(obv, index=df.index)
-
-    def _vpt(self, df):
-        vpt = [0]
-        for i in range(1, len(df)):
-            vpt.append(vpt[-1] + df["volume"].iloc[i] * 
-                      (df["close"].iloc[i] - df["close"].iloc[i-1]) / df["close"].iloc[i-1])
-        return pd.Series(vpt, index=df.index)
-
-    def _mfi(self, df, period=14):
+    def _obv(self, df, ops=SERIES_OPS):
+        return self._obv_from_diff(ops.diff(df["close"]), df["volume"], ops)
+
+    def _obv_from_diff(self, close_diff, volume, ops=SERIES_OPS):
+        direction = (close_diff > 0).astype(int) - (close_diff < 0).astype(int)
+        signed_volume = (direction * volume).to_numpy()
+        return pd.Series(ops.cumsum(signed_volume), index=volume.index)
+
+    def _vpt(self, df, ops=SERIES_OPS):
+        close = df["close"]
+        return self._vpt_from_diff(ops.diff(close), ops.shift(close, 1), df["volume"], ops)
+
+    def _vpt_from_diff(self, close_diff, prev_close, volume, ops=SERIES_OPS):
+        increments = (volume * close_diff / prev_close).to_numpy(dtype=float)
+        increments[ops.group_starts(len(increments))] = 0.0
+        # np.cumsum (unlike Series.cumsum) propagates NaN the way the running total does
+        return pd.Series(ops.cumsum(increments), index=volume.index)
+
+    def _mfi(self, df, period=14, ops=SERIES_OPS):
         typical_price = (df["high"] + df["low"] + df["close"]) / 3
-        money_flow = typical_price * df["volume"]
+        return self._mfi_from_flow(typical_price, typical_price * df["volume"], ops, period)
+
+    def _mfi_from_flow(self, typical_price, money_flow, ops=SERIES_OPS, period=14):
+        prev_typical_price = ops.shift(typical_price, 1)
         
-        positive_flow = money_flow.where(typical_price > typical_price.shift(1), 0)
-        negative_flow = money_flow.where(typical_price < typical_price.shift(1), 0)
+        positive_flow = money_flow.where(typical_price > prev_typical_price, 0)
+        negative_flow = money_flow.where(typical_price < prev_typical_price, 0)
         
-        positive_mf = positive_flow.rolling(period).sum()
-        negative_mf = negative_flow.rolling(period).sum()
+        positive_mf = ops.rolling(positive_flow, period).sum()
+        negative_mf = ops.rolling(negative_flow, period).sum()
         
         mfr = positive_mf / negative_mf
         return 100 - (100 / (1 + mfr))
 
-    def _bollinger_bands(self, series, period=20, std=2):
-        middle = series.rolling(period).mean()
-        std_dev = series.rolling(period).std()
+    def _bollinger_bands(self, series, period=20, std=2, ops=SERIES_OPS):
+        middle = ops.rolling(series, period).mean()
+        std_dev = ops.rolling(series, period).std()
         upper = middle + (std_dev * std)
         lower = middle - (std_dev * std)
         return upper, middle, lower
 
-    def _atr(self, df, period=14):
-        high_low = df["high"] - df["low"]
-        high_close = np.abs(df["high"] - df["close"].shift())
-        low_close = np.abs(df["low"] - df["close"].shift())
-        
-        true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        return true_range.rolling(period).mean()
+    def _atr(self, df, period=14, ops=SERIES_OPS):
+        true_range = self._true_range(df["high"], df["low"], ops.shift(df["close"], 1))
+        return ops.rolling(true_range, period).mean()
 
-    def _fractal_high(self, df, period=5):
-        highs = df["high"]
-        fractal_high = pd.Series(index=df.index, dtype=float)
-        
-        for i in range(period, len(df) - period):
-            if highs.iloc[i] == highs.iloc[i-period:i+period+1].max():
-                fractal_high.iloc[i] = highs.iloc[i]
-        
-        return fractal_high.fillna(method="ffill")
+    def _true_range(self, high, low, prev_close, ops=SERIES_OPS):
+        high_low = high - low
+        high_close = np.abs(high - prev_close)
+        low_close = np.abs(low - prev_close)
+        return pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
 
-    def _fractal_low(self, df, period=5):
-        lows = df["low"]
-        fractal_low = pd.Series(index=df.index, dtype=float)
-        
-        for i in range(period, len(df) - period):
-            if lows.iloc[i] == lows.iloc[i-period:i+period+1].min():
-                fractal_low.iloc[i] = lows.iloc[i]
-        
-        return fractal_low.fillna(method="ffill")
+    def _fractal_high(self, df, period=5, ops=SERIES_OPS):
+        return self._fractal_level(df["high"], ops, period, "max")
+
+    def _fractal_low(self, df, period=5, ops=SERIES_OPS):
+        return self._fractal_level(df["low"], ops, period, "min")
+
+    def _fractal_level(self, values, ops=SERIES_OPS, period=5, extreme="max"):
+        """Last fractal high (extreme="max") or low (extreme="min"), carried forward"""
+        window = ops.rolling(values, 2 * period + 1, min_periods=1, center=True)
+        window_extreme = window.max() if extreme == "max" else window.min()
+        is_fractal = self._fractal_mask(values, window_extreme, period, ops)
+        return ops.ffill(pd.Series(np.where(is_fractal, values, np.nan), index=values.index))
+
+    def _fractal_mask(self, values, window_extreme, period, ops=SERIES_OPS):
+        # A bar is a fractal when it equals the extreme of the centered window;
+        # bars without a full window on both sides are never fractals.
+        is_fractal = (values == window_extreme).to_numpy()
+        is_fractal[ops.edge_mask(len(values), period)] = False
+        return is_fractal
+
+def _build_shard(input_path, start, end, output_path, config):
+    """Process-pool worker: build features for rows [start, end) of the shared input"""
+    table = read_ipc(input_path).slice(start, end - start)
+    df = table.to_pandas()
+    
+    engineer = FeatureEngineer(**config)
+    result = engineer._build_sorted(df)
+    
+    write_ipc(pa.Table.from_pandas(result, preserve_index=False), output_path)
+    return output_path
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--input", default="data/sample_5m.parquet")
     parser.add_argument("--output", default="data/features.parquet")
+    parser.add_argument("--mode", default="stages", choices=BUILD_MODES,
+                       help="Feature build mode")
+    parser.add_argument("--dtype", default="float64", choices=["float32", "float64"],
+                       help="Feature dtype for the columnar build mode")
+    parser.add_argument("--group-rolling", action="store_true",
+                       help="Compute indicators across all instruments at once with group-aware windows")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Number of worker processes to shard instruments across")
+    parser.add_argument("--compact", action="store_true",
+                       help="Write float32 features with a dictionary-encoded instrument and ms timestamps")
     args = parser.parse_args()
     
     # Load data
@@ -325,12 +789,13 @@ def main():
     print(f"Loaded {len(df)} rows from {args.input}")
     
     # Build features
-    engineer = FeatureEngineer()
+    engineer = FeatureEngineer(build_mode=args.mode, feature_dtype=args.dtype,
+                               group_rolling=args.group_rolling, workers=args.workers)
     features_df = engineer.build_all_features(df)
     
     # Save features
     Path(args.output).parent.mkdir(parents=True, exist_ok=True)
-    features_df.to_parquet(args.output, index=False)
+    write_parquet(features_df, args.output, compact=args.compact)
     print(f"Saved features to {args.output}")
     
     # Print feature summary
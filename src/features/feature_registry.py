@@ -0,0 +1,67 @@
+class FeatureSpec:
+    """A named feature or intermediate: the columns it reads and how to compute it"""
+
+    def __init__(self, name, inputs, compute, params=None):
+        self.name = name
+        self.inputs = list(inputs)
+        self.compute = compute
+        self.params = params or {}
+
+
+class FeatureRegistry:
+    """Declarative feature definitions evaluated lazily over their dependency DAG.
+
+    Each spec lists its inputs by name; an input is either another registered
+    spec (feature or shared intermediate such as typical price) or a raw
+    column of the frame. compute is called as
+    compute(*input_values, ops=ops, **params).
+    """
+
+    def __init__(self):
+        self.specs = {}
+
+    def register(self, name, inputs, compute, **params):
+        if name in self.specs:
+            raise ValueError(f"Feature {name!r} is already registered")
+        self.specs[name] = FeatureSpec(name, inputs, compute, params)
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def dependencies(self, names):
+        """Every registered spec the given names need, in evaluation order"""
+        order = []
+        visiting = set()
+
+        def visit(name):
+            spec = self.specs.get(name)
+            if spec is None or name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through feature {name!r}")
+            visiting.add(name)
+            for dep in spec.inputs:
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in names:
+            visit(name)
+        return order
+
+    def evaluate(self, df, names, ops):
+        """Yield (name, values) for the requested names, computing each
+        dependency once and nothing that is not needed"""
+        values = {}
+        for name in self.dependencies(names):
+            spec = self.specs[name]
+            args = [values[dep] if dep in values else self._column(df, dep, name) for dep in spec.inputs]
+            values[name] = spec.compute(*args, ops=ops, **spec.params)
+
+        for name in names:
+            yield name, values[name] if name in values else self._column(df, name, name)
+
+    def _column(self, df, column, requested_by):
+        if column not in df.columns:
+            raise KeyError(f"Unknown feature or column {column!r} (needed for {requested_by!r})")
+        return df[column]
@@ -0,0 +1,238 @@
+import pandas as pd
+import hashlib
+import os
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import quote
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from features.build_features import FeatureEngineer, BASE_COLUMNS
+
+# Bump whenever an indicator definition or FEATURE_COLUMNS changes so stale
+# cache entries are never served
+FEATURE_SET_VERSION = "1"
+
+# Running totals: a tail rebuild starts them from zero, so they are shifted
+# back onto the cached series
+CUMULATIVE_FEATURES = ["obv", "vpt"]
+
+# Forward-filled levels: a tail rebuild may not see the last level set before
+# the warmup window, so it is carried over from the cached series
+CARRIED_FEATURES = ["fractal_high", "fractal_low"]
+
+# Fractals look this many bars ahead, so the newest cached rows change when
+# bars are appended and are always recomputed
+LOOKAHEAD_BARS = 5
+
+
+class FeatureStore:
+    """Shared cache of computed features.
+
+    Entries are keyed by (instrument, timeframe, feature-set version, data
+    hash), where the data hash covers the raw OHLCV rows the features were
+    built from. Entries are persisted as parquet files partitioned by
+    version/timeframe/instrument and the most recently used frames are kept in
+    memory. When a request extends a cached series with new bars, only the
+    tail is rebuilt (with a warmup window for the indicators' lookback).
+
+    Callers that pass a sliding window (the last N bars) never extend a
+    cached series, so every call is a new entry; they should use
+    persist=False. max_entries caps the entries kept per instrument and
+    timeframe, in memory and on disk, so superseded windows do not pile up.
+    """
+
+    def __init__(self, root="data/feature_store", feature_engineer=None,
+                 max_memory_mb=512, warmup_bars=1000, persist=True, max_entries=8):
+        self.root = Path(root)
+        self.feature_engineer = feature_engineer or FeatureEngineer()
+        self.max_memory_bytes = int(max_memory_mb * 1024 ** 2)
+        self.warmup_bars = warmup_bars
+        self.persist = persist
+        self.max_entries = max_entries
+        self.version = f"{FEATURE_SET_VERSION}-{self.feature_engineer.feature_dtype.name}"
+        self.feature_columns = []
+
+        # key -> features frame, least recently used first
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        # (instrument, timeframe) -> key of the longest series seen so far
+        self._latest = {}
+
+        self.stats = {"hits": 0, "disk_hits": 0, "tail_updates": 0, "full_builds": 0, "evictions": 0}
+
+    def get_features(self, df, timeframe="5m"):
+        """Features for every instrument in df, as FeatureEngineer.build_all_features returns them"""
+        df = df.sort_values(["instrument", "ts"]).reset_index(drop=True)
+        if df["instrument"].isna().any():
+            df = df[df["instrument"].notna()].reset_index(drop=True)
+
+        starts, ends = self.feature_engineer.instrument_offsets(df)
+        frames = [
+            self.get_instrument_features(df["instrument"].iat[start], df.iloc[start:end], timeframe)
+            for start, end in zip(starts, ends)
+        ]
+        if not frames:
+            return self.feature_engineer.build_all_features(df)
+
+        result = pd.concat(frames, ignore_index=True)
+
+        # Entries only hold the OHLCV inputs; put the caller's other columns
+        # back where build_all_features keeps them (rows line up after the sort)
+        extra = [col for col in df.columns if col not in BASE_COLUMNS]
+        if extra:
+            features = [col for col in result.columns if col not in df.columns]
+            result = pd.concat([result, df[extra]], axis=1)[list(df.columns) + features]
+
+        self.feature_columns = [col for col in result.columns if col not in BASE_COLUMNS]
+        self.feature_engineer.feature_columns = self.feature_columns
+        return result
+
+    def get_instrument_features(self, instrument, df, timeframe="5m"):
+        """Features for one instrument's bars (sorted by ts).
+
+        Only the raw OHLCV columns are used (in the caller's column order);
+        get_features re-attaches any others. The returned frame is shared
+        with the cache and must not be modified.
+        """
+        raw = df[[col for col in df.columns if col in BASE_COLUMNS]].reset_index(drop=True)
+        row_hashes = pd.util.hash_pandas_object(raw, index=False).to_numpy()
+        key = (instrument, timeframe, self.version, self._digest(row_hashes))
+
+        features = self._lookup(key)
+        if features is not None:
+            return features
+
+        # Extend the longest cached series this data starts with, if any
+        base_key = self._find_prefix(instrument, timeframe, row_hashes)
+        base = self._lookup(base_key) if base_key is not None else None
+        if base is not None and len(base) > LOOKAHEAD_BARS:
+            features = self._append_tail(raw, base)
+            self.stats["tail_updates"] += 1
+        else:
+            features = self._build(raw)
+            self.stats["full_builds"] += 1
+
+        self._store(key, features, len(raw), superseded=base_key)
+        return features
+
+    def invalidate(self, instrument=None):
+        """Drop in-memory entries (for one instrument or all); parquet files are kept"""
+        for key in [k for k in self._cache if instrument is None or k[0] == instrument]:
+            self._evict(key)
+        self._latest = {k: v for k, v in self._latest.items()
+                        if instrument is not None and k[0] != instrument}
+
+    def _digest(self, row_hashes):
+        return hashlib.blake2b(row_hashes.tobytes(), digest_size=16).hexdigest()
+
+    def _partition(self, instrument, timeframe):
+        # Quote the instrument so symbols like BTC/USDT stay a single directory
+        return (self.root / f"version={self.version}" / f"timeframe={timeframe}"
+                / f"instrument={quote(str(instrument), safe='')}")
+
+    def _path(self, key, n_rows):
+        instrument, timeframe, _, data_hash = key
+        # Row count in the file name lets prefix lookups skip reading the files
+        return self._partition(instrument, timeframe) / f"{n_rows}_{data_hash}.parquet"
+
+    def _lookup(self, key):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return self._cache[key]
+
+        if self.persist:
+            for path in self._partition(key[0], key[1]).glob(f"*_{key[3]}.parquet"):
+                features = pd.read_parquet(path)
+                self.stats["disk_hits"] += 1
+                self._remember(key, features)
+                return features
+        return None
+
+    def _find_prefix(self, instrument, timeframe, row_hashes):
+        """Key of the longest cached series whose raw bars are a prefix of row_hashes"""
+        candidates = []
+        latest = self._latest.get((instrument, timeframe))
+        if latest is not None:
+            candidates.append((latest[1], latest[0]))
+
+        if self.persist:
+            for path in self._partition(instrument, timeframe).glob("*.parquet"):
+                n_rows, data_hash = path.stem.split("_", 1)
+                candidates.append((int(n_rows), (instrument, timeframe, self.version, data_hash)))
+
+        for n_rows, key in sorted(candidates, key=lambda c: c[0], reverse=True):
+            if n_rows < len(row_hashes) and self._digest(row_hashes[:n_rows]) == key[3]:
+                return key
+        return None
+
+    def _build(self, raw):
+        return self.feature_engineer._build_sorted(raw)
+
+    def _append_tail(self, raw, base):
+        """Rebuild only the bars after the cached series plus its provisional rows"""
+        anchor = len(base) - LOOKAHEAD_BARS
+        start = max(anchor - self.warmup_bars, 0)
+        tail = self._build(raw.iloc[start:].reset_index(drop=True))
+
+        if start > 0:
+            overlap = anchor - 1 - start
+            for col in CUMULATIVE_FEATURES:
+                tail[col] += base[col].iat[anchor - 1] - tail[col].iat[overlap]
+            for col in CARRIED_FEATURES:
+                tail[col] = tail[col].fillna(base[col].iat[anchor - 1])
+
+        return pd.concat([base.iloc[:anchor], tail.iloc[anchor - start:]], ignore_index=True)
+
+    def _store(self, key, features, n_rows, superseded=None):
+        if self.persist:
+            path = self._path(key, n_rows)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            features.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+
+            # The extended series replaces its prefix on disk
+            if superseded is not None:
+                for old in self._partition(key[0], key[1]).glob(f"*_{superseded[3]}.parquet"):
+                    old.unlink(missing_ok=True)
+            self._trim_partition(key[0], key[1], keep=path)
+
+        if superseded is not None and superseded in self._cache:
+            self._evict(superseded)
+        self._latest[(key[0], key[1])] = (key, n_rows)
+        self._remember(key, features)
+
+        # Drop the least recently used entries of this series beyond max_entries
+        series_keys = [k for k in self._cache if k[:2] == key[:2]]
+        for old_key in series_keys[:max(len(series_keys) - self.max_entries, 0)]:
+            self._evict(old_key)
+            self.stats["evictions"] += 1
+
+    def _trim_partition(self, instrument, timeframe, keep):
+        """Delete the oldest files of a partition beyond max_entries"""
+        paths = []
+        for path in self._partition(instrument, timeframe).glob("*.parquet"):
+            try:
+                paths.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:
+                continue  # Removed by another process meanwhile
+        paths = [path for _, path in sorted(paths) if path != keep]
+        for old in paths[:max(len(paths) + 1 - self.max_entries, 0)]:
+            old.unlink(missing_ok=True)
+
+    def _remember(self, key, features):
+        self._cache[key] = features
+        self._cache_bytes += features.memory_usage(deep=False).sum()
+        # Keep at least the newest entry even if it alone exceeds the budget
+        while self._cache_bytes > self.max_memory_bytes and len(self._cache) > 1:
+            self._evict(next(iter(self._cache)))
+            self.stats["evictions"] += 1
+
+    def _evict(self, key):
+        features = self._cache.pop(key)
+        self._cache_bytes -= features.memory_usage(deep=False).sum()
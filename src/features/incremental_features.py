@@ -0,0 +1,479 @@
+import pandas as pd
+import numpy as np
+import math
+import sys
+import os
+from collections import deque
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from features.build_features import FEATURE_COLUMNS
+
+NAN = float("nan")
+
+
+def _div(a, b):
+    """Float division with the inf/nan semantics of a vectorized pandas division"""
+    if b == 0:
+        if a == 0 or a != a:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _max_skipna(*values):
+    valid = [v for v in values if not math.isnan(v)]
+    return max(valid) if valid else NAN
+
+
+class _RollingSum:
+    """Fixed-window rolling sum using the same compensated add/remove as pandas"""
+
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque()
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def _add(self, val):
+        if val == val:
+            self.nobs += 1
+            y = val - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if val == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = val
+
+    def _remove(self, val):
+        if val == val:
+            self.nobs -= 1
+            y = -val - self.compensation_remove
+            t = self.sum_x + y
+            self.compensation_remove = t - self.sum_x - y
+            self.sum_x = t
+
+    def push(self, val):
+        val = float(val)
+        if self.prev_value is None:
+            self.prev_value = val
+        self.values.append(val)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(val)
+
+    def value(self):
+        if self.nobs == 0 == self.min_periods:
+            return 0.0
+        if self.nobs >= self.min_periods:
+            if self.num_consecutive_same_value >= self.nobs:
+                return self.prev_value * self.nobs
+            return self.sum_x
+        return NAN
+
+    def update(self, val):
+        self.push(val)
+        return self.value()
+
+
+class _RollingMean(_RollingSum):
+    """Fixed-window rolling mean matching pandas' rolling().mean()"""
+
+    def __init__(self, window, min_periods=None):
+        super().__init__(window, min_periods)
+        self.neg_ct = 0
+
+    def _add(self, val):
+        super()._add(val)
+        if val == val and math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+
+    def _remove(self, val):
+        super()._remove(val)
+        if val == val and math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def value(self):
+        if self.nobs >= self.min_periods and self.nobs > 0:
+            result = self.sum_x / self.nobs
+            if self.num_consecutive_same_value >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.0
+            return result
+        return NAN
+
+
+class _RollingStd:
+    """Fixed-window rolling sample standard deviation (Welford, as in pandas)"""
+
+    def __init__(self, window, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self.values = deque()
+        self.nobs = 0.0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def _add(self, val):
+        if val != val:
+            return
+        if val == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = val
+
+        self.nobs += 1
+        prev_mean = self.mean_x - self.compensation_add
+        y = val - self.compensation_add
+        t = y - self.mean_x
+        self.compensation_add = t + self.mean_x - y
+        self.mean_x = self.mean_x + t / self.nobs
+        self.ssqdm_x = self.ssqdm_x + (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val):
+        if val == val:
+            self.nobs -= 1
+            if self.nobs:
+                prev_mean = self.mean_x - self.compensation_remove
+                y = val - self.compensation_remove
+                t = y - self.mean_x
+                self.compensation_remove = t + self.mean_x - y
+                self.mean_x = self.mean_x - t / self.nobs
+                self.ssqdm_x = self.ssqdm_x - (val - prev_mean) * (val - self.mean_x)
+            else:
+                self.mean_x = 0.0
+                self.ssqdm_x = 0.0
+
+    def update(self, val):
+        val = float(val)
+        if self.prev_value is None:
+            self.prev_value = val
+        self.values.append(val)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(val)
+
+        if self.nobs >= self.window and self.nobs > self.ddof:
+            if self.nobs == 1 or self.num_consecutive_same_value >= self.nobs:
+                return 0.0
+            var = self.ssqdm_x / (self.nobs - self.ddof)
+            return math.sqrt(var) if var > 0 else 0.0
+        return NAN
+
+
+class _RollingExtreme:
+    """Rolling max/min over a fixed window using a monotonic deque (amortized O(1))"""
+
+    def __init__(self, window, is_max=True, min_periods=None):
+        self.window = window
+        self.is_max = is_max
+        self.min_periods = window if min_periods is None else min_periods
+        self.candidates = deque()  # (position, value), monotonic in value
+        self.valid = deque()       # 1 for each non-NaN value in the window
+        self.nobs = 0
+        self.position = -1
+
+    def update(self, val):
+        val = float(val)
+        self.position += 1
+
+        self.valid.append(val == val)
+        self.nobs += val == val
+        if len(self.valid) > self.window:
+            self.nobs -= self.valid.popleft()
+
+        while self.candidates and self.candidates[0][0] <= self.position - self.window:
+            self.candidates.popleft()
+        if val == val:
+            if self.is_max:
+                while self.candidates and self.candidates[-1][1] <= val:
+                    self.candidates.pop()
+            else:
+                while self.candidates and self.candidates[-1][1] >= val:
+                    self.candidates.pop()
+            self.candidates.append((self.position, val))
+
+        if self.nobs >= self.min_periods and self.candidates:
+            return self.candidates[0][1]
+        return NAN
+
+
+class _EWMMean:
+    """Adjusted exponentially weighted mean matching pandas' ewm(span=...).mean()"""
+
+    def __init__(self, span):
+        com = (span - 1) / 2.0
+        alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = 1.0
+        self.weighted = None
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, cur):
+        cur = float(cur)
+        is_observation = cur == cur
+        if self.weighted is None:
+            self.weighted = cur
+            self.nobs = int(is_observation)
+        else:
+            self.nobs += is_observation
+            if self.weighted == self.weighted:
+                self.old_wt *= self.old_wt_factor
+                if is_observation:
+                    # avoid numerical errors on constant series
+                    if self.weighted != cur:
+                        self.weighted = self.old_wt * self.weighted + self.new_wt * cur
+                        self.weighted /= (self.old_wt + self.new_wt)
+                    self.old_wt += self.new_wt
+            elif is_observation:
+                self.weighted = cur
+        return self.weighted if self.nobs >= 1 else NAN
+
+
+class _InstrumentState:
+    """Rolling state for one instrument"""
+
+    def __init__(self):
+        self.bars = 0
+        self.closes = deque(maxlen=21)  # enough history for roc_20 / momentum_20
+        self.prev_typical = NAN
+
+        self.volatility = {p: _RollingStd(p) for p in [10, 20, 50]}
+        self.sma = {p: _RollingMean(p) for p in [5, 9, 21, 50, 100, 200]}
+        self.ema = {p: _EWMMean(p) for p in [9, 21, 50]}
+
+        self.rsi_gain = {p: _RollingMean(p) for p in [14, 21]}
+        self.rsi_loss = {p: _RollingMean(p) for p in [14, 21]}
+        self.lowest_low_14 = _RollingExtreme(14, is_max=False)
+        self.highest_high_14 = _RollingExtreme(14, is_max=True)
+        self.stoch_k = _RollingMean(3)
+        self.stoch_d = _RollingMean(3)
+        self.cci_window = deque(maxlen=20)
+        self.cci_sma = _RollingMean(20)
+
+        self.macd_fast = _EWMMean(12)
+        self.macd_slow = _EWMMean(26)
+        self.macd_signal = _EWMMean(9)
+
+        self.volume_sma_20 = _RollingMean(20)
+        self.obv = 0.0
+        self.vpt = 0.0
+        self.mfi_positive = _RollingSum(14)
+        self.mfi_negative = _RollingSum(14)
+
+        self.bb_middle = _RollingMean(20)
+        self.bb_std = _RollingStd(20)
+        self.atr = _RollingMean(14)
+
+        self.vwap_pv = {p: _RollingSum(p) for p in [20, 60, 100]}
+        self.vwap_volume = {p: _RollingSum(p) for p in [20, 60, 100]}
+
+        # Fractals need `period` bars on both sides, so a bar is confirmed 5 bars late
+        self.fractal_period = 5
+        self.fractal_highs = deque(maxlen=2 * self.fractal_period + 1)
+        self.fractal_lows = deque(maxlen=2 * self.fractal_period + 1)
+        self.fractal_high_max = _RollingExtreme(2 * self.fractal_period + 1, is_max=True, min_periods=1)
+        self.fractal_low_min = _RollingExtreme(2 * self.fractal_period + 1, is_max=False, min_periods=1)
+        self.last_fractal_high = NAN
+        self.last_fractal_low = NAN
+
+
+class IncrementalFeatureEngine:
+    """Streaming feature engine with constant-time per-bar updates.
+
+    Keeps rolling state per instrument and emits the same feature row that
+    FeatureEngineer.build_all_features would produce for the latest bar when
+    run over the full history seen so far.
+    """
+
+    def __init__(self):
+        self.feature_columns = list(FEATURE_COLUMNS)
+        self.states = {}
+
+    def reset(self, instrument=None):
+        """Drop rolling state for one instrument, or for all of them"""
+        if instrument is None:
+            self.states = {}
+        else:
+            self.states.pop(instrument, None)
+
+    def bar_count(self, instrument):
+        """Number of bars consumed for an instrument"""
+        state = self.states.get(instrument)
+        return state.bars if state else 0
+
+    def update(self, bar):
+        """Consume one bar (dict or Series with ts/open/high/low/close/volume/instrument)
+        and return its feature row as a dict"""
+        instrument = bar["instrument"]
+        state = self.states.get(instrument)
+        if state is None:
+            state = _InstrumentState()
+            self.states[instrument] = state
+
+        row = dict(bar)
+        row["ts"] = pd.to_datetime(bar["ts"])
+        row.update(self._compute(state, row))
+        state.bars += 1
+        return row
+
+    def update_frame(self, df):
+        """Feed a frame of bars in (instrument, ts) order and return all emitted rows"""
+        df = df.sort_values(["instrument", "ts"]).reset_index(drop=True)
+        rows = [self.update(bar) for bar in df.to_dict("records")]
+        return pd.DataFrame(rows)
+
+    def _compute(self, s, bar):
+        o = float(bar["open"])
+        h = float(bar["high"])
+        l = float(bar["low"])
+        c = float(bar["close"])
+        v = float(bar["volume"])
+        ts = bar["ts"]
+
+        prev_c = s.closes[-1] if s.closes else NAN
+        f = {}
+
+        # Basic features
+        f["hl2"] = (h + l) / 2
+        typical = (h + l + c) / 3
+        f["hlc3"] = typical
+        f["ohlc4"] = (o + h + l + c) / 4
+
+        returns_1 = _div(c, prev_c) - 1
+        f["returns_1"] = returns_1
+        close_5 = s.closes[-5] if len(s.closes) >= 5 else NAN
+        f["returns_5"] = _div(c, close_5) - 1
+        ratio = _div(c, prev_c)
+        f["log_returns"] = float(np.log(ratio)) if ratio == ratio else NAN
+        for p in [10, 20, 50]:
+            f[f"volatility_{p}"] = s.volatility[p].update(returns_1)
+
+        # Moving averages
+        for p in [5, 9, 21, 50, 100, 200]:
+            f[f"sma_{p}"] = s.sma[p].update(c)
+        for p in [9, 21, 50]:
+            f[f"ema_{p}"] = s.ema[p].update(c)
+        f["sma_9_21_ratio"] = _div(f["sma_9"], f["sma_21"])
+        f["ema_9_21_ratio"] = _div(f["ema_9"], f["ema_21"])
+        f["price_sma_50_ratio"] = _div(c, f["sma_50"])
+
+        # Oscillators
+        delta = c - prev_c
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        for p in [14, 21]:
+            rs = _div(s.rsi_gain[p].update(gain), s.rsi_loss[p].update(loss))
+            f[f"rsi_{p}"] = 100 - (100 / (1 + rs))
+
+        lowest_low = s.lowest_low_14.update(l)
+        highest_high = s.highest_high_14.update(h)
+        k_raw = 100 * _div(c - lowest_low, highest_high - lowest_low)
+        f["stoch_k"] = s.stoch_k.update(k_raw)
+        f["stoch_d"] = s.stoch_d.update(f["stoch_k"])
+        f["williams_r"] = _div(-100 * (highest_high - c), highest_high - lowest_low)
+
+        s.cci_window.append(typical)
+        cci_sma = s.cci_sma.update(typical)
+        if len(s.cci_window) == 20 and all(x == x for x in s.cci_window):
+            window = np.fromiter(s.cci_window, dtype=float, count=20)
+            mad = float(np.mean(np.abs(window - window.mean())))
+        else:
+            mad = NAN
+        f["cci"] = _div(typical - cci_sma, 0.015 * mad)
+
+        # Momentum
+        macd = s.macd_fast.update(c) - s.macd_slow.update(c)
+        f["macd"] = macd
+        f["macd_signal"] = s.macd_signal.update(macd)
+        f["macd_histogram"] = macd - f["macd_signal"]
+        for p in [10, 20]:
+            past = s.closes[-p] if len(s.closes) >= p else NAN
+            f[f"roc_{p}"] = _div(c, past) - 1
+        for p in [10, 20]:
+            past = s.closes[-p] if len(s.closes) >= p else NAN
+            f[f"momentum_{p}"] = _div(c, past)
+
+        # Volume
+        f["volume_sma_20"] = s.volume_sma_20.update(v)
+        f["volume_ratio"] = _div(v, f["volume_sma_20"])
+        if c > prev_c:
+            s.obv += v
+        elif c < prev_c:
+            s.obv -= v
+        f["obv"] = s.obv
+        if s.bars > 0:
+            s.vpt = s.vpt + _div(v * (c - prev_c), prev_c)
+        f["vpt"] = s.vpt
+        money_flow = typical * v
+        positive_mf = s.mfi_positive.update(money_flow if typical > s.prev_typical else 0.0)
+        negative_mf = s.mfi_negative.update(money_flow if typical < s.prev_typical else 0.0)
+        f["mfi"] = 100 - (100 / (1 + _div(positive_mf, negative_mf)))
+
+        # Volatility
+        middle = s.bb_middle.update(c)
+        std_dev = s.bb_std.update(c)
+        f["bb_upper"] = middle + (std_dev * 2)
+        f["bb_middle"] = middle
+        f["bb_lower"] = middle - (std_dev * 2)
+        f["bb_width"] = _div(f["bb_upper"] - f["bb_lower"], f["bb_middle"])
+        f["bb_position"] = _div(c - f["bb_lower"], f["bb_upper"] - f["bb_lower"])
+        true_range = _max_skipna(h - l, abs(h - prev_c), abs(l - prev_c))
+        f["atr"] = s.atr.update(true_range)
+        f["atr_ratio"] = _div(f["atr"], c)
+
+        # VWAP
+        for p in [20, 60, 100]:
+            vwap = _div(s.vwap_pv[p].update(typical * v), s.vwap_volume[p].update(v))
+            f[f"vwap_{p}"] = vwap
+            f[f"vwap_deviation_{p}"] = _div(c - vwap, vwap)
+
+        # Support / resistance
+        f["pivot"] = typical
+        f["support_1"] = 2 * typical - h
+        f["resistance_1"] = 2 * typical - l
+        s.fractal_highs.append(h)
+        s.fractal_lows.append(l)
+        window_max = s.fractal_high_max.update(h)
+        window_min = s.fractal_low_min.update(l)
+        if len(s.fractal_highs) == s.fractal_highs.maxlen:
+            center = s.fractal_period
+            if s.fractal_highs[center] == window_max:
+                s.last_fractal_high = s.fractal_highs[center]
+            if s.fractal_lows[center] == window_min:
+                s.last_fractal_low = s.fractal_lows[center]
+        f["fractal_high"] = s.last_fractal_high
+        f["fractal_low"] = s.last_fractal_low
+
+        # Time features
+        f["hour"] = ts.hour
+        f["minute"] = ts.minute
+        f["day_of_week"] = ts.dayofweek
+        f["day_of_month"] = ts.day
+        f["month"] = ts.month
+        f["hour_sin"] = float(np.sin(2 * np.pi * ts.hour / 24))
+        f["hour_cos"] = float(np.cos(2 * np.pi * ts.hour / 24))
+        f["day_sin"] = float(np.sin(2 * np.pi * ts.dayofweek / 7))
+        f["day_cos"] = float(np.cos(2 * np.pi * ts.dayofweek / 7))
+
+        s.closes.append(c)
+        s.prev_typical = typical
+        return f
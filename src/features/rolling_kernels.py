@@ -0,0 +1,121 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Optional JIT compiler for the custom rolling reductions
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def full_window_mask(values, window):
+    """True where the window ending at each row is full and has no NaN,
+    i.e. where pandas' rolling(window).apply would call the function"""
+    values = np.asarray(values, dtype=np.float64)
+    nan_count = np.concatenate([[0], np.cumsum(np.isnan(values))])
+    mask = np.zeros(len(values), dtype=bool)
+    if len(values) >= window:
+        mask[window - 1:] = (nan_count[window:] - nan_count[:-window]) == 0
+    return mask
+
+
+def rolling_reduce(values, window, reduction, chunk_size=65536):
+    """Apply a custom reduction over every rolling window with stride tricks.
+
+    reduction receives a (rows, window) view and returns one value per row.
+    Windows are processed in chunks so temporaries stay bounded. Rows whose
+    window is incomplete or contains NaN are NaN, matching rolling().apply().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if len(values) < window:
+        return out
+
+    windows = sliding_window_view(values, window)
+    for start in range(0, len(windows), chunk_size):
+        chunk = windows[start:start + chunk_size]
+        out[window - 1 + start:window - 1 + start + len(chunk)] = reduction(chunk)
+
+    out[~full_window_mask(values, window)] = np.nan
+    return out
+
+
+def _mean_abs_deviation_rows(windows):
+    # Same summation order as Series.mean() on each window, so results are bit-identical
+    window = windows.shape[1]
+    mean = windows.sum(axis=1) / window
+    return np.abs(windows - mean[:, None]).sum(axis=1) / window
+
+
+if NUMBA_AVAILABLE:
+    # Not cache=True: numba's on-disk cache does not reload the recursive
+    # _pairwise_sum reliably, so the kernels compile once per process instead
+    @njit
+    def _pairwise_sum(a, start, n):
+        # Mirrors numpy's pairwise summation so sums match ndarray.sum() exactly
+        if n < 8:
+            res = 0.0
+            for i in range(n):
+                res += a[start + i]
+            return res
+        elif n <= 128:
+            r0 = a[start]
+            r1 = a[start + 1]
+            r2 = a[start + 2]
+            r3 = a[start + 3]
+            r4 = a[start + 4]
+            r5 = a[start + 5]
+            r6 = a[start + 6]
+            r7 = a[start + 7]
+            i = 8
+            while i < n - (n % 8):
+                r0 += a[start + i]
+                r1 += a[start + i + 1]
+                r2 += a[start + i + 2]
+                r3 += a[start + i + 3]
+                r4 += a[start + i + 4]
+                r5 += a[start + i + 5]
+                r6 += a[start + i + 6]
+                r7 += a[start + i + 7]
+                i += 8
+            res = ((r0 + r1) + (r2 + r3)) + ((r4 + r5) + (r6 + r7))
+            while i < n:
+                res += a[start + i]
+                i += 1
+            return res
+        else:
+            n2 = n // 2
+            n2 -= n2 % 8
+            return _pairwise_sum(a, start, n2) + _pairwise_sum(a, start + n2, n - n2)
+
+    @njit
+    def _rolling_mad_numba(values, window, valid):
+        n = len(values)
+        out = np.full(n, np.nan)
+        deviations = np.empty(window)
+        for end in range(window - 1, n):
+            if not valid[end]:
+                continue
+            start = end - window + 1
+            mean = _pairwise_sum(values, start, window) / window
+            for j in range(window):
+                deviations[j] = abs(values[start + j] - mean)
+            out[end] = _pairwise_sum(deviations, 0, window) / window
+        return out
+
+
+def rolling_mean_abs_deviation(values, window, use_numba=None):
+    """Rolling mean absolute deviation around the window mean (as used by CCI).
+
+    Uses a compiled kernel when numba is installed and a chunked stride-tricks
+    kernel otherwise; both match rolling(window).apply(mad) exactly.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if use_numba is None:
+        use_numba = NUMBA_AVAILABLE
+    if use_numba and NUMBA_AVAILABLE:
+        if len(values) < window:
+            return np.full(len(values), np.nan)
+        return _rolling_mad_numba(values, window, full_window_mask(values, window))
+    return rolling_reduce(values, window, _mean_abs_deviation_rows)
@@ -0,0 +1,709 @@
+import pandas as pd
+import numpy as np
+import argparse
+import sys
+import os
+import time
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from labeling.ob_tap_labeler import OrderBlockTapStrategy
+from labeling.vwap_revert_labeler import VWAPReversionStrategy
+from strategies.ma_crossover import MACrossoverStrategy
+from strategies.vwap_revert_strategy import VWAPRevertStrategy
+from strategies.rsi_divergence_strategy import RSIDivergenceStrategy
+
+DEFAULT_INPUTS = [
+    "data/sample_5m.parquet",
+    "data/scenario_high_volatility.parquet",
+    "data/scenario_sideways.parquet",
+    "data/scenario_trending_down.parquet",
+    "data/scenario_trending_up.parquet",
+]
+
+
+class LoopOrderBlockTap(OrderBlockTapStrategy):
+    """Reference bar-by-bar implementation the vectorized strategy must reproduce"""
+
+    def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Generate Order Block Tap signals"""
+        df = df.sort_values("ts").reset_index(drop=True)
+        signals = []
+        
+        lookback = self.params.get("lookback", 20)
+        strength = self.params.get("strength", 3)
+        thresh_pct = self.params.get("thresh_pct", 0.015)
+        
+        n = len(df)
+        
+        for i in range(lookback, n - strength - 1):
+            current_candle = df.iloc[i]
+            future_candles = df.iloc[i+1:i+strength+1]
+            
+            # Calculate future move
+            future_return = (future_candles["close"].iloc[-1] - current_candle["close"]) / current_candle["close"]
+            
+            # Bullish Order Block (Demand Zone)
+            if self._is_bearish_candle(current_candle) and future_return > thresh_pct:
+                ob_zone = {
+                    "high": current_candle["high"],
+                    "low": current_candle["low"],
+                    "type": "demand"
+                }
+                
+                # Look for tap (price re-entering the zone)
+                tap_signal = self._find_zone_tap(df, i+1, ob_zone, n)
+                if tap_signal:
+                    tap_signal.update({
+                        "side": 1,  # Long
+                        "strategy_type": "OB_DEMAND"
+                    })
+                    signals.append(tap_signal)
+            
+            # Bearish Order Block (Supply Zone)
+            elif self._is_bullish_candle(current_candle) and future_return < -thresh_pct:
+                ob_zone = {
+                    "high": current_candle["high"],
+                    "low": current_candle["low"],
+                    "type": "supply"
+                }
+                
+                # Look for tap
+                tap_signal = self._find_zone_tap(df, i+1, ob_zone, n)
+                if tap_signal:
+                    tap_signal.update({
+                        "side": -1,  # Short
+                        "strategy_type": "OB_SUPPLY"
+                    })
+                    signals.append(tap_signal)
+        
+        return pd.DataFrame(signals) if signals else pd.DataFrame()
+    
+    def _is_bearish_candle(self, candle):
+        """Check if candle is bearish"""
+        return candle["close"] < candle["open"]
+    
+    def _is_bullish_candle(self, candle):
+        """Check if candle is bullish"""
+        return candle["close"] > candle["open"]
+    
+    def _find_zone_tap(self, df, start_idx, zone, end_idx):
+        """Find when price taps into the order block zone"""
+        for j in range(start_idx, min(end_idx, len(df))):
+            candle = df.iloc[j]
+            
+            # Check if candle overlaps with zone
+            if self._candle_overlaps_zone(candle, zone):
+                entry_price = candle["open"]
+                atr = self._calculate_atr(df, j)
+                
+                if zone["type"] == "demand":
+                    stop_loss = self.calculate_stop_loss(entry_price, 1, atr)
+                    take_profit = self.calculate_take_profit(entry_price, stop_loss, 1)
+                else:  # supply
+                    stop_loss = self.calculate_stop_loss(entry_price, -1, atr)
+                    take_profit = self.calculate_take_profit(entry_price, stop_loss, -1)
+                
+                return {
+                    "ts": candle["ts"],
+                    "instrument": candle["instrument"],
+                    "entry": float(entry_price),
+                    "stop_loss": float(stop_loss),
+                    "take_profit": float(take_profit),
+                    "zone_high": float(zone["high"]),
+                    "zone_low": float(zone["low"]),
+                    "atr": float(atr) if atr is not None else None
+                }
+        
+        return None
+    
+    def _candle_overlaps_zone(self, candle, zone):
+        """Check if candle overlaps with order block zone"""
+        return (candle["low"] <= zone["high"]) and (candle["high"] >= zone["low"])
+    
+    def _calculate_atr(self, df, idx, period=14):
+        """Calculate Average True Range"""
+        if idx < period:
+            return None
+        
+        high_low = df["high"].iloc[idx-period:idx] - df["low"].iloc[idx-period:idx]
+        high_close = np.abs(df["high"].iloc[idx-period:idx] - df["close"].shift(1).iloc[idx-period:idx])
+        low_close = np.abs(df["low"].iloc[idx-period:idx] - df["close"].shift(1).iloc[idx-period:idx])
+        
+        true_ranges = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+        return true_ranges.mean()
+
+
+class LoopVWAPReversion(VWAPReversionStrategy):
+    """Reference bar-by-bar implementation the vectorized strategy must reproduce"""
+
+    def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Generate VWAP mean reversion signals"""
+        df = df.sort_values("ts").reset_index(drop=True)
+        
+        # Calculate VWAP
+        df = self._calculate_vwap(df)
+        df = self._calculate_rsi(df)
+        
+        signals = []
+        
+        vwap_window = self.params.get("vwap_window", 60)
+        band_pct = self.params.get("band_pct", 0.01)
+        rsi_threshold = self.params.get("rsi_threshold", 35)
+        
+        vwap_col = f"vwap_{vwap_window}"
+        
+        for i in range(len(df)):
+            row = df.iloc[i]
+            
+            if pd.isna(row.get(vwap_col)) or pd.isna(row.get("rsi_14")):
+                continue
+            
+            vwap = row[vwap_col]
+            close = row["close"]
+            rsi = row["rsi_14"]
+            
+            # Long signal: price below VWAP band and RSI oversold
+            if (close < vwap * (1 - band_pct)) and (rsi < rsi_threshold):
+                entry_price = close
+                atr = self._get_atr(df, i)
+                stop_loss = self.calculate_stop_loss(entry_price, 1, atr)
+                take_profit = self.calculate_take_profit(entry_price, stop_loss, 1)
+                
+                signals.append({
+                    "ts": row["ts"],
+                    "instrument": row["instrument"],
+                    "entry": float(entry_price),
+                    "side": 1,
+                    "stop_loss": float(stop_loss),
+                    "take_profit": float(take_profit),
+                    "strategy_type": "VWAP_REVERT_LONG",
+                    "vwap": float(vwap),
+                    "rsi": float(rsi),
+                    "deviation": float((close - vwap) / vwap)
+                })
+            
+            # Short signal: price above VWAP band and RSI overbought
+            elif (close > vwap * (1 + band_pct)) and (rsi > (100 - rsi_threshold)):
+                entry_price = close
+                atr = self._get_atr(df, i)
+                stop_loss = self.calculate_stop_loss(entry_price, -1, atr)
+                take_profit = self.calculate_take_profit(entry_price, stop_loss, -1)
+                
+                signals.append({
+                    "ts": row["ts"],
+                    "instrument": row["instrument"],
+                    "entry": float(entry_price),
+                    "side": -1,
+                    "stop_loss": float(stop_loss),
+                    "take_profit": float(take_profit),
+                    "strategy_type": "VWAP_REVERT_SHORT",
+                    "vwap": float(vwap),
+                    "rsi": float(rsi),
+                    "deviation": float((close - vwap) / vwap)
+                })
+        
+        return pd.DataFrame(signals) if signals else pd.DataFrame()
+
+    def _get_atr(self, df, idx, period=14):
+        """Get ATR value at specific index"""
+        if idx < period:
+            return None
+        
+        high_low = df["high"].iloc[idx-period:idx] - df["low"].iloc[idx-period:idx]
+        high_close = np.abs(df["high"].iloc[idx-period:idx] - df["close"].shift(1).iloc[idx-period:idx])
+        low_close = np.abs(df["low"].iloc[idx-period:idx] - df["close"].shift(1).iloc[idx-period:idx])
+        
+        true_ranges = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+        return true_ranges.mean()
+
+
+class LoopMACrossover(MACrossoverStrategy):
+    """Reference bar-by-bar implementation the vectorized strategy must reproduce"""
+
+    def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Generate MA crossover signals"""
+        df = df.sort_values("ts").reset_index(drop=True)
+        
+        # Calculate moving averages
+        df = self._calculate_moving_averages(df)
+        
+        signals = []
+        short_window = self.params.get("short_window", 9)
+        long_window = self.params.get("long_window", 21)
+        confirmation_periods = self.params.get("confirmation_periods", 2)
+        
+        short_ma_col = f"ema_{short_window}"
+        long_ma_col = f"ema_{long_window}"
+        
+        for i in range(long_window + confirmation_periods, len(df)):
+            current = df.iloc[i]
+            previous = df.iloc[i-1]
+            
+            if pd.isna(current[short_ma_col]) or pd.isna(current[long_ma_col]):
+                continue
+            
+            # Bullish crossover: short MA crosses above long MA
+            if (previous[short_ma_col] <= previous[long_ma_col] and 
+                current[short_ma_col] > current[long_ma_col]):
+                
+                # Confirm the crossover with additional periods
+                if self._confirm_crossover(df, i, short_ma_col, long_ma_col, confirmation_periods, "bullish"):
+                    entry_price = current["close"]
+                    atr = self._get_atr(df, i)
+                    stop_loss = self.calculate_stop_loss(entry_price, 1, atr)
+                    take_profit = self.calculate_take_profit(entry_price, stop_loss, 1)
+                    
+                    signals.append({
+                        "ts": current["ts"],
+                        "instrument": current["instrument"],
+                        "entry": float(entry_price),
+                        "side": 1,
+                        "stop_loss": float(stop_loss),
+                        "take_profit": float(take_profit),
+                        "strategy_type": "MA_CROSSOVER_BULL",
+                        "short_ma": float(current[short_ma_col]),
+                        "long_ma": float(current[long_ma_col]),
+                        "crossover_strength": float(current[short_ma_col] / current[long_ma_col])
+                    })
+            
+            # Bearish crossover: short MA crosses below long MA
+            elif (previous[short_ma_col] >= previous[long_ma_col] and 
+                  current[short_ma_col] < current[long_ma_col]):
+                
+                if self._confirm_crossover(df, i, short_ma_col, long_ma_col, confirmation_periods, "bearish"):
+                    entry_price = current["close"]
+                    atr = self._get_atr(df, i)
+                    stop_loss = self.calculate_stop_loss(entry_price, -1, atr)
+                    take_profit = self.calculate_take_profit(entry_price, stop_loss, -1)
+                    
+                    signals.append({
+                        "ts": current["ts"],
+                        "instrument": current["instrument"],
+                        "entry": float(entry_price),
+                        "side": -1,
+                        "stop_loss": float(stop_loss),
+                        "take_profit": float(take_profit),
+                        "strategy_type": "MA_CROSSOVER_BEAR",
+                        "short_ma": float(current[short_ma_col]),
+                        "long_ma": float(current[long_ma_col]),
+                        "crossover_strength": float(current[short_ma_col] / current[long_ma_col])
+                    })
+        
+        return pd.DataFrame(signals) if signals else pd.DataFrame()
+
+    def _confirm_crossover(self, df, idx, short_col, long_col, periods, direction):
+        """Confirm crossover signal with additional periods"""
+        if idx + periods >= len(df):
+            return False
+        
+        for i in range(1, periods + 1):
+            future_row = df.iloc[idx + i]
+            
+            if direction == "bullish":
+                if future_row[short_col] <= future_row[long_col]:
+                    return False
+            else:  # bearish
+                if future_row[short_col] >= future_row[long_col]:
+                    return False
+        
+        return True
+
+    def _get_atr(self, df, idx, period=14):
+        """Get ATR value at specific index"""
+        if idx < period:
+            return None
+        
+        high_low = df["high"].iloc[idx-period:idx] - df["low"].iloc[idx-period:idx]
+        high_close = np.abs(df["high"].iloc[idx-period:idx] - df["close"].shift(1).iloc[idx-period:idx])
+        low_close = np.abs(df["low"].iloc[idx-period:idx] - df["close"].shift(1).iloc[idx-period:idx])
+        
+        true_ranges = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+        return true_ranges.mean()
+
+
+class LoopVWAPRevert(VWAPRevertStrategy):
+    """Reference bar-by-bar implementation the vectorized strategy must reproduce"""
+
+    def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Generate VWAP mean reversion signals"""
+        df = df.sort_values("ts").reset_index(drop=True)
+        
+        # Calculate VWAP and supporting indicators
+        df = self._calculate_indicators(df)
+        
+        signals = []
+        vwap_window = self.params.get("vwap_window", 60)
+        band_pct = self.params.get("band_pct", 0.01)  # 1%
+        rsi_threshold = self.params.get("rsi_threshold", 35)
+        min_volume_ratio = self.params.get("min_volume_ratio", 1.2)
+        
+        for i in range(vwap_window, len(df)):
+            current = df.iloc[i]
+            
+            if pd.isna(current["vwap"]) or pd.isna(current["rsi"]):
+                continue
+            
+            close_price = current["close"]
+            vwap_value = current["vwap"]
+            rsi_value = current["rsi"]
+            volume_ratio = current["volume_ratio"]
+            
+            # Long signal: Price below VWAP band + oversold RSI + volume confirmation
+            if (close_price < vwap_value * (1 - band_pct) and
+                rsi_value < rsi_threshold and
+                volume_ratio > min_volume_ratio):
+                
+                confidence = self._calculate_revert_confidence(df, i, "bullish")
+                if confidence > 0.6:  # Minimum confidence threshold
+                    
+                    entry_price = close_price
+                    # Wider stop for mean reversion
+                    stop_loss = entry_price * (1 - self.params.get("stop_loss_pct", 0.015))
+                    # Target back to VWAP or above
+                    take_profit = vwap_value * (1 + self.params.get("target_pct", 0.008))
+                    
+                    signals.append({
+                        "ts": current["ts"],
+                        "instrument": current["instrument"],
+                        "entry": float(entry_price),
+                        "side": 1,
+                        "stop_loss": float(stop_loss),
+                        "take_profit": float(take_profit),
+                        "strategy_type": "VWAP_REVERT_BULL",
+                        "vwap_value": float(vwap_value),
+                        "rsi_value": float(rsi_value),
+                        "deviation_pct": float((vwap_value - close_price) / close_price * 100),
+                        "confidence": float(confidence)
+                    })
+            
+            # Short signal: Price above VWAP band + overbought RSI + volume confirmation
+            elif (close_price > vwap_value * (1 + band_pct) and
+                  rsi_value > (100 - rsi_threshold) and
+                  volume_ratio > min_volume_ratio):
+                
+                confidence = self._calculate_revert_confidence(df, i, "bearish")
+                if confidence > 0.6:
+                    
+                    entry_price = close_price
+                    stop_loss = entry_price * (1 + self.params.get("stop_loss_pct", 0.015))
+                    take_profit = vwap_value * (1 - self.params.get("target_pct", 0.008))
+                    
+                    signals.append({
+                        "ts": current["ts"],
+                        "instrument": current["instrument"],
+                        "entry": float(entry_price),
+                        "side": -1,
+                        "stop_loss": float(stop_loss),
+                        "take_profit": float(take_profit),
+                        "strategy_type": "VWAP_REVERT_BEAR",
+                        "vwap_value": float(vwap_value),
+                        "rsi_value": float(rsi_value),
+                        "deviation_pct": float((close_price - vwap_value) / close_price * 100),
+                        "confidence": float(confidence)
+                    })
+        
+        return pd.DataFrame(signals) if signals else pd.DataFrame()
+
+    def _calculate_revert_confidence(self, df, index, direction):
+        """Calculate mean reversion confidence"""
+        current = df.iloc[index]
+        
+        base_confidence = 0.6
+        
+        # Deviation factor (more extreme = higher confidence)
+        vwap_dev = abs(current["close"] - current["vwap"]) / current["vwap"]
+        dev_factor = min(vwap_dev * 20, 0.2)  # Cap at 0.2
+        
+        # RSI extremity factor
+        rsi = current["rsi"]
+        if direction == "bullish":
+            rsi_factor = max(0, (30 - rsi) / 30 * 0.15)
+        else:
+            rsi_factor = max(0, (rsi - 70) / 30 * 0.15)
+        
+        # Volume confirmation factor
+        volume_factor = min((current["volume_ratio"] - 1) * 0.1, 0.1)
+        
+        # Momentum divergence (price moving away from VWAP while momentum slowing)
+        momentum_factor = 0.05 if abs(current["momentum"]) < 0.01 else 0.0
+        
+        # Market session factor (VWAP works better in active sessions)
+        session_factor = 0.05  # Simplified
+        
+        total_confidence = (base_confidence + dev_factor + rsi_factor + 
+                          volume_factor + momentum_factor + session_factor)
+        
+        return min(0.95, total_confidence)
+
+
+class LoopRSIDivergence(RSIDivergenceStrategy):
+    """Reference pairwise implementation the searchsorted pairing must reproduce"""
+
+    def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Generate RSI divergence signals"""
+        df = df.sort_values("ts").reset_index(drop=True)
+        
+        # Calculate RSI and find peaks/troughs
+        df = self._calculate_indicators(df)
+        
+        signals = []
+        min_periods = self.params.get("min_periods_between_peaks", 10)
+        max_periods = self.params.get("max_periods_between_peaks", 50)
+        
+        # Find price and RSI peaks/troughs
+        price_peaks, price_troughs = self._find_price_extremes(df)
+        rsi_peaks, rsi_troughs = self._find_rsi_extremes(df)
+        
+        # Look for divergences
+        signals.extend(self._find_bullish_divergences(df, price_troughs, rsi_troughs, min_periods, max_periods))
+        signals.extend(self._find_bearish_divergences(df, price_peaks, rsi_peaks, min_periods, max_periods))
+        
+        return pd.DataFrame(signals) if signals else pd.DataFrame()
+
+    def _find_bullish_divergences(self, df, price_troughs, rsi_troughs, min_periods, max_periods):
+        """Find bullish divergences (price makes lower low, RSI makes higher low)"""
+        signals = []
+        
+        for i in range(len(price_troughs) - 1):
+            for j in range(i + 1, len(price_troughs)):
+                p1_idx, p2_idx = price_troughs[i], price_troughs[j]
+                
+                # Check if within acceptable time range
+                if p2_idx - p1_idx < min_periods or p2_idx - p1_idx > max_periods:
+                    continue
+                
+                p1_price = df.iloc[p1_idx]["close"]
+                p2_price = df.iloc[p2_idx]["close"]
+                
+                # Price makes lower low
+                if p2_price >= p1_price:
+                    continue
+                
+                # Find corresponding RSI troughs
+                rsi1_candidates = [idx for idx in rsi_troughs if abs(idx - p1_idx) <= 3]
+                rsi2_candidates = [idx for idx in rsi_troughs if abs(idx - p2_idx) <= 3]
+                
+                if not rsi1_candidates or not rsi2_candidates:
+                    continue
+                
+                rsi1_idx = min(rsi1_candidates, key=lambda x: abs(x - p1_idx))
+                rsi2_idx = min(rsi2_candidates, key=lambda x: abs(x - p2_idx))
+                
+                rsi1_value = df.iloc[rsi1_idx]["rsi"]
+                rsi2_value = df.iloc[rsi2_idx]["rsi"]
+                
+                # RSI makes higher low (divergence)
+                if rsi2_value > rsi1_value:
+                    confidence = self._calculate_divergence_confidence(
+                        df, p1_idx, p2_idx, rsi1_idx, rsi2_idx, "bullish"
+                    )
+                    
+                    if confidence > 0.6:
+                        current = df.iloc[p2_idx]
+                        entry_price = current["close"]
+                        
+                        # Conservative stop below the divergence low
+                        stop_loss = entry_price * (1 - self.params.get("stop_loss_pct", 0.02))
+                        
+                        # Target based on divergence strength
+                        risk = entry_price - stop_loss
+                        take_profit = entry_price + (risk * self.params.get("risk_reward", 2.5))
+                        
+                        signals.append({
+                            "ts": current["ts"],
+                            "instrument": current["instrument"],
+                            "entry": float(entry_price),
+                            "side": 1,
+                            "stop_loss": float(stop_loss),
+                            "take_profit": float(take_profit),
+                            "strategy_type": "RSI_DIV_BULL",
+                            "rsi_value": float(rsi2_value),
+                            "price_low1": float(p1_price),
+                            "price_low2": float(p2_price),
+                            "rsi_low1": float(rsi1_value),
+                            "rsi_low2": float(rsi2_value),
+                            "divergence_strength": float((rsi2_value - rsi1_value) / (p1_price - p2_price)),
+                            "confidence": float(confidence)
+                        })
+        
+        return signals
+
+    def _find_bearish_divergences(self, df, price_peaks, rsi_peaks, min_periods, max_periods):
+        """Find bearish divergences (price makes higher high, RSI makes lower high)"""
+        signals = []
+        
+        for i in range(len(price_peaks) - 1):
+            for j in range(i + 1, len(price_peaks)):
+                p1_idx, p2_idx = price_peaks[i], price_peaks[j]
+                
+                # Check if within acceptable time range
+                if p2_idx - p1_idx < min_periods or p2_idx - p1_idx > max_periods:
+                    continue
+                
+                p1_price = df.iloc[p1_idx]["close"]
+                p2_price = df.iloc[p2_idx]["close"]
+                
+                # Price makes higher high
+                if p2_price <= p1_price:
+                    continue
+                
+                # Find corresponding RSI peaks
+                rsi1_candidates = [idx for idx in rsi_peaks if abs(idx - p1_idx) <= 3]
+                rsi2_candidates = [idx for idx in rsi_peaks if abs(idx - p2_idx) <= 3]
+                
+                if not rsi1_candidates or not rsi2_candidates:
+                    continue
+                
+                rsi1_idx = min(rsi1_candidates, key=lambda x: abs(x - p1_idx))
+                rsi2_idx = min(rsi2_candidates, key=lambda x: abs(x - p2_idx))
+                
+                rsi1_value = df.iloc[rsi1_idx]["rsi"]
+                rsi2_value = df.iloc[rsi2_idx]["rsi"]
+                
+                # RSI makes lower high (divergence)
+                if rsi2_value < rsi1_value:
+                    confidence = self._calculate_divergence_confidence(
+                        df, p1_idx, p2_idx, rsi1_idx, rsi2_idx, "bearish"
+                    )
+                    
+                    if confidence > 0.6:
+                        current = df.iloc[p2_idx]
+                        entry_price = current["close"]
+                        
+                        # Conservative stop above the divergence high
+                        stop_loss = entry_price * (1 + self.params.get("stop_loss_pct", 0.02))
+                        
+                        # Target based on divergence strength
+                        risk = stop_loss - entry_price
+                        take_profit = entry_price - (risk * self.params.get("risk_reward", 2.5))
+                        
+                        signals.append({
+                            "ts": current["ts"],
+                            "instrument": current["instrument"],
+                            "entry": float(entry_price),
+                            "side": -1,
+                            "stop_loss": float(stop_loss),
+                            "take_profit": float(take_profit),
+                            "strategy_type": "RSI_DIV_BEAR",
+                            "rsi_value": float(rsi2_value),
+                            "price_high1": float(p1_price),
+                            "price_high2": float(p2_price),
+                            "rsi_high1": float(rsi1_value),
+                            "rsi_high2": float(rsi2_value),
+                            "divergence_strength": float((rsi1_value - rsi2_value) / (p2_price - p1_price)),
+                            "confidence": float(confidence)
+                        })
+        
+        return signals
+
+    def _calculate_divergence_confidence(self, df, p1_idx, p2_idx, rsi1_idx, rsi2_idx, direction):
+        """Calculate divergence signal confidence"""
+        base_confidence = 0.6
+        
+        # Time factor (divergences over longer periods are more reliable)
+        time_span = p2_idx - p1_idx
+        time_factor = min((time_span - 10) / 40 * 0.15, 0.15)
+        
+        # RSI level factor (divergences at extremes are more reliable)
+        rsi2_value = df.iloc[rsi2_idx]["rsi"]
+        if direction == "bullish":
+            rsi_factor = max(0, (35 - rsi2_value) / 35 * 0.1)
+        else:
+            rsi_factor = max(0, (rsi2_value - 65) / 35 * 0.1)
+        
+        # Volume confirmation
+        volume1 = df.iloc[p1_idx]["volume"]
+        volume2 = df.iloc[p2_idx]["volume"]
+        avg_volume = df.iloc[max(0, p2_idx-20):p2_idx]["volume"].mean()
+        
+        volume_factor = 0.05 if volume2 > avg_volume else 0.0
+        
+        # Divergence clarity (how clear the divergence is)
+        price_change = abs(df.iloc[p2_idx]["close"] - df.iloc[p1_idx]["close"])
+        rsi_change = abs(df.iloc[rsi2_idx]["rsi"] - df.iloc[rsi1_idx]["rsi"])
+        clarity_factor = min(rsi_change / 10 * 0.1, 0.1)
+        
+        total_confidence = (base_confidence + time_factor + rsi_factor + 
+                          volume_factor + clarity_factor)
+        
+        return min(0.95, total_confidence)
+
+
+# name -> (reference strategy, vectorized strategy)
+STRATEGIES = {
+    "ob_tap": (LoopOrderBlockTap, OrderBlockTapStrategy),
+    "vwap_reversion": (LoopVWAPReversion, VWAPReversionStrategy),
+    "ma_crossover": (LoopMACrossover, MACrossoverStrategy),
+    "vwap_revert": (LoopVWAPRevert, VWAPRevertStrategy),
+    "rsi_divergence": (LoopRSIDivergence, RSIDivergenceStrategy),
+}
+
+
+def run_benchmark(df, strategies=None, repeats=1):
+    """Time loop vs vectorized signal generation and check they agree exactly"""
+    results = []
+    for name, (reference_cls, vector_cls) in STRATEGIES.items():
+        if strategies and name not in strategies:
+            continue
+
+        start = time.perf_counter()
+        expected = reference_cls().generate_signals(df)
+        loop_time = time.perf_counter() - start
+
+        vector_strategy = vector_cls()
+        vector_time = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            actual = vector_strategy.generate_signals(df)
+            vector_time = min(vector_time, time.perf_counter() - start)
+
+        try:
+            pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+            identical = True
+        except AssertionError as e:
+            print(f"{name}: outputs differ\n{e}")
+            identical = False
+
+        results.append({
+            "strategy": name,
+            "signals": len(actual),
+            "loop_seconds": loop_time,
+            "vectorized_seconds": vector_time,
+            "speedup": loop_time / vector_time if vector_time > 0 else float("inf"),
+            "identical": identical,
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized signal generators against the loop implementations")
+    parser.add_argument("--inputs", nargs="+", default=DEFAULT_INPUTS,
+                       help="Bar or feature parquet files to generate signals on")
+    parser.add_argument("--strategies", nargs="+", default=None,
+                       help=f"Only benchmark these strategies ({', '.join(STRATEGIES)})")
+    parser.add_argument("--repeats", type=int, default=3,
+                       help="Repetitions for the vectorized timing (best is reported)")
+    args = parser.parse_args()
+
+    failed = []
+    print(f"{'input':<40}{'strategy':<16}{'signals':>8}{'loop (s)':>10}{'vector (s)':>12}{'speedup':>10}  identical")
+    for path in args.inputs:
+        df = pd.read_parquet(path)
+        for r in run_benchmark(df, args.strategies, args.repeats):
+            print(f"{os.path.basename(path):<40}{r['strategy']:<16}{r['signals']:>8}{r['loop_seconds']:>10.3f}"
+                  f"{r['vectorized_seconds']:>12.4f}{r['speedup']:>9.1f}x  {r['identical']}")
+            if not r["identical"]:
+                failed.append(f"{path}:{r['strategy']}")
+
+    if failed:
+        print(f"\nFAILED: {', '.join(failed)}")
+        sys.exit(1)
+
+    print("\nAll vectorized signal generators match the loop implementations")
+
+
+if __name__ == "__main__":
+    main()
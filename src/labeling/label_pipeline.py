@@ -1,5 +1,7 @@
 import argparse
+import json
 import pandas as pd
+import numpy as np
 import sys
 import os
 from pathlib import Path
@@ -7,16 +9,24 @@ from pathlib import Path
 # Add the parent directory to Python path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from strategies.base import StrategyManager
+from strategies.base import EXECUTORS, StrategyManager
 from labeling.ob_tap_labeler import OrderBlockTapStrategy
 from labeling.vwap_revert_labeler import VWAPReversionStrategy
 from strategies.ma_crossover import MACrossoverStrategy
+from data.parquet_io import write_parquet, read_parquet
+
+# Signal columns that always map onto a fixed label column
+LABEL_BASE_COLUMNS = ["ts", "instrument", "entry", "side", "stop_loss", "take_profit"]
+
+# A label is identified by these columns when merging incremental runs
+LABEL_KEY = ["instrument", "ts", "strategy"]
 
 class LabelingPipeline:
     """Unified labeling pipeline for all strategies"""
     
-    def __init__(self):
-        self.strategy_manager = StrategyManager()
+    def __init__(self, executor="serial", workers=1):
+        """executor and workers are passed to StrategyManager"""
+        self.strategy_manager = StrategyManager(executor=executor, workers=workers)
         self._register_strategies()
     
     def _register_strategies(self):
@@ -31,11 +41,25 @@ class LabelingPipeline:
             self.strategy_manager.add_strategy(strategy)
     
     def run_labeling(self, features_path="data/features.parquet", 
-                    out_path="data/labels.parquet", save=True):
-        """Run the complete labeling pipeline"""
+                    out_path="data/labels.parquet", save=True, compact=False,
+                    incremental=False, watermark_path=None):
+        """Run the complete labeling pipeline.
+
+        compact writes the labels with float32 feature columns, int8 side,
+        dictionary-encoded names and ms timestamps.
+
+        incremental relabels only bars after each instrument's watermark (the
+        last bar labeled by the previous run, kept in watermark_path) and
+        merges the result into the existing labels at out_path. Without
+        existing labels it falls back to a full run.
+        """
         
         # Create output directory
         Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        watermark_path = watermark_path or str(Path(out_path).with_suffix(".watermarks.json"))
+        
+        if incremental and os.path.exists(out_path):
+            return self._run_incremental(features_path, out_path, save, compact, watermark_path)
         
         # Load features
         print(f"Loading features from {features_path}...")
@@ -45,6 +69,7 @@ class LabelingPipeline:
         # Generate signals from all strategies
         print("Generating signals from all strategies...")
         signals = self.strategy_manager.generate_all_signals(df)
+        self._print_timings(self.strategy_manager.timings)
         
         if signals.empty:
             print("No signals generated!")
@@ -53,11 +78,12 @@ class LabelingPipeline:
         print(f"Generated {len(signals)} total signals")
         
         # Convert to training labels format
-        labels = self._convert_to_labels(signals)
+        labels = self.convert_to_labels(signals)
         
         # Save labels
         if save:
-            labels.to_parquet(out_path, index=False)
+            write_parquet(labels, out_path, compact=compact)
+            self._save_watermarks(watermark_path, df[["instrument", "ts"]])
             print(f"Saved {len(labels)} labels to {out_path}")
         
         # Print summary
@@ -65,63 +91,169 @@ class LabelingPipeline:
         
         return labels
     
-    def _convert_to_labels(self, signals):
-        """Convert strategy signals to ML training labels"""
-        labels = []
-        
-        for _, signal in signals.iterrows():
-            label = {
-                "instrument": signal["instrument"],
-                "strategy": signal.get("strategy", "UNKNOWN"),
-                "strategy_type": signal.get("strategy_type", "UNKNOWN"),
-                "ts": signal["ts"],
-                "entry": float(signal["entry"]),
-                "side": int(signal["side"]),
-                "stop_loss": float(signal["stop_loss"]),
-                "take_profit": float(signal["take_profit"]),
-                "confidence": float(signal.get("confidence", 0.5)),
-                "risk_reward": float(signal.get("risk_reward", 2.0)),
-                "horizon_minutes": 30,  # Default horizon
-                
-                # Additional metadata
-                "expected_return": self._calculate_expected_return(signal),
-                "risk_amount": self._calculate_risk_amount(signal),
-                "reward_amount": self._calculate_reward_amount(signal)
-            }
+    def _run_incremental(self, features_path, out_path, save, compact, watermark_path):
+        """Label bars past the watermarks and merge them into the existing labels"""
+        keys = read_parquet(features_path, columns=["instrument", "ts"])
+        windows = self._incremental_windows(keys, self._load_watermarks(watermark_path))
+        
+        existing = pd.read_parquet(out_path)
+        if windows.empty:
+            print("No new bars since the last labeling run")
+            return existing
+        
+        # Only the earliest bar any instrument needs is read back from disk; an
+        # instrument without a watermark (NaT) needs its full history
+        start = None if windows["input_from"].isna().any() else windows["input_from"].min()
+        df = read_parquet(features_path, start=start)
+        df = df[df["instrument"].isin(windows.index)]
+        input_from = df["instrument"].astype(str).map(windows["input_from"]).astype("datetime64[ns]")
+        df = df[input_from.isna() | (df["ts"] >= input_from)].reset_index(drop=True)
+        print(f"Relabeling {len(df)} rows across {len(windows)} instruments")
+        
+        print("Generating signals from all strategies...")
+        signals = self.strategy_manager.generate_all_signals(df)
+        self._print_timings(self.strategy_manager.timings)
+        
+        # Bars before relabel_from only served as history and keep their old labels
+        new_labels = self.convert_to_labels(signals)
+        if not new_labels.empty:
+            # Compact labels store ms timestamps; match them so keys line up
+            new_labels["ts"] = new_labels["ts"].dt.as_unit(existing["ts"].dt.unit)
+        new_labels = self._drop_before(new_labels, windows["relabel_from"])
+        stale = self._drop_before(existing, windows["relabel_from"]).index
+        labels = pd.concat([existing.drop(index=stale), new_labels], ignore_index=True)
+        labels = (labels.drop_duplicates(LABEL_KEY, keep="last")
+                  .sort_values("ts", kind="stable").reset_index(drop=True))
+        print(f"Replaced {len(stale)} labels with {len(new_labels)} new ones")
+        
+        if save:
+            write_parquet(labels, out_path, compact=compact)
+            self._save_watermarks(watermark_path, keys)
+            print(f"Saved {len(labels)} labels to {out_path}")
+        
+        self._print_summary(labels)
+        
+        return labels
+    
+    def _incremental_windows(self, keys, watermarks):
+        """Per-instrument relabel_from and input_from timestamps.
+        
+        relabel_from is the first bar whose signals can differ from the last
+        run: the first bar past the watermark, moved back by the strategies'
+        lookahead. input_from adds their lookback before that. Both are NaT
+        for instruments without a watermark, which are labeled in full.
+        Instruments with no bars past their watermark are left out.
+        """
+        strategies = self.strategy_manager.strategies
+        lookback = max((s.required_lookback() for s in strategies), default=0)
+        lookahead = max((s.required_lookahead() for s in strategies), default=0)
+        
+        windows = {}
+        for instrument, group in keys.groupby(keys["instrument"].astype(str), sort=False):
+            ts = np.sort(group["ts"].to_numpy(dtype="datetime64[ns]"))
+            if instrument not in watermarks:
+                windows[instrument] = (pd.NaT, pd.NaT)
+                continue
             
-            # Add strategy-specific features
-            for col in signal.index:
-                if col not in label and col not in ["ts", "instrument", "entry", "side", "stop_loss", "take_profit"]:
-                    if pd.notna(signal[col]):
-                        label[f"feature_{col}"] = float(signal[col])
+            first_new = np.searchsorted(ts, np.datetime64(watermarks[instrument], "ns"), side="right")
+            if first_new == len(ts):
+                continue
+            relabel_pos = max(0, first_new - lookahead)
+            windows[instrument] = (ts[relabel_pos], ts[max(0, relabel_pos - lookback)])
+        
+        return pd.DataFrame.from_dict(windows, orient="index", columns=["relabel_from", "input_from"],
+                                      dtype="datetime64[ns]")
+    
+    def _drop_before(self, labels, relabel_from):
+        """Labels at or after their instrument's relabel_from (all of them where it is NaT)"""
+        if labels.empty:
+            return labels
+        instrument = labels["instrument"].astype(str)
+        cutoff = instrument.map(relabel_from).astype("datetime64[ns]").dt.as_unit(labels["ts"].dt.unit)
+        keep = instrument.isin(relabel_from.index) & (cutoff.isna() | (labels["ts"] >= cutoff))
+        return labels[keep]
+    
+    def _load_watermarks(self, watermark_path):
+        """Last labeled ts per instrument from the previous run"""
+        if not os.path.exists(watermark_path):
+            return {}
+        with open(watermark_path) as f:
+            return {instrument: pd.Timestamp(ts) for instrument, ts in json.load(f).items()}
+    
+    def _save_watermarks(self, watermark_path, keys):
+        """Record the last bar of each instrument as its watermark"""
+        last_bars = keys.groupby(keys["instrument"].astype(str))["ts"].max()
+        with open(watermark_path, "w") as f:
+            json.dump({instrument: pd.Timestamp(ts).isoformat() for instrument, ts in last_bars.items()},
+                      f, indent=2)
+    
+    def convert_to_labels(self, signals):
+        """Convert strategy signals to ML training labels.
+        
+        Numeric strategy-specific columns are carried over as feature_<col>,
+        in signal column order; columns that are NaN on every row are dropped.
+        """
+        if signals.empty:
+            return pd.DataFrame()
+        
+        n = len(signals)
+        entry = signals["entry"].to_numpy(dtype=float)
+        side = signals["side"].to_numpy().astype(int)
+        stop_loss = signals["stop_loss"].to_numpy(dtype=float)
+        take_profit = signals["take_profit"].to_numpy(dtype=float)
+        
+        def column(name, default):
+            if name in signals.columns:
+                return signals[name].to_numpy()
+            return np.full(n, default)
+        
+        labels = {
+            "instrument": signals["instrument"].to_numpy(),
+            "strategy": column("strategy", "UNKNOWN"),
+            "strategy_type": column("strategy_type", "UNKNOWN"),
+            "ts": signals["ts"].to_numpy(),
+            "entry": entry,
+            "side": side,
+            "stop_loss": stop_loss,
+            "take_profit": take_profit,
+            "confidence": column("confidence", 0.5).astype(float),
+            "risk_reward": column("risk_reward", 2.0).astype(float),
+            "horizon_minutes": np.full(n, 30),  # Default horizon
             
-            labels.append(label)
+            # Additional metadata
+            "expected_return": self._calculate_expected_return(entry, take_profit, side),
+            "risk_amount": self._calculate_risk_amount(entry, stop_loss),
+            "reward_amount": self._calculate_reward_amount(entry, take_profit)
+        }
+        
+        # Add strategy-specific features
+        extra = signals.drop(columns=[col for col in signals.columns
+                                      if col in labels or col in LABEL_BASE_COLUMNS])
+        extra = extra.select_dtypes(include=["number", "bool"]).astype(float).dropna(axis=1, how="all")
+        for col in extra.columns:
+            labels[f"feature_{col}"] = extra[col].to_numpy()
         
         return pd.DataFrame(labels)
     
-    def _calculate_expected_return(self, signal):
+    def _calculate_expected_return(self, entry, take_profit, side):
         """Calculate expected return percentage"""
-        entry = signal["entry"]
-        take_profit = signal["take_profit"]
-        
-        if signal["side"] == 1:  # Long
-            return (take_profit - entry) / entry
-        else:  # Short
-            return (entry - take_profit) / entry
+        return np.where(side == 1, take_profit - entry, entry - take_profit) / entry
     
-    def _calculate_risk_amount(self, signal):
+    def _calculate_risk_amount(self, entry, stop_loss):
         """Calculate risk amount percentage"""
-        entry = signal["entry"]
-        stop_loss = signal["stop_loss"]
-        
-        return abs(entry - stop_loss) / entry
+        return np.abs(entry - stop_loss) / entry
     
-    def _calculate_reward_amount(self, signal):
+    def _calculate_reward_amount(self, entry, take_profit):
         """Calculate reward amount percentage"""
-        entry = signal["entry"]
-        take_profit = signal["take_profit"]
-        
-        return abs(take_profit - entry) / entry
+        return np.abs(take_profit - entry) / entry
+    
+    def _print_timings(self, timings):
+        """Print seconds spent in each strategy, slowest first"""
+        total = sum(timings.values())
+        print("\nStrategy timings:")
+        for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+            share = seconds / total if total else 0.0
+            print(f"  {name}: {seconds:.2f}s ({share:.0%})")
     
     def _print_summary(self, labels):
         """Print labeling summary"""
@@ -182,15 +314,28 @@ def main():
                        help="Output path for labels")
     parser.add_argument("--no-save", action="store_true", 
                        help="Don't save labels to file")
+    parser.add_argument("--compact", action="store_true",
+                       help="Write labels in the compact parquet schema")
+    parser.add_argument("--executor", default="serial", choices=EXECUTORS,
+                       help="Run strategies serially or fan (strategy, instrument) units out to threads or processes")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Pool size for the thread and process executors")
+    parser.add_argument("--incremental", action="store_true",
+                       help="Only relabel bars after the last run's per-instrument watermarks")
+    parser.add_argument("--watermarks", default=None,
+                       help="Watermark file (default: next to --out with a .watermarks.json suffix)")
     
     args = parser.parse_args()
     
     # Run labeling pipeline
-    pipeline = LabelingPipeline()
+    pipeline = LabelingPipeline(executor=args.executor, workers=args.workers)
     labels = pipeline.run_labeling(
         features_path=args.features,
         out_path=args.out,
-        save=not args.no_save
+        save=not args.no_save,
+        compact=args.compact,
+        incremental=args.incremental,
+        watermark_path=args.watermarks
     )
 
 if __name__ == "__main__":
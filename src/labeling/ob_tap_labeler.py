@@ -16,110 +16,93 @@ class OrderBlockTapStrategy(BaseStrategy):
     def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
         """Generate Order Block Tap signals"""
         df = df.sort_values("ts").reset_index(drop=True)
-        signals = []
         
         lookback = self.params.get("lookback", 20)
         strength = self.params.get("strength", 3)
         thresh_pct = self.params.get("thresh_pct", 0.015)
         
+        open_ = df["open"].to_numpy(dtype=float)
+        high = df["high"].to_numpy(dtype=float)
+        low = df["low"].to_numpy(dtype=float)
+        close = df["close"].to_numpy(dtype=float)
         n = len(df)
         
-        for i in range(lookback, n - strength - 1):
-            current_candle = df.iloc[i]
-            future_candles = df.iloc[i+1:i+strength+1]
-            
-            # Calculate future move
-            future_return = (future_candles["close"].iloc[-1] - current_candle["close"]) / current_candle["close"]
-            
-            # Bullish Order Block (Demand Zone)
-            if self._is_bearish_candle(current_candle) and future_return > thresh_pct:
-                ob_zone = {
-                    "high": current_candle["high"],
-                    "low": current_candle["low"],
-                    "type": "demand"
-                }
-                
-                # Look for tap (price re-entering the zone)
-                tap_signal = self._find_zone_tap(df, i+1, ob_zone, n)
-                if tap_signal:
-                    tap_signal.update({
-                        "side": 1,  # Long
-                        "strategy_type": "OB_DEMAND"
-                    })
-                    signals.append(tap_signal)
-            
-            # Bearish Order Block (Supply Zone)
-            elif self._is_bullish_candle(current_candle) and future_return < -thresh_pct:
-                ob_zone = {
-                    "high": current_candle["high"],
-                    "low": current_candle["low"],
-                    "type": "supply"
-                }
-                
-                # Look for tap
-                tap_signal = self._find_zone_tap(df, i+1, ob_zone, n)
-                if tap_signal:
-                    tap_signal.update({
-                        "side": -1,  # Short
-                        "strategy_type": "OB_SUPPLY"
-                    })
-                    signals.append(tap_signal)
+        # Order block candidates: a bearish candle followed by a strong rally
+        # (demand zone) or a bullish candle followed by a strong drop (supply zone)
+        candidates = np.arange(lookback, max(n - strength - 1, lookback))
+        cand_close = close[candidates]
+        future_return = (close[candidates + strength] - cand_close) / cand_close
+        bearish = cand_close < open_[candidates]
+        bullish = cand_close > open_[candidates]
+        demand = bearish & (future_return > thresh_pct)
+        supply = ~demand & bullish & (future_return < -thresh_pct)
+        
+        zones = candidates[demand | supply]
+        sides = np.where(demand, 1, -1)[demand | supply]
+        
+        # First bar after each zone whose range overlaps it
+        taps = self._find_zone_taps(high, low, zones)
+        found = taps >= 0
+        zones, sides, taps = zones[found], sides[found], taps[found]
+        
+        entry = open_[taps]
+        atr = self.prior_atr(df)[taps]
+        stop_loss = self.calculate_stop_losses(entry, sides, atr)
         
-        return pd.DataFrame(signals) if signals else pd.DataFrame()
+        return self.build_signals(
+            df, taps,
+            entry=entry,
+            stop_loss=stop_loss,
+            take_profit=self.calculate_take_profits(entry, stop_loss, sides),
+            zone_high=high[zones],
+            zone_low=low[zones],
+            atr=atr,
+            side=sides,
+            strategy_type=np.where(sides == 1, "OB_DEMAND", "OB_SUPPLY"),
+        )
     
-    def _is_bearish_candle(self, candle):
-        """Check if candle is bearish"""
-        return candle["close"] < candle["open"]
+    def required_lookback(self) -> int:
+        # Zones older than tap_horizon bars are not searched when relabeling incrementally
+        return self.params.get("lookback", 20) + self.params.get("tap_horizon", 500)
     
-    def _is_bullish_candle(self, candle):
-        """Check if candle is bullish"""
-        return candle["close"] > candle["open"]
+    def required_lookahead(self) -> int:
+        # A zone is confirmed by the close `strength` bars after it
+        return self.params.get("strength", 3) + 1
     
-    def _find_zone_tap(self, df, start_idx, zone, end_idx):
-        """Find when price taps into the order block zone"""
-        for j in range(start_idx, min(end_idx, len(df))):
-            candle = df.iloc[j]
-            
-            # Check if candle overlaps with zone
-            if self._candle_overlaps_zone(candle, zone):
-                entry_price = candle["open"]
-                atr = self._calculate_atr(df, j)
-                
-                if zone["type"] == "demand":
-                    stop_loss = self.calculate_stop_loss(entry_price, 1, atr)
-                    take_profit = self.calculate_take_profit(entry_price, stop_loss, 1)
-                else:  # supply
-                    stop_loss = self.calculate_stop_loss(entry_price, -1, atr)
-                    take_profit = self.calculate_take_profit(entry_price, stop_loss, -1)
-                
-                return {
-                    "ts": candle["ts"],
-                    "instrument": candle["instrument"],
-                    "entry": float(entry_price),
-                    "stop_loss": float(stop_loss),
-                    "take_profit": float(take_profit),
-                    "zone_high": float(zone["high"]),
-                    "zone_low": float(zone["low"]),
-                    "atr": float(atr) if atr is not None else None
-                }
+    def _find_zone_taps(self, high, low, zones, max_block_cells=4_000_000):
+        """Index of the first bar after each zone bar that overlaps its
+        [low, high] range, or -1 if price never returns to it.
         
-        return None
-    
-    def _candle_overlaps_zone(self, candle, zone):
-        """Check if candle overlaps with order block zone"""
-        return (candle["low"] <= zone["high"]) and (candle["high"] >= zone["low"])
-    
-    def _calculate_atr(self, df, idx, period=14):
-        """Calculate Average True Range"""
-        if idx < period:
-            return None
+        Zones are searched together over growing blocks of forward offsets;
+        most are tapped within a few bars, so only the few still open are
+        carried into the larger blocks.
+        """
+        n = len(high)
+        taps = np.full(len(zones), -1, dtype=np.int64)
+        pending = np.arange(len(zones))
+        offset = 1
+        block = 8
         
-        high_low = df["high"].iloc[idx-period:idx] - df["low"].iloc[idx-period:idx]
-        high_close = np.abs(df["high"].iloc[idx-period:idx] - df["close"].shift(1).iloc[idx-period:idx])
-        low_close = np.abs(df["low"].iloc[idx-period:idx] - df["close"].shift(1).iloc[idx-period:idx])
+        while len(pending) and offset < n:
+            # Bound the (zones x offsets) temporaries
+            block = max(1, min(block, max_block_cells // len(pending)))
+            starts = zones[pending]
+            bars = starts[:, None] + np.arange(offset, offset + block)
+            in_range = bars < n
+            bars = np.minimum(bars, n - 1)
+            
+            overlaps = (in_range
+                        & (low[bars] <= high[starts][:, None])
+                        & (high[bars] >= low[starts][:, None]))
+            hit = overlaps.any(axis=1)
+            taps[pending[hit]] = bars[hit, overlaps[hit].argmax(axis=1)]
+            
+            # Zones that ran off the end of the data are never tapped
+            pending = pending[~hit & (starts + offset + block < n)]
+            offset += block
+            block *= 2
         
-        true_ranges = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        return true_ranges.mean()
+        return taps
 
 def find_ob_taps(df, lookback=20, strength=3, thresh_pct=0.015, buffer_pct=0.002, rr=2.0):
     """Legacy function for backward compatibility"""
@@ -21,65 +21,42 @@ class VWAPReversionStrategy(BaseStrategy):
         df = self._calculate_vwap(df)
         df = self._calculate_rsi(df)
         
-        signals = []
-        
         vwap_window = self.params.get("vwap_window", 60)
         band_pct = self.params.get("band_pct", 0.01)
         rsi_threshold = self.params.get("rsi_threshold", 35)
         
         vwap_col = f"vwap_{vwap_window}"
+        if vwap_col not in df.columns:
+            return pd.DataFrame()
+        
+        close = df["close"].to_numpy(dtype=float)
+        vwap = df[vwap_col].to_numpy(dtype=float)
+        rsi = df["rsi_14"].to_numpy(dtype=float)
         
-        for i in range(len(df)):
-            row = df.iloc[i]
-            
-            if pd.isna(row.get(vwap_col)) or pd.isna(row.get("rsi_14")):
-                continue
-            
-            vwap = row[vwap_col]
-            close = row["close"]
-            rsi = row["rsi_14"]
-            
-            # Long signal: price below VWAP band and RSI oversold
-            if (close < vwap * (1 - band_pct)) and (rsi < rsi_threshold):
-                entry_price = close
-                atr = self._get_atr(df, i)
-                stop_loss = self.calculate_stop_loss(entry_price, 1, atr)
-                take_profit = self.calculate_take_profit(entry_price, stop_loss, 1)
-                
-                signals.append({
-                    "ts": row["ts"],
-                    "instrument": row["instrument"],
-                    "entry": float(entry_price),
-                    "side": 1,
-                    "stop_loss": float(stop_loss),
-                    "take_profit": float(take_profit),
-                    "strategy_type": "VWAP_REVERT_LONG",
-                    "vwap": float(vwap),
-                    "rsi": float(rsi),
-                    "deviation": float((close - vwap) / vwap)
-                })
-            
-            # Short signal: price above VWAP band and RSI overbought
-            elif (close > vwap * (1 + band_pct)) and (rsi > (100 - rsi_threshold)):
-                entry_price = close
-                atr = self._get_atr(df, i)
-                stop_loss = self.calculate_stop_loss(entry_price, -1, atr)
-                take_profit = self.calculate_take_profit(entry_price, stop_loss, -1)
-                
-                signals.append({
-                    "ts": row["ts"],
-                    "instrument": row["instrument"],
-                    "entry": float(entry_price),
-                    "side": -1,
-                    "stop_loss": float(stop_loss),
-                    "take_profit": float(take_profit),
-                    "strategy_type": "VWAP_REVERT_SHORT",
-                    "vwap": float(vwap),
-                    "rsi": float(rsi),
-                    "deviation": float((close - vwap) / vwap)
-                })
+        # Long: price below the VWAP band and RSI oversold; short: above it and overbought
+        long_mask = (close < vwap * (1 - band_pct)) & (rsi < rsi_threshold)
+        short_mask = ~long_mask & (close > vwap * (1 + band_pct)) & (rsi > (100 - rsi_threshold))
+        rows = np.flatnonzero(long_mask | short_mask)
         
-        return pd.DataFrame(signals) if signals else pd.DataFrame()
+        side = np.where(long_mask[rows], 1, -1)
+        entry = close[rows]
+        stop_loss = self.calculate_stop_losses(entry, side, self.prior_atr(df)[rows])
+        
+        return self.build_signals(
+            df, rows,
+            entry=entry,
+            side=side,
+            stop_loss=stop_loss,
+            take_profit=self.calculate_take_profits(entry, stop_loss, side),
+            strategy_type=np.where(side == 1, "VWAP_REVERT_LONG", "VWAP_REVERT_SHORT"),
+            vwap=vwap[rows],
+            rsi=rsi[rows],
+            deviation=(entry - vwap[rows]) / vwap[rows],
+        )
+    
+    def required_lookback(self) -> int:
+        # Longest VWAP window; covers the 14-bar RSI and prior ATR
+        return 100
     
     def _calculate_vwap(self, df):
         """Calculate VWAP for different periods"""
@@ -101,18 +78,6 @@ class VWAPReversionStrategy(BaseStrategy):
         rs = gain / loss
         df["rsi_14"] = 100 - (100 / (1 + rs))
         return df
-    
-    def _get_atr(self, df, idx, period=14):
-        """Get ATR value at specific index"""
-        if idx < period:
-            return None
-        
-        high_low = df["high"].iloc[idx-period:idx] - df["low"].iloc[idx-period:idx]
-        high_close = np.abs(df["high"].iloc[idx-period:idx] - df["close"].shift(1).iloc[idx-period:idx])
-        low_close = np.abs(df["low"].iloc[idx-period:idx] - df["close"].shift(1).iloc[idx-period:idx])
-        
-        true_ranges = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        return true_ranges.mean()
 
 def vwap_revert_labels(df, vwap_col="vwap_60", rsi_col="rsi14", band_pct=0.01, 
                       rsi_threshold=35, buffer_pct=0.002, rr=1.5):
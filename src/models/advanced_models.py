@@ -4,6 +4,7 @@ Advanced ML Models for Trading - LSTM, Transformer, and Ensemble Models
 """
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 import torch
 import torch.nn as nn
@@ -22,7 +23,11 @@ device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 print(f"Using device: {device}")
 
 class TimeSeriesDataset(Dataset):
-    """Custom dataset for time series data"""
+    """Custom dataset for time series data
+    
+    With sequence_length=0 the sequences are already windowed (an array or
+    SequenceWindows) and labels holds one label per window.
+    """
     
     def __init__(self, sequences, labels, sequence_length=60):
         self.sequences = sequences
@@ -33,10 +38,47 @@ class TimeSeriesDataset(Dataset):
         return len(self.sequences) - self.sequence_length
     
     def __getitem__(self, idx):
-        sequence = self.sequences[idx:idx + self.sequence_length]
-        label = self.labels[idx + self.sequence_length]
+        if self.sequence_length == 0:
+            sequence = self.sequences[idx]
+            label = self.labels[idx]
+        else:
+            sequence = self.sequences[idx:idx + self.sequence_length]
+            label = self.labels[idx + self.sequence_length]
         return torch.FloatTensor(sequence), torch.FloatTensor([label])
 
+class SequenceWindows:
+    """Lazy (n_windows, sequence_length, n_features) array of sliding windows
+    
+    Window i is values[starts[i]:starts[i] + sequence_length], taken from a
+    sliding_window_view so the rows are stored once whatever the window
+    length. Indexing with an int returns a view; slices and index arrays
+    copy only the windows asked for.
+    """
+    
+    def __init__(self, values: np.ndarray, starts: np.ndarray, sequence_length: int):
+        self.values = values
+        self.starts = starts
+        self.sequence_length = sequence_length
+        if len(values) >= sequence_length:
+            # sliding_window_view puts the window axis last; move it before the features
+            self.windows = sliding_window_view(values, sequence_length, axis=0).transpose(0, 2, 1)
+        else:
+            self.windows = np.empty((0, sequence_length, values.shape[1]), dtype=values.dtype)
+    
+    @property
+    def shape(self):
+        return (len(self.starts), self.sequence_length, self.values.shape[1])
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def __getitem__(self, idx):
+        return self.windows[self.starts[idx]]
+    
+    def __array__(self, dtype=None, copy=None):
+        windows = self.windows[self.starts]
+        return windows if dtype is None else windows.astype(dtype)
+
 class LSTMTradingModel(nn.Module):
     """LSTM model for trading signal prediction"""
     
@@ -178,27 +220,20 @@ class AdvancedTradingModelTrainer:
         self.logger = logging.getLogger(__name__)
     
     def prepare_sequences(self, features_df: pd.DataFrame, labels_df: pd.DataFrame):
-        """Prepare sequential data for time series models"""
-        
-        self.logger.info("Preparing sequential data...")
+        """Prepare sequential data for time series models
         
-        # Merge features with labels
-        merged_data = []
+        Returns X as SequenceWindows over the scaled feature rows, so memory
+        stays rows x features whatever the sequence length, and y with one
+        label per window.
+        """
         
-        for instrument in features_df['instrument'].unique():
-            inst_features = features_df[features_df['instrument'] == instrument].sort_values('ts')
-            inst_labels = labels_df[labels_df['instrument'] == instrument].sort_values('ts')
-            
-            # Create binary labels for each timestamp
-            inst_features['has_signal'] = 0
-            for _, label_row in inst_labels.iterrows():
-                mask = inst_features['ts'] == label_row['ts']
-                if mask.any():
-                    inst_features.loc[mask, 'has_signal'] = 1
-            
-            merged_data.append(inst_features)
+        self.logger.info("Preparing sequential data...")
         
-        combined_data = pd.concat(merged_data, ignore_index=True)
+        # Flag bars that carry a signal with one join on (instrument, ts)
+        signal_keys = labels_df[['instrument', 'ts']].drop_duplicates().assign(has_signal=1)
+        signal_keys['ts'] = signal_keys['ts'].astype(features_df['ts'].dtype)
+        combined_data = features_df.merge(signal_keys, on=['instrument', 'ts'], how='left')
+        combined_data['has_signal'] = combined_data['has_signal'].fillna(0).astype(int)
         
         # Get feature columns
         feature_cols = [col for col in combined_data.columns 
@@ -206,32 +241,30 @@ class AdvancedTradingModelTrainer:
         
         self.feature_names = feature_cols
         
-        # Prepare sequences by instrument
-        all_sequences = []
-        all_labels = []
+        # Scale each instrument's rows into one matrix; a window is just a start row
+        values = np.empty((len(combined_data), len(feature_cols)), dtype=np.float32)
+        row_labels = np.empty(len(combined_data), dtype=int)
+        starts = []
+        offset = 0
         
-        for instrument in combined_data['instrument'].unique():
-            inst_data = combined_data[combined_data['instrument'] == instrument].sort_values('ts')
-            
+        for _, inst_data in combined_data.groupby('instrument', sort=False, observed=True):
             if len(inst_data) < self.sequence_length + 10:  # Need minimum data
                 continue
             
-            # Scale features
-            features = inst_data[feature_cols].fillna(0)
-            scaled_features = self.scaler.fit_transform(features)
+            inst_data = inst_data.sort_values('ts', kind='stable')
             
-            labels = inst_data['has_signal'].values
+            # Scale features
+            end = offset + len(inst_data)
+            values[offset:end] = self.scaler.fit_transform(inst_data[feature_cols].fillna(0))
+            row_labels[offset:end] = inst_data['has_signal'].values
             
-            # Create sequences
-            for i in range(len(scaled_features) - self.sequence_length):
-                seq = scaled_features[i:i + self.sequence_length]
-                label = labels[i + self.sequence_length]
-                
-                all_sequences.append(seq)
-                all_labels.append(label)
+            # Each window is labelled with the bar that follows it
+            starts.append(np.arange(offset, end - self.sequence_length))
+            offset = end
         
-        X = np.array(all_sequences)
-        y = np.array(all_labels)
+        starts = np.concatenate(starts) if starts else np.empty(0, dtype=int)
+        X = SequenceWindows(values[:offset], starts, self.sequence_length)
+        y = row_labels[starts + self.sequence_length]
         
         self.logger.info(f"Created {len(X)} sequences of length {self.sequence_length}")
         self.logger.info(f"Positive samples: {y.sum()}, Negative samples: {len(y) - y.sum()}")
@@ -0,0 +1,220 @@
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import os
+import sys
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from data.parquet_io import read_parquet, ROW_GROUP_SIZE
+
+# Metadata columns that never enter the feature matrix
+NON_FEATURE_COLUMNS = {"ts", "instrument", "open", "high", "low", "close", "volume"}
+
+KEY_COLUMNS = ["instrument", "ts"]
+
+# Files of an on-disk training dataset
+MATRIX_FILE = "X.npy"
+TARGET_FILE = "y.npy"
+WEIGHT_FILE = "weights.npy"
+META_FILE = "meta.json"
+
+
+def balanced_quotas(sizes, n):
+    """Split n draws as evenly over groups as their sizes allow.
+
+    Groups are filled smallest first, so a group too small for its share
+    passes the rest on to the larger ones. Draw from the groups in
+    np.argsort(sizes, kind="stable") order to use the quotas reproducibly.
+    """
+    quotas = np.zeros(len(sizes), dtype=np.int64)
+    remaining = n
+    for k, i in enumerate(np.argsort(sizes, kind="stable")):
+        quotas[i] = min(sizes[i], remaining // (len(sizes) - k))
+        remaining -= quotas[i]
+    return quotas
+
+
+def build_memmap_dataset(features_path, labels_path, out_dir, target_strategy=None,
+                         instruments=None, start=None, end=None, ratio=3, stratify=None,
+                         time_bins=10, random_state=None, batch_size=ROW_GROUP_SIZE):
+    """Build a training matrix on disk without loading the feature file.
+
+    Produces the same rows as TradingModelTrainer._create_training_data:
+    labelled bars first, in label order, then ratio negatives per label
+    sampled from the unlabelled bars in file order. Features are streamed
+    batch by batch into a float32 memory-mapped matrix (NaN filled with 0)
+    next to int8 targets and float32 sample weights; only the labels and
+    one batch are held in memory. A pass over just the instrument and ts
+    columns (two with stratify="time") precedes the full pass.
+
+    Returns (X, y, weights, feature_names) with the arrays opened
+    read-write so train() can scale X in place.
+    """
+    scope = {"instruments": instruments, "start": start, "end": end}
+    labels_df = read_parquet(labels_path, **scope)
+    if target_strategy:
+        labels_df = labels_df[labels_df["strategy"] == target_strategy].reset_index(drop=True)
+    label_keys = pd.MultiIndex.from_arrays(_key_arrays(labels_df))
+
+    dataset = ds.dataset(features_path, format="parquet")
+    row_filter = _scope_filter(dataset.schema, instruments, start, end)
+    feature_names = [name for name in dataset.schema.names if name not in NON_FEATURE_COLUMNS]
+
+    def scan(columns):
+        for batch in dataset.to_batches(columns=columns, filter=row_filter, batch_size=batch_size):
+            yield batch.to_pandas()
+
+    # Key pass: which labels have a feature row, and how many unlabelled bars each batch holds
+    instrument_codes = {}
+    matched = np.zeros(len(labels_df), dtype=bool)
+    candidate_counts = []
+    ts_min, ts_max = None, None
+    for keys in scan(KEY_COLUMNS):
+        inst, ts = _key_arrays(keys)
+        for name in pd.unique(inst):
+            instrument_codes.setdefault(name, len(instrument_codes))
+        matched |= label_keys.isin(pd.MultiIndex.from_arrays([inst, ts]))
+        candidate = ~pd.MultiIndex.from_arrays([inst, ts]).isin(label_keys)
+        if candidate.any():
+            ts_min = min(ts_min, ts[candidate].min()) if ts_min is not None else ts[candidate].min()
+            ts_max = max(ts_max, ts[candidate].max()) if ts_max is not None else ts[candidate].max()
+        if stratify == "instrument":
+            candidate_counts.append(np.bincount(_instrument_groups(inst[candidate], instrument_codes)))
+        else:
+            candidate_counts.append(np.array([candidate.sum()]))
+
+    edges = None
+    if stratify == "time":
+        edges = np.linspace(ts_min.astype(np.int64), ts_max.astype(np.int64), time_bins + 1)[1:-1] \
+            if ts_min is not None else np.array([])
+        candidate_counts = []
+        for keys in scan(KEY_COLUMNS):
+            inst, ts = _key_arrays(keys)
+            candidate = ~pd.MultiIndex.from_arrays([inst, ts]).isin(label_keys)
+            candidate_counts.append(np.bincount(_time_groups(ts[candidate], edges), minlength=time_bins))
+
+    # Per-batch candidate offsets within each group, then the sampled ranks per group
+    n_groups = max((len(counts) for counts in candidate_counts), default=1)
+    counts = np.zeros((len(candidate_counts), n_groups), dtype=np.int64)
+    for b, batch_counts in enumerate(candidate_counts):
+        counts[b, :len(batch_counts)] = batch_counts
+    offsets = np.vstack([np.zeros((1, n_groups), dtype=np.int64), np.cumsum(counts, axis=0)])
+    sizes = offsets[-1]
+
+    rng = np.random.default_rng(random_state)
+    n_negative = min(int(sizes.sum()), len(labels_df) * ratio)
+    present = np.flatnonzero(sizes)
+    quotas = np.zeros(n_groups, dtype=np.int64)
+    quotas[present] = balanced_quotas(sizes[present], n_negative)
+    ranks = [None] * n_groups
+    for g in present[np.argsort(sizes[present], kind="stable")]:
+        ranks[g] = np.sort(rng.choice(sizes[g], quotas[g], replace=False))
+
+    # Allocate the on-disk arrays
+    n_positive = int(matched.sum())
+    n_rows = n_positive + n_negative
+    os.makedirs(out_dir, exist_ok=True)
+    X = np.lib.format.open_memmap(os.path.join(out_dir, MATRIX_FILE), mode="w+",
+                                  dtype=np.float32, shape=(n_rows, len(feature_names)))
+    y = np.lib.format.open_memmap(os.path.join(out_dir, TARGET_FILE), mode="w+",
+                                  dtype=np.int8, shape=(n_rows,))
+    weights = np.lib.format.open_memmap(os.path.join(out_dir, WEIGHT_FILE), mode="w+",
+                                        dtype=np.float32, shape=(n_rows,))
+
+    positive_row = np.full(len(labels_df), -1, dtype=np.int64)
+    positive_row[matched] = np.arange(n_positive)
+    y[:n_positive] = (labels_df["side"].to_numpy()[matched] == 1)
+    confidence = labels_df["confidence"].to_numpy()[matched] if "confidence" in labels_df else 1.0
+    weights[:n_positive] = confidence * 2
+    y[n_positive:] = 0
+    weights[n_positive:] = 1.0
+    label_lookup = pd.DataFrame({"instrument": label_keys.get_level_values(0),
+                                 "ts": label_keys.get_level_values(1),
+                                 "label_row": np.arange(len(labels_df))})
+
+    # Feature pass: stream every feature column into its rows
+    next_negative = n_positive
+    for b, batch in enumerate(scan(KEY_COLUMNS + feature_names)):
+        values = batch[feature_names].to_numpy(dtype=np.float32)
+        values[np.isnan(values)] = 0
+        inst, ts = _key_arrays(batch)
+
+        hits = pd.DataFrame({"instrument": inst, "ts": ts, "pos": np.arange(len(batch))}).merge(
+            label_lookup, on=KEY_COLUMNS, how="inner"
+        )
+        X[positive_row[hits["label_row"].to_numpy()]] = values[hits["pos"].to_numpy()]
+
+        candidate = np.flatnonzero(~pd.MultiIndex.from_arrays([inst, ts]).isin(label_keys))
+        if stratify == "instrument":
+            groups = _instrument_groups(inst[candidate], instrument_codes)
+        elif stratify == "time":
+            groups = _time_groups(ts[candidate], edges)
+        else:
+            groups = np.zeros(len(candidate), dtype=np.int64)
+        sampled = []
+        for g in np.flatnonzero(counts[b]):
+            lo, hi = offsets[b, g], offsets[b + 1, g]
+            picked = ranks[g][np.searchsorted(ranks[g], lo):np.searchsorted(ranks[g], hi)] - lo
+            sampled.append(candidate[groups == g][picked])
+        if sampled:
+            sampled = np.sort(np.concatenate(sampled))
+            X[next_negative:next_negative + len(sampled)] = values[sampled]
+            next_negative += len(sampled)
+
+    _write_meta(out_dir, feature_names, n_positive, n_negative)
+    X.flush()
+    y.flush()
+    weights.flush()
+    print(f"Built {n_rows} x {len(feature_names)} training matrix in {out_dir} "
+          f"({n_positive} labelled, {n_negative} negative)")
+    return X, y, weights, feature_names
+
+
+def load_memmap_dataset(out_dir, mode="r"):
+    """Open a dataset written by build_memmap_dataset as memory-mapped arrays"""
+    with open(os.path.join(out_dir, META_FILE)) as f:
+        meta = json.load(f)
+    X = np.load(os.path.join(out_dir, MATRIX_FILE), mmap_mode=mode)
+    y = np.load(os.path.join(out_dir, TARGET_FILE), mmap_mode=mode)
+    weights = np.load(os.path.join(out_dir, WEIGHT_FILE), mmap_mode=mode)
+    return X, y, weights, meta["feature_names"]
+
+
+def _write_meta(out_dir, feature_names, n_positive, n_negative):
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump({"feature_names": feature_names, "positive": n_positive,
+                   "negative": n_negative}, f, indent=2)
+
+
+def _key_arrays(df):
+    """(instrument, ts) as str and datetime64[ns] arrays, whatever the file's schema"""
+    return (df["instrument"].astype(str).to_numpy(),
+            df["ts"].to_numpy().astype("datetime64[ns]"))
+
+
+def _instrument_groups(inst, instrument_codes):
+    return pd.Index(list(instrument_codes)).get_indexer(inst)
+
+
+def _time_groups(ts, edges):
+    return np.searchsorted(edges, ts.astype(np.int64), side="right")
+
+
+def _scope_filter(schema, instruments, start, end):
+    """Dataset filter matching read_parquet's instruments/start/end pushdown"""
+    conditions = []
+    if instruments is not None:
+        conditions.append(ds.field("instrument").isin(list(instruments)))
+    ts_type = schema.field("ts").type
+    if start is not None:
+        conditions.append(ds.field("ts") >= pa.scalar(pd.Timestamp(start), type=ts_type))
+    if end is not None:
+        conditions.append(ds.field("ts") <= pa.scalar(pd.Timestamp(end), type=ts_type))
+    row_filter = None
+    for condition in conditions:
+        row_filter = condition if row_filter is None else row_filter & condition
+    return row_filter
@@ -2,6 +2,8 @@ import argparse
 import numpy as np
 import pandas as pd
 import joblib
+import os
+import sys
 from pathlib import Path
 from sklearn.model_selection import train_test_split, TimeSeriesSplit, cross_val_score
 from sklearn.metrics import classification_report, roc_auc_score, accuracy_score, precision_recall_curve
@@ -9,6 +11,14 @@ from sklearn.preprocessing import StandardScaler
 import warnings
 warnings.filterwarnings('ignore')
 
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from features.feature_store import FeatureStore
+from data.parquet_io import read_parquet
+from models.dataset import build_memmap_dataset, balanced_quotas, NON_FEATURE_COLUMNS
+from services.model_registry import model_registry
+
 try:
     import lightgbm as lgb
     LIGHTGBM_AVAILABLE = True
@@ -17,21 +27,50 @@ except (ImportError, OSError) as e:
     LIGHTGBM_AVAILABLE = False
     from sklearn.ensemble import RandomForestClassifier
 
+# Ways _generate_negative_samples can spread its draws
+NEGATIVE_STRATIFICATION = (None, "time", "instrument")
+
 class TradingModelTrainer:
     """Advanced ML model trainer for trading signals"""
     
-    def __init__(self, model_type="lightgbm"):
+    def __init__(self, model_type="lightgbm", negative_sampling=None):
         self.model_type = model_type
+        self.negative_sampling = negative_sampling
         self.model = None
         self.scaler = StandardScaler()
         self.feature_importance = None
         self.feature_names = None
         
-    def prepare_dataset(self, features_path, labels_path, target_strategy=None):
-        """Prepare training dataset from features and labels"""
+    def prepare_dataset(self, features_path, labels_path, target_strategy=None, raw_data_path=None,
+                        instruments=None, start=None, end=None, memmap_dir=None):
+        """Prepare training dataset from features and labels.
+        
+        With raw_data_path, features come from the shared FeatureStore built
+        over that OHLCV file instead of features_path. instruments and the
+        start/end ts range are pushed down to the parquet reads. With
+        memmap_dir, the dataset is streamed into memory-mapped arrays in that
+        directory instead (see build_memmap_dataset), for feature files larger
+        than RAM.
+        """
+        if memmap_dir:
+            if raw_data_path:
+                raise ValueError("memmap_dir needs a features file, not raw_data_path")
+            print(f"Streaming dataset into {memmap_dir}...")
+            X, y, sample_weights, self.feature_names = build_memmap_dataset(
+                features_path, labels_path, memmap_dir, target_strategy=target_strategy,
+                instruments=instruments, start=start, end=end, stratify=self.negative_sampling
+            )
+            print(f"Training dataset: {X.shape[0]} samples, {X.shape[1]} features")
+            print(f"Positive samples: {int(y.sum())}, Negative samples: {len(y) - int(y.sum())}")
+            return X, y, sample_weights
+        
         print("Loading data...")
-        features_df = pd.read_parquet(features_path)
-        labels_df = pd.read_parquet(labels_path)
+        scope = {"instruments": instruments, "start": start, "end": end}
+        if raw_data_path:
+            features_df = FeatureStore().get_features(read_parquet(raw_data_path, **scope))
+        else:
+            features_df = read_parquet(features_path, **scope)
+        labels_df = read_parquet(labels_path, **scope)
         
         print(f"Loaded {len(features_df)} feature rows and {len(labels_df)} labels")
         
@@ -59,7 +98,9 @@ class TradingModelTrainer:
         )
         
         # Negative samples: random timestamps without signals
-        negative_samples = self._generate_negative_samples(features_df, labels_df)
+        negative_samples = self._generate_negative_samples(
+            features_df, labels_df, stratify=self.negative_sampling
+        )
         
         # Combine samples
         all_samples = pd.concat([positive_samples, negative_samples], ignore_index=True)
@@ -80,35 +121,63 @@ class TradingModelTrainer:
         
         return X, y, sample_weights
     
-    def _generate_negative_samples(self, features_df, labels_df, ratio=3):
-        """Generate negative samples (no signal timestamps)"""
-        # Get all timestamps
-        all_timestamps = set(zip(features_df["instrument"], features_df["ts"]))
-        signal_timestamps = set(zip(labels_df["instrument"], labels_df["ts"]))
-        
-        # Get timestamps without signals
-        no_signal_timestamps = list(all_timestamps - signal_timestamps)
+    def _generate_negative_samples(self, features_df, labels_df, ratio=3, stratify=None,
+                                   time_bins=10, random_state=None):
+        """Generate negative samples (no signal timestamps).
+        
+        Feature rows whose (instrument, ts) has no label are drawn by
+        position and gathered with one take. stratify=None draws uniformly;
+        "time" spreads the draws evenly over time_bins equal-duration bins,
+        "instrument" evenly over instruments, topping up from the larger
+        groups when a small one runs out.
+        """
+        if stratify not in NEGATIVE_STRATIFICATION:
+            raise ValueError(f"Unknown stratify {stratify!r}, expected one of {NEGATIVE_STRATIFICATION}")
+        rng = np.random.default_rng(random_state)
+        
+        # Anti-join on (instrument, ts), keeping one row per key
+        instruments = pd.Index(features_df["instrument"].astype(str).unique())
+        feature_keys = pd.MultiIndex.from_arrays([
+            instruments.get_indexer(features_df["instrument"].astype(str)),
+            features_df["ts"].to_numpy().astype("datetime64[ns]"),
+        ])
+        signal_keys = pd.MultiIndex.from_arrays([
+            instruments.get_indexer(labels_df["instrument"].astype(str)),
+            labels_df["ts"].to_numpy().astype("datetime64[ns]"),
+        ])
+        no_signal = ~feature_keys.isin(signal_keys) & ~feature_keys.duplicated()
+        candidates = np.flatnonzero(no_signal)
         
         # Sample negative examples
-        n_negative = min(len(no_signal_timestamps), len(labels_df) * ratio)
-        sampled_negative = np.random.choice(len(no_signal_timestamps), n_negative, replace=False)
-        
-        negative_keys = [no_signal_timestamps[i] for i in sampled_negative]
+        n_negative = min(len(candidates), len(labels_df) * ratio)
+        if stratify is None:
+            sampled = rng.choice(candidates, n_negative, replace=False)
+        else:
+            if stratify == "time":
+                ts = feature_keys.get_level_values(1).asi8[candidates]
+                edges = np.linspace(ts.min(), ts.max(), time_bins + 1)[1:-1] if len(ts) else []
+                groups = np.searchsorted(edges, ts, side="right")
+            else:
+                groups = feature_keys.codes[0][candidates]
+            sampled = self._balanced_choice(rng, candidates, groups, n_negative)
         
         # Create negative samples dataframe
-        negative_data = []
-        for instrument, ts in negative_keys:
-            row = features_df[(features_df["instrument"] == instrument) & 
-                            (features_df["ts"] == ts)].iloc[0].to_dict()
-            row["side"] = 0  # No signal
-            negative_data.append(row)
-        
-        return pd.DataFrame(negative_data)
+        negative_samples = features_df.take(np.sort(sampled)).reset_index(drop=True)
+        negative_samples["side"] = 0  # No signal
+        return negative_samples
+    
+    def _balanced_choice(self, rng, candidates, groups, n):
+        """Draw n candidates without replacement, as evenly across groups as their sizes allow"""
+        group_ids, sizes = np.unique(groups, return_counts=True)
+        quotas = balanced_quotas(sizes, n)
+        return np.concatenate([
+            rng.choice(candidates[groups == group_ids[i]], quotas[i], replace=False)
+            for i in np.argsort(sizes, kind="stable")
+        ])
     
     def _get_feature_columns(self, features_df):
         """Get feature columns (exclude metadata columns)"""
-        exclude_cols = {"ts", "instrument", "open", "high", "low", "close", "volume"}
-        return [col for col in features_df.columns if col not in exclude_cols]
+        return [col for col in features_df.columns if col not in NON_FEATURE_COLUMNS]
     
     def train_lightgbm(self, X_train, y_train, sample_weights_train, X_val, y_val):
         """Train LightGBM model"""
@@ -189,6 +258,11 @@ class TradingModelTrainer:
         
         # Split data (time-aware split)
         split_idx = int(len(X) * (1 - test_size))
+        if isinstance(X, np.ndarray):
+            X_train_scaled, X_val_scaled = self._scale_in_place(X, split_idx)
+            return self._fit(X_train_scaled, y[:split_idx], sample_weights[:split_idx],
+                             X_val_scaled, y[split_idx:])
+        
         X_train, X_val = X.iloc[:split_idx], X.iloc[split_idx:]
         y_train, y_val = y.iloc[:split_idx], y.iloc[split_idx:]
         sample_weights_train = sample_weights.iloc[:split_idx]
@@ -205,7 +279,25 @@ class TradingModelTrainer:
             index=X_val.index
         )
         
-        # Train model
+        return self._fit(X_train_scaled, y_train, sample_weights_train, X_val_scaled, y_val)
+    
+    def _scale_in_place(self, X, split_idx, chunk_rows=65536):
+        """Fit the scaler on X[:split_idx] and scale all of X, chunk by chunk.
+        
+        For memory-mapped matrices: neither the fit nor the transform holds
+        more than chunk_rows rows in memory. Returns the train and validation
+        views of the scaled matrix.
+        """
+        for lo in range(0, split_idx, chunk_rows):
+            self.scaler.partial_fit(X[lo:min(lo + chunk_rows, split_idx)])
+        for lo in range(0, len(X), chunk_rows):
+            X[lo:lo + chunk_rows] = self.scaler.transform(X[lo:lo + chunk_rows])
+        if hasattr(X, "flush"):
+            X.flush()
+        return X[:split_idx], X[split_idx:]
+    
+    def _fit(self, X_train_scaled, y_train, sample_weights_train, X_val_scaled, y_val):
+        """Train the configured model on scaled features and evaluate it"""
         if LIGHTGBM_AVAILABLE and self.model_type == "lightgbm":
             model = self.train_lightgbm(
                 X_train_scaled, y_train, sample_weights_train, 
@@ -253,21 +345,35 @@ class TradingModelTrainer:
         
         return {"accuracy": accuracy, "auc": auc}
     
-    def save_model(self, model_path):
-        """Save trained model and scaler"""
+    def save_model(self, model_path, register_as=None):
+        """Save trained model and scaler
+        
+        With register_as, the same artifact is also published as the next
+        version of that name in the model registry, which running engines
+        pick up on their next cycle.
+        """
         model_dir = Path(model_path).parent
         model_dir.mkdir(parents=True, exist_ok=True)
         
         # Save model
-        joblib.dump({
+        artifact = {
             'model': self.model,
             'scaler': self.scaler,
             'feature_names': self.feature_names,
             'feature_importance': self.feature_importance,
             'model_type': self.model_type
-        }, model_path)
+        }
+        joblib.dump(artifact, model_path)
         
         print(f"Model saved to {model_path}")
+        
+        if register_as:
+            version = model_registry.register(register_as, artifact, metadata={
+                'model_type': self.model_type,
+                'feature_names': self.feature_names,
+                'source': str(model_path)
+            })
+            print(f"Registered as {register_as} {version}")
     
     def cross_validate(self, X, y, cv=5):
         """Perform cross-validation"""
@@ -298,24 +404,45 @@ def main():
                        help="Type of model to train")
     parser.add_argument("--strategy", default=None,
                        help="Train model for specific strategy only")
+    parser.add_argument("--raw-data", default=None,
+                       help="OHLCV file to serve features from the feature store instead of --features")
+    parser.add_argument("--instruments", nargs="+", default=None,
+                       help="Only load these instruments")
+    parser.add_argument("--start", default=None,
+                       help="Only load bars at or after this timestamp")
+    parser.add_argument("--end", default=None,
+                       help="Only load bars at or before this timestamp")
+    parser.add_argument("--negative-sampling", default=None,
+                       choices=[s for s in NEGATIVE_STRATIFICATION if s],
+                       help="Spread negative samples evenly over time or instruments (default: uniform)")
+    parser.add_argument("--memmap-dir", default=None,
+                       help="Stream the dataset into memory-mapped arrays in this directory "
+                            "to train on feature files larger than RAM")
+    parser.add_argument("--register", default=None,
+                       help="Also publish the model as a new version of this name in the model registry")
     
     args = parser.parse_args()
     
     # Initialize trainer
-    trainer = TradingModelTrainer(model_type=args.model_type)
+    trainer = TradingModelTrainer(model_type=args.model_type, negative_sampling=args.negative_sampling)
     
     # Prepare dataset
     X, y, sample_weights = trainer.prepare_dataset(
         args.features, 
         args.labels, 
-        target_strategy=args.strategy
+        target_strategy=args.strategy,
+        raw_data_path=args.raw_data,
+        instruments=args.instruments,
+        start=args.start,
+        end=args.end,
+        memmap_dir=args.memmap_dir
     )
     
     # Train model
     model = trainer.train(X, y, sample_weights)
     
     # Save model
-    trainer.save_model(args.out)
+    trainer.save_model(args.out, register_as=args.register)
     
     print(f"\nTraining completed successfully!")
     print(f"Model saved to: {args.out}")
@@ -18,6 +18,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from agents.trading_agent import TradingAgent
 from execution.order_gateway import OrderGateway, place_market_order
 from features.build_features import FeatureEngineer
+from features.feature_store import FeatureStore
 from data.sample_generator import SyntheticDataGenerator
 from ingestion.load_sample import DataLoader
 
@@ -30,6 +31,7 @@ class TradingOrchestrator:
         # Initialize components
         self.data_loader = DataLoader()
         self.feature_engineer = FeatureEngineer()
+        self.feature_store = FeatureStore(feature_engineer=self.feature_engineer)
         self.trading_agents = {}
         self.order_gateway = None
         
@@ -270,8 +272,8 @@ class TradingOrchestrator:
             if self.market_data is None:
                 return False
             
-            # Build features
-            self.latest_features = self.feature_engineer.build_all_features(self.market_data)
+            # Serve features from the store; only newly appended bars are rebuilt
+            self.latest_features = self.feature_store.get_features(self.market_data)
             
             self.logger.info(f"Updated features: {len(self.latest_features)} rows, "
                            f"{len(self.feature_engineer.feature_columns)} features")
@@ -16,6 +16,7 @@ import os
 from typing import Dict, List, Optional
 import threading
 import queue
+from collections import deque
 
 # Add project path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -24,15 +25,21 @@ import ccxt
 import yfinance as yf
 from ingestion.load_sample import DataLoader
 from features.build_features import FeatureEngineer
+from features.incremental_features import IncrementalFeatureEngine
+from data.parquet_io import write_parquet
 
 class LiveDataService:
     """Service that provides real-time market data to the trading system"""
     
-    def __init__(self):
+    def __init__(self, compact_storage=False):
         self.data_loader = DataLoader()
+        self.compact_storage = compact_storage  # compact parquet schema for feature files
         self.feature_engineer = FeatureEngineer()
+        self.incremental_features = IncrementalFeatureEngine()
         self.latest_data = {}
         self.latest_features = {}
+        self.feature_history = {}
+        self.last_feature_ts = {}
         self.is_running = False
         self.update_interval = 60  # 1 minute updates
         
@@ -148,15 +155,16 @@ class LiveDataService:
                 for symbol, data in self.latest_data.items():
                     if data is not None and not data.empty:
                         try:
-                            # Generate features
-                            features_df = self.feature_engineer.build_all_features(data)
+                            # Generate features for bars not seen yet
+                            features_df = self.update_incremental_features(symbol, data)
                             
                             if not features_df.empty:
                                 self.latest_features[symbol] = features_df
                                 processed_count += 1
                                 
                                 # Save to files for API access
-                                features_df.to_parquet(f"data/live_features_{symbol}.parquet", index=False)
+                                write_parquet(features_df, f"data/live_features_{symbol}.parquet",
+                                              compact=self.compact_storage)
                                 data.to_parquet(f"data/live_data_{symbol}.parquet", index=False)
                         
                         except Exception as e:
@@ -173,6 +181,24 @@ class LiveDataService:
                 self.logger.error(f"Data processing error: {e}")
                 await asyncio.sleep(60)
     
+    def update_incremental_features(self, symbol, data):
+        """Feed only new bars into the incremental feature engine and return recent feature rows"""
+        
+        last_ts = self.last_feature_ts.get(symbol)
+        new_bars = data if last_ts is None else data[data['ts'] > last_ts]
+        
+        if symbol not in self.feature_history:
+            self.feature_history[symbol] = deque(maxlen=200)
+        history = self.feature_history[symbol]
+        
+        for bar in new_bars.sort_values('ts').to_dict('records'):
+            history.append(self.incremental_features.update(bar))
+        
+        if not new_bars.empty:
+            self.last_feature_ts[symbol] = new_bars['ts'].max()
+        
+        return pd.DataFrame(list(history))
+    
     async def update_main_data_files(self):
         """Update main data files with live data"""
         
@@ -205,7 +231,7 @@ class LiveDataService:
                 # Update main features file
                 combined_features = pd.concat(all_features, ignore_index=True)
                 combined_features = combined_features.sort_values('ts').tail(1000)
-                combined_features.to_parquet("data/live_features.parquet", index=False)
+                write_parquet(combined_features, "data/live_features.parquet", compact=self.compact_storage)
                 
                 self.logger.info(f"  📄 Updated live features: {len(combined_features)} records")
         
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Model registry - versioned model artifacts with a warm in-process cache
+"""
+
+import os
+import errno
+import json
+import time
+import shutil
+import threading
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import joblib
+import logging
+
+REGISTRY_ROOT = 'models/registry'
+ARTIFACT_FILE = 'model.joblib'
+METADATA_FILE = 'metadata.json'
+CURRENT_FILE = 'CURRENT'
+
+
+class ModelRegistry:
+    """Versioned model store that keeps loaded models in memory
+
+    Registered models live in <root>/<name>/v0001, v0002, ... next to a
+    CURRENT file naming the version in use. Publishing a version writes it
+    under a temporary name, renames it into place and then swaps CURRENT,
+    so readers never see a half-written model. get() re-reads CURRENT on
+    every call and loads a newly published version before handing it out;
+    a running loop that calls get() each cycle switches over without a
+    restart.
+
+    Plain artifact paths outside the registry are cached too (load and
+    load_json) and reloaded when the file's mtime or size changes.
+    Artifacts are loaded with joblib's mmap_mode, so large numpy arrays
+    are paged in from disk and shared between processes.
+    """
+
+    def __init__(self, root: str = REGISTRY_ROOT, mmap_mode: Optional[str] = 'r'):
+        self.root = root
+        self.mmap_mode = mmap_mode
+        self._cache = {}  # key -> (signature, object)
+        self._lock = threading.RLock()
+        self._stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'load_seconds': 0.0}
+        self._load_times = {}  # key -> seconds of the last load
+        self.logger = logging.getLogger('ModelRegistry')
+
+    def register(self, name: str, artifact: Any, metadata: Dict = None) -> str:
+        """Store artifact as the next version of name and make it current"""
+        model_dir = os.path.join(self.root, name)
+        os.makedirs(model_dir, exist_ok=True)
+
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=model_dir)
+        try:
+            joblib.dump(artifact, os.path.join(staging, ARTIFACT_FILE))
+            while True:
+                version = self._next_version(name)
+                with open(os.path.join(staging, METADATA_FILE), 'w') as f:
+                    json.dump({
+                        'name': name,
+                        'version': version,
+                        'registered_at': datetime.now().isoformat(),
+                        **(metadata or {})
+                    }, f, indent=2, default=str)
+                try:
+                    os.rename(staging, os.path.join(model_dir, version))
+                    break
+                except OSError as e:
+                    if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                        raise
+                    # Another writer took this version number
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self.promote(name, version)
+        self.logger.info(f"📦 Registered {name} {version}")
+        return version
+
+    def promote(self, name: str, version: str):
+        """Point name's CURRENT at version (also used to roll back)"""
+        if version not in self.versions(name):
+            raise KeyError(f"Unknown version {version} of model {name}")
+        model_dir = os.path.join(self.root, name)
+        fd, tmp_path = tempfile.mkstemp(prefix='.current-', dir=model_dir)
+        with os.fdopen(fd, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(model_dir, CURRENT_FILE))
+
+    def names(self) -> List[str]:
+        """Registered model names that have a current version"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, CURRENT_FILE))
+        )
+
+    def versions(self, name: str) -> List[str]:
+        """Published versions of name, oldest first"""
+        model_dir = os.path.join(self.root, name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted((entry for entry in os.listdir(model_dir) if _version_number(entry) is not None),
+                      key=_version_number)
+
+    def current_version(self, name: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, name, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def get(self, name: str, version: str = None) -> Any:
+        """Loaded artifact for name at version (default: the current one)"""
+        version = version or self.current_version(name)
+        if version is None:
+            raise KeyError(f"No registered model named {name}")
+        path = os.path.join(self.root, name, version, ARTIFACT_FILE)
+        # Published versions never change, so the version is the signature
+        return self._cached(('model', name), version, lambda: self._load_artifact(path))
+
+    def metadata(self, name: str, version: str = None) -> Dict:
+        """Metadata stored with name at version (default: the current one)"""
+        version = version or self.current_version(name)
+        if version is None:
+            raise KeyError(f"No registered model named {name}")
+        path = os.path.join(self.root, name, version, METADATA_FILE)
+        return self._cached(('metadata', name), version, lambda: self._load_json(path))
+
+    def load(self, path: str) -> Any:
+        """Artifact at a plain joblib path, reloaded only when the file changes"""
+        return self._cached(('file', os.path.abspath(path)), self._signature(path),
+                            lambda: self._load_artifact(path))
+
+    def load_json(self, path: str) -> Dict:
+        """JSON document at path, reloaded only when the file changes"""
+        return self._cached(('json', os.path.abspath(path)), self._signature(path),
+                            lambda: self._load_json(path))
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit/miss counts and load times"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+                'cached': len(self._cache),
+                'last_load_seconds': {
+                    ':'.join(key): seconds for key, seconds in self._load_times.items()
+                }
+            }
+
+    def clear(self):
+        """Drop every cached object"""
+        with self._lock:
+            self._cache.clear()
+
+    def _cached(self, key, signature, loader):
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == signature:
+                self._stats['hits'] += 1
+                return cached[1]
+
+            self._stats['misses'] += 1
+            started = time.perf_counter()
+            try:
+                obj = loader()
+            except Exception as e:
+                if cached is None:
+                    raise
+                # A file caught mid-write keeps serving the previous copy
+                self.logger.warning(f"⚠️  Reload of {key[1]} failed, keeping cached copy: {e}")
+                return cached[1]
+            seconds = time.perf_counter() - started
+
+            self._stats['load_seconds'] += seconds
+            self._load_times[key] = seconds
+            if cached is not None:
+                self._stats['reloads'] += 1
+                self.logger.info(f"🔄 Reloaded {key[1]} ({signature}) in {seconds:.3f}s")
+            self._cache[key] = (signature, obj)
+            return obj
+
+    def _load_artifact(self, path):
+        return joblib.load(path, mmap_mode=self.mmap_mode)
+
+    def _load_json(self, path):
+        with open(path) as f:
+            return json.load(f)
+
+    def _signature(self, path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _next_version(self, name):
+        versions = self.versions(name)
+        number = _version_number(versions[-1]) + 1 if versions else 1
+        return f"v{number:04d}"
+
+
+def _version_number(entry):
+    """Integer of a vNNNN version directory name, None for anything else"""
+    if entry.startswith('v') and entry[1:].isdigit():
+        return int(entry[1:])
+    return None
+
+
+# Shared in-process registry
+model_registry = ModelRegistry()
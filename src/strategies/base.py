@@ -3,6 +3,24 @@ import numpy as np
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional
 import yaml
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from features.rolling_kernels import rolling_reduce
+from features.build_features import FeatureEngineer
+from data.arrow_ipc import PYARROW_AVAILABLE, IPC_TMP_ROOT, read_ipc, write_ipc
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+
+# How StrategyManager runs its strategies
+EXECUTORS = ("serial", "thread", "process")
 
 class BaseStrategy(ABC):
     """Base class for all trading strategies"""
@@ -27,6 +45,18 @@ class BaseStrategy(ABC):
         """Generate trading signals - must be implemented by child classes"""
         pass
     
+    def required_lookback(self) -> int:
+        """Bars of history a signal at a given bar depends on.
+        
+        Incremental labeling feeds this many bars before the first bar it
+        relabels; strategies with shorter or longer memory override it.
+        """
+        return 200
+    
+    def required_lookahead(self) -> int:
+        """Bars after a given bar its signal depends on"""
+        return 0
+    
     def validate_data(self, df: pd.DataFrame) -> bool:
         """Validate input data"""
         required_cols = ["ts", "open", "high", "low", "close", "volume", "instrument"]
@@ -67,62 +97,177 @@ class BaseStrategy(ABC):
         else:  # Short
             return entry_price - (risk * risk_reward)
 
+    def calculate_stop_losses(self, entry: np.ndarray, side: np.ndarray, atr: np.ndarray) -> np.ndarray:
+        """Array form of calculate_stop_loss; rows with NaN ATR use the percentage stop"""
+        buffer_pct = self.params.get("buffer_pct", 0.002)
+        atr_multiplier = self.params.get("atr_multiplier", 1.5)
+        
+        atr_stop = np.where(side == 1, entry - (atr * atr_multiplier), entry + (atr * atr_multiplier))
+        pct_stop = np.where(side == 1, entry * (1 - buffer_pct), entry * (1 + buffer_pct))
+        return np.where(np.isnan(atr), pct_stop, atr_stop)
+    
+    def calculate_take_profits(self, entry: np.ndarray, stop_loss: np.ndarray, side: np.ndarray) -> np.ndarray:
+        """Array form of calculate_take_profit"""
+        risk_reward = self.params.get("risk_reward", 2.0)
+        risk = np.abs(entry - stop_loss)
+        return np.where(side == 1, entry + (risk * risk_reward), entry - (risk * risk_reward))
+    
+    def prior_atr(self, df: pd.DataFrame, period: int = 14) -> np.ndarray:
+        """ATR over the `period` bars before each bar, NaN for the first `period` bars.
+        
+        Matches the mean of the per-bar true ranges over rows idx-period..idx-1
+        exactly, so array strategies reproduce the old per-row ATR lookups.
+        """
+        high = df["high"].to_numpy(dtype=float)
+        low = df["low"].to_numpy(dtype=float)
+        close = df["close"].to_numpy(dtype=float)
+        prev_close = np.r_[np.nan, close[:-1]]
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        # Row r holds the mean of true_range[r - period + 1 : r + 1]; bar idx uses row idx - 1
+        window_mean = rolling_reduce(true_range, period, lambda windows: windows.sum(axis=1) / period)
+        return np.r_[np.nan, window_mean[:-1]]
+    
+    def build_signals(self, df: pd.DataFrame, rows: np.ndarray, **columns) -> pd.DataFrame:
+        """One signal per bar in rows: ts and instrument from df, then the given columns in order"""
+        if len(rows) == 0:
+            return pd.DataFrame()
+        
+        signals = pd.DataFrame({
+            "ts": df["ts"].iloc[rows].reset_index(drop=True),
+            "instrument": df["instrument"].iloc[rows].reset_index(drop=True),
+        })
+        for name, values in columns.items():
+            signals[name] = values
+        return signals
+
 class SignalValidator:
     """Validates trading signals for consistency and quality"""
     
-    @staticmethod
-    def validate_signals(signals: pd.DataFrame) -> tuple[bool, str]:
-        """Validate signal dataframe"""
-        required_cols = ["ts", "instrument", "side", "entry", "stop_loss", "take_profit"]
+    REQUIRED_COLUMNS = ["ts", "instrument", "side", "entry", "stop_loss", "take_profit"]
+    
+    # Per-row reason codes, in the order they are checked
+    VALID = "valid"
+    NULL_VALUES = "null_values"
+    INVALID_SIDE = "invalid_side"
+    LONG_STOP_ABOVE_ENTRY = "long_stop_above_entry"
+    LONG_TARGET_BELOW_ENTRY = "long_target_below_entry"
+    SHORT_STOP_BELOW_ENTRY = "short_stop_below_entry"
+    SHORT_TARGET_ABOVE_ENTRY = "short_target_above_entry"
+    
+    REASON_CODES = [
+        VALID,
+        NULL_VALUES,
+        INVALID_SIDE,
+        LONG_STOP_ABOVE_ENTRY,
+        LONG_TARGET_BELOW_ENTRY,
+        SHORT_STOP_BELOW_ENTRY,
+        SHORT_TARGET_ABOVE_ENTRY,
+    ]
+    
+    REASON_MESSAGES = {
+        LONG_STOP_ABOVE_ENTRY: "Long stop loss must be below entry",
+        LONG_TARGET_BELOW_ENTRY: "Long take profit must be above entry",
+        SHORT_STOP_BELOW_ENTRY: "Short stop loss must be above entry",
+        SHORT_TARGET_ABOVE_ENTRY: "Short take profit must be below entry",
+    }
+    
+    @classmethod
+    def check_rows(cls, signals: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
+        """Validate every signal at once.
         
-        # Check required columns
-        missing_cols = [col for col in required_cols if col not in signals.columns]
+        Returns a boolean validity mask and a reason code per row, both
+        aligned with signals.index; a row failing several checks gets the
+        code of the first one. Missing required columns raise KeyError.
+        """
+        missing_cols = [col for col in cls.REQUIRED_COLUMNS if col not in signals.columns]
         if missing_cols:
-            return False, f"Missing columns: {missing_cols}"
+            raise KeyError(f"Missing columns: {missing_cols}")
+        
+        side = signals["side"].to_numpy()
+        entry = signals["entry"].to_numpy(dtype=float)
+        stop_loss = signals["stop_loss"].to_numpy(dtype=float)
+        take_profit = signals["take_profit"].to_numpy(dtype=float)
+        long = side == 1
+        short = side == -1
         
-        # Check for null values
-        null_counts = signals[required_cols].isnull().sum()
-        if null_counts.any():
+        # np.select picks the first matching condition, so codes follow REASON_CODES order
+        conditions = [
+            signals[cls.REQUIRED_COLUMNS].isnull().to_numpy().any(axis=1),
+            ~(long | short),
+            long & (stop_loss >= entry),
+            long & (take_profit <= entry),
+            short & (stop_loss <= entry),
+            short & (take_profit >= entry),
+        ]
+        codes = np.select(conditions, np.arange(1, len(conditions) + 1, dtype=np.int8), default=0)
+        reasons = pd.Series(pd.Categorical.from_codes(codes, cls.REASON_CODES), index=signals.index)
+        return pd.Series(codes == 0, index=signals.index), reasons
+    
+    @classmethod
+    def validate_signals(cls, signals: pd.DataFrame) -> tuple[bool, str]:
+        """Validate signal dataframe"""
+        try:
+            valid, reasons = cls.check_rows(signals)
+        except KeyError as e:
+            return False, e.args[0]
+        
+        if valid.all():
+            return True, "All signals valid"
+        
+        if (reasons == cls.NULL_VALUES).any():
+            null_counts = signals[cls.REQUIRED_COLUMNS].isnull().sum()
             return False, f"Null values in signals: {null_counts[null_counts > 0].to_dict()}"
         
-        # Check side values
-        valid_sides = signals["side"].isin([-1, 1]).all()
-        if not valid_sides:
+        if (reasons == cls.INVALID_SIDE).any():
             return False, "Side must be -1 (short) or 1 (long)"
         
-        # Check price relationships
-        for _, signal in signals.iterrows():
-            if signal["side"] == 1:  # Long position
-                if signal["stop_loss"] >= signal["entry"]:
-                    return False, f"Long stop loss must be below entry: {signal}"
-                if signal["take_profit"] <= signal["entry"]:
-                    return False, f"Long take profit must be above entry: {signal}"
-            else:  # Short position
-                if signal["stop_loss"] <= signal["entry"]:
-                    return False, f"Short stop loss must be above entry: {signal}"
-                if signal["take_profit"] >= signal["entry"]:
-                    return False, f"Short take profit must be below entry: {signal}"
-        
-        return True, "All signals valid"
+        first = reasons.index[np.argmax(~valid.to_numpy())]
+        return False, f"{cls.REASON_MESSAGES[reasons[first]]}: {signals.loc[first]}"
+    
+    @classmethod
+    def drop_invalid(cls, signals: pd.DataFrame, source: str = "signals") -> pd.DataFrame:
+        """Drop invalid rows, reporting how many were dropped for each reason"""
+        valid, reasons = cls.check_rows(signals)
+        if valid.all():
+            return signals
+        
+        counts = reasons[~valid].value_counts()
+        counts = counts[counts > 0].to_dict()
+        print(f"Dropped {int((~valid).sum())} invalid signals from {source}: {counts}")
+        return signals[valid]
     
     @staticmethod
     def filter_signals_by_quality(signals: pd.DataFrame, min_confidence: float = 0.5) -> pd.DataFrame:
         """Filter signals by quality metrics"""
+        keep = np.ones(len(signals), dtype=bool)
         if "confidence" in signals.columns:
-            signals = signals[signals["confidence"] >= min_confidence]
+            keep &= (signals["confidence"] >= min_confidence).to_numpy()
         
         # Remove signals with very tight or very wide risk-reward
-        signals["calculated_rr"] = abs(signals["take_profit"] - signals["entry"]) / abs(signals["entry"] - signals["stop_loss"])
-        signals = signals[(signals["calculated_rr"] >= 1.0) & (signals["calculated_rr"] <= 5.0)]
+        entry = signals["entry"].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rr = np.abs(signals["take_profit"].to_numpy(dtype=float) - entry) / np.abs(entry - signals["stop_loss"].to_numpy(dtype=float))
+        keep &= (rr >= 1.0) & (rr <= 5.0)
         
-        return signals.drop("calculated_rr", axis=1)
+        return signals[keep]
 
 class StrategyManager:
     """Manages multiple strategies and combines their signals"""
     
-    def __init__(self):
+    def __init__(self, executor: str = "serial", workers: int = 1):
+        """
+        Every strategy runs on one instrument at a time. executor: "serial"
+        runs the (strategy, instrument) work units in turn; "thread" and
+        "process" fan them out to a pool of `workers`. All three produce the
+        same signals.
+        """
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor {executor!r}, expected one of {EXECUTORS}")
         self.strategies: List[BaseStrategy] = []
         self.validator = SignalValidator()
+        self.executor = executor
+        self.workers = max(1, int(workers))
+        self.timings: Dict[str, float] = {}
     
     def add_strategy(self, strategy: BaseStrategy):
         """Add a strategy to the manager"""
@@ -147,61 +292,101 @@ class StrategyManager:
                 print(f"Strategy not found: {strategy_name}")
                 return pd.DataFrame()
             
-            try:
-                if not target_strategy.validate_data(df):
-                    print(f"Data validation failed for strategy: {target_strategy.name}")
-                    return pd.DataFrame()
-                
-                signals = target_strategy.generate_signals(df)
-                if signals is not None and not signals.empty:
-                    signals = target_strategy.add_signal_metadata(df, signals)
-                    
-                    # Validate signals
-                    is_valid, message = self.validator.validate_signals(signals)
-                    if is_valid:
-                        return self.validator.filter_signals_by_quality(signals)
-                    else:
-                        print(f"Invalid signals from {target_strategy.name}: {message}")
-                
-            except Exception as e:
-                print(f"Error generating signals for {target_strategy.name}: {e}")
-            
-            return pd.DataFrame()
+            return self.generate_all_signals(df, strategies=[target_strategy])
         else:
             return self.generate_all_signals(df)
     
-    def generate_all_signals(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Generate signals from all registered strategies"""
+    def generate_all_signals(self, df: pd.DataFrame, strategies: List[BaseStrategy] = None) -> pd.DataFrame:
+        """Generate signals from all registered strategies (or just `strategies`).
+        
+        Each strategy runs on one instrument at a time, so rolling windows
+        never span two instruments. Signals are merged in stable ts order,
+        ties keeping strategy registration order, then instrument order.
+        Seconds spent in each strategy are left in self.timings.
+        """
+        strategies = self.strategies if strategies is None else strategies
+        self.timings = {strategy.name: 0.0 for strategy in strategies}
+        df = df.sort_values(["instrument", "ts"], kind="stable").reset_index(drop=True)
+        starts, ends = FeatureEngineer.instrument_offsets(df)
+        units = [(strategy, int(start), int(end))
+                 for strategy in strategies for start, end in zip(starts, ends)]
+        
+        if self.executor == "serial":
+            results = [self._run_strategy(strategy, df.iloc[start:end]) for strategy, start, end in units]
+        else:
+            results = self._run_parallel(df, units)
+        
         all_signals = []
+        for strategy, signals, seconds in results:
+            self.timings[strategy.name] += seconds
+            if signals is not None and not signals.empty:
+                all_signals.append(signals)
         
-        for strategy in self.strategies:
-            try:
-                if not strategy.validate_data(df):
-                    print(f"Data validation failed for strategy: {strategy.name}")
-                    continue
-                
-                signals = strategy.generate_signals(df)
-                if signals is not None and not signals.empty:
-                    signals = strategy.add_signal_metadata(df, signals)
-                    
-                    # Validate signals
-                    is_valid, message = self.validator.validate_signals(signals)
-                    if is_valid:
-                        all_signals.append(signals)
-                        print(f"Generated {len(signals)} signals from {strategy.name}")
-                    else:
-                        print(f"Invalid signals from {strategy.name}: {message}")
-                
-            except Exception as e:
-                print(f"Error generating signals for {strategy.name}: {e}")
+        for strategy in strategies:
+            count = sum(len(signals) for s, signals, _ in results if s is strategy and signals is not None)
+            print(f"Generated {count} signals from {strategy.name} in {self.timings[strategy.name]:.2f}s")
         
         if all_signals:
             combined = pd.concat(all_signals, ignore_index=True)
             combined = self.validator.filter_signals_by_quality(combined)
-            return combined.sort_values("ts").reset_index(drop=True)
+            return combined.sort_values("ts", kind="stable").reset_index(drop=True)
         else:
             return pd.DataFrame()
     
+    def run_strategy(self, strategy: BaseStrategy, df: pd.DataFrame) -> pd.DataFrame:
+        """Generate, tag and validate one strategy's signals on df.
+        
+        Raises ValueError when df fails the strategy's data validation;
+        errors raised by the strategy itself propagate.
+        """
+        if not strategy.validate_data(df):
+            raise ValueError("data validation failed")
+        signals = strategy.generate_signals(df)
+        if signals is not None and not signals.empty:
+            signals = strategy.add_signal_metadata(df, signals)
+            signals = self.validator.drop_invalid(signals, strategy.name)
+        return signals
+    
+    def _run_strategy(self, strategy: BaseStrategy, df: pd.DataFrame):
+        """run_strategy for one work unit: failures are reported, not raised"""
+        start = time.perf_counter()
+        try:
+            signals = self.run_strategy(strategy, df)
+        except Exception as e:
+            print(f"Error generating signals for {strategy.name}: {e}")
+            signals = None
+        return strategy, signals, time.perf_counter() - start
+    
+    def _run_parallel(self, df: pd.DataFrame, units):
+        """Run the (strategy, start, end) work units on a pool.
+        
+        Threads get zero-copy row slices of the (instrument, ts) sorted
+        frame. Processes memory-map the same frame from an Arrow IPC file
+        instead of receiving a pickled copy each.
+        """
+        use_threads = self.executor == "thread"
+        if not use_threads and not PYARROW_AVAILABLE:
+            print("pyarrow not installed, running strategies in threads")
+            use_threads = True
+        
+        if use_threads:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(self._run_strategy, strategy, df.iloc[start:end])
+                           for strategy, start, end in units]
+                return [future.result() for future in futures]
+        
+        with tempfile.TemporaryDirectory(dir=IPC_TMP_ROOT) as tmp_dir:
+            input_path = os.path.join(tmp_dir, "features.arrow")
+            write_ipc(pa.Table.from_pandas(df, preserve_index=False), input_path)
+            
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(_run_strategy_unit, strategy, input_path, start, end)
+                           for strategy, start, end in units]
+                # Workers return pickled copies; map them back onto our strategies
+                return [(strategy, signals, seconds)
+                        for (strategy, _, _), (_, signals, seconds)
+                        in zip(units, (future.result() for future in futures))]
+    
     def get_strategy_performance(self) -> Dict:
         """Get performance summary of all strategies"""
         return {
@@ -209,3 +394,9 @@ class StrategyManager:
             "enabled_strategies": [s.name for s in self.strategies if s.enabled],
             "strategy_configs": {s.name: s.params for s in self.strategies}
         }
+
+
+def _run_strategy_unit(strategy, input_path, start, end):
+    """Process-pool worker: run one strategy on rows [start, end) of the shared frame"""
+    df = read_ipc(input_path).slice(start, end - start).to_pandas()
+    return StrategyManager()._run_strategy(strategy, df)
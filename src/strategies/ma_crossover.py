@@ -15,69 +15,52 @@ class MACrossoverStrategy(BaseStrategy):
         # Calculate moving averages
         df = self._calculate_moving_averages(df)
         
-        signals = []
         short_window = self.params.get("short_window", 9)
         long_window = self.params.get("long_window", 21)
         confirmation_periods = self.params.get("confirmation_periods", 2)
         
-        short_ma_col = f"ema_{short_window}"
-        long_ma_col = f"ema_{long_window}"
+        short_ma = df[f"ema_{short_window}"].to_numpy(dtype=float)
+        long_ma = df[f"ema_{long_window}"].to_numpy(dtype=float)
+        n = len(df)
         
-        for i in range(long_window + confirmation_periods, len(df)):
-            current = df.iloc[i]
-            previous = df.iloc[i-1]
-            
-            if pd.isna(current[short_ma_col]) or pd.isna(current[long_ma_col]):
-                continue
-            
-            # Bullish crossover: short MA crosses above long MA
-            if (previous[short_ma_col] <= previous[long_ma_col] and 
-                current[short_ma_col] > current[long_ma_col]):
-                
-                # Confirm the crossover with additional periods
-                if self._confirm_crossover(df, i, short_ma_col, long_ma_col, confirmation_periods, "bullish"):
-                    entry_price = current["close"]
-                    atr = self._get_atr(df, i)
-                    stop_loss = self.calculate_stop_loss(entry_price, 1, atr)
-                    take_profit = self.calculate_take_profit(entry_price, stop_loss, 1)
-                    
-                    signals.append({
-                        "ts": current["ts"],
-                        "instrument": current["instrument"],
-                        "entry": float(entry_price),
-                        "side": 1,
-                        "stop_loss": float(stop_loss),
-                        "take_profit": float(take_profit),
-                        "strategy_type": "MA_CROSSOVER_BULL",
-                        "short_ma": float(current[short_ma_col]),
-                        "long_ma": float(current[long_ma_col]),
-                        "crossover_strength": float(current[short_ma_col] / current[long_ma_col])
-                    })
-            
-            # Bearish crossover: short MA crosses below long MA
-            elif (previous[short_ma_col] >= previous[long_ma_col] and 
-                  current[short_ma_col] < current[long_ma_col]):
-                
-                if self._confirm_crossover(df, i, short_ma_col, long_ma_col, confirmation_periods, "bearish"):
-                    entry_price = current["close"]
-                    atr = self._get_atr(df, i)
-                    stop_loss = self.calculate_stop_loss(entry_price, -1, atr)
-                    take_profit = self.calculate_take_profit(entry_price, stop_loss, -1)
-                    
-                    signals.append({
-                        "ts": current["ts"],
-                        "instrument": current["instrument"],
-                        "entry": float(entry_price),
-                        "side": -1,
-                        "stop_loss": float(stop_loss),
-                        "take_profit": float(take_profit),
-                        "strategy_type": "MA_CROSSOVER_BEAR",
-                        "short_ma": float(current[short_ma_col]),
-                        "long_ma": float(current[long_ma_col]),
-                        "crossover_strength": float(current[short_ma_col] / current[long_ma_col])
-                    })
+        # Crossovers at bar i compare it with bar i-1; NaN averages never cross
+        start = long_window + confirmation_periods
+        above = short_ma > long_ma
+        below = short_ma < long_ma
+        bullish = np.zeros(n, dtype=bool)
+        bearish = np.zeros(n, dtype=bool)
+        bullish[1:] = (short_ma[:-1] <= long_ma[:-1]) & above[1:]
+        bearish[1:] = (short_ma[:-1] >= long_ma[:-1]) & below[1:]
+        bullish[:start] = False
+        bearish[:start] = False
         
-        return pd.DataFrame(signals) if signals else pd.DataFrame()
+        # Confirm with none of the next confirmation_periods bars crossing back
+        bullish &= self._held_for(~(short_ma <= long_ma), confirmation_periods)
+        bearish &= self._held_for(~(short_ma >= long_ma), confirmation_periods)
+        rows = np.flatnonzero(bullish | bearish)
+        
+        side = np.where(bullish[rows], 1, -1)
+        entry = df["close"].to_numpy(dtype=float)[rows]
+        stop_loss = self.calculate_stop_losses(entry, side, self.prior_atr(df)[rows])
+        
+        return self.build_signals(
+            df, rows,
+            entry=entry,
+            side=side,
+            stop_loss=stop_loss,
+            take_profit=self.calculate_take_profits(entry, stop_loss, side),
+            strategy_type=np.where(side == 1, "MA_CROSSOVER_BULL", "MA_CROSSOVER_BEAR"),
+            short_ma=short_ma[rows],
+            long_ma=long_ma[rows],
+            crossover_strength=short_ma[rows] / long_ma[rows],
+        )
+    
+    def required_lookback(self) -> int:
+        # EMAs never fully forget; after 10 spans older bars weigh less than 1e-8
+        return 10 * self.params.get("long_window", 21) + self.params.get("confirmation_periods", 2)
+    
+    def required_lookahead(self) -> int:
+        return self.params.get("confirmation_periods", 2)
     
     def _calculate_moving_averages(self, df):
         """Calculate EMAs for the strategy"""
@@ -88,31 +71,14 @@ class MACrossoverStrategy(BaseStrategy):
         
         return df
     
-    def _confirm_crossover(self, df, idx, short_col, long_col, periods, direction):
-        """Confirm crossover signal with additional periods"""
-        if idx + periods >= len(df):
-            return False
-        
-        for i in range(1, periods + 1):
-            future_row = df.iloc[idx + i]
-            
-            if direction == "bullish":
-                if future_row[short_col] <= future_row[long_col]:
-                    return False
-            else:  # bearish
-                if future_row[short_col] >= future_row[long_col]:
-                    return False
-        
-        return True
-    
-    def _get_atr(self, df, idx, period=14):
-        """Get ATR value at specific index"""
-        if idx < period:
-            return None
-        
-        high_low = df["high"].iloc[idx-period:idx] - df["low"].iloc[idx-period:idx]
-        high_close = np.abs(df["high"].iloc[idx-period:idx] - df["close"].shift(1).iloc[idx-period:idx])
-        low_close = np.abs(df["low"].iloc[idx-period:idx] - df["close"].shift(1).iloc[idx-period:idx])
-        
-        true_ranges = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        return true_ranges.mean()
+    def _held_for(self, condition, periods):
+        """True at bar i when condition holds on each of bars i+1..i+periods
+        (False when fewer than `periods` bars follow)"""
+        n = len(condition)
+        held = np.zeros(n, dtype=bool)
+        if n > periods:
+            # Count of bars where condition is False in each forward window
+            misses = np.concatenate([[0], np.cumsum(~condition)])
+            rows = np.arange(n - periods)
+            held[rows] = misses[rows + periods + 1] - misses[rows + 1] == 0
+        return held
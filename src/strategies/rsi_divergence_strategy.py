@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 from .base import BaseStrategy
 from scipy.signal import find_peaks
+from numpy.lib.stride_tricks import sliding_window_view
 
 class RSIDivergenceStrategy(BaseStrategy):
     """RSI Divergence Strategy - Hidden and Regular Divergences"""
@@ -16,7 +17,6 @@ class RSIDivergenceStrategy(BaseStrategy):
         # Calculate RSI and find peaks/troughs
         df = self._calculate_indicators(df)
         
-        signals = []
         min_periods = self.params.get("min_periods_between_peaks", 10)
         max_periods = self.params.get("max_periods_between_peaks", 50)
         
@@ -25,10 +25,13 @@ class RSIDivergenceStrategy(BaseStrategy):
         rsi_peaks, rsi_troughs = self._find_rsi_extremes(df)
         
         # Look for divergences
-        signals.extend(self._find_bullish_divergences(df, price_troughs, rsi_troughs, min_periods, max_periods))
-        signals.extend(self._find_bearish_divergences(df, price_peaks, rsi_peaks, min_periods, max_periods))
+        signals = [
+            self._find_bullish_divergences(df, price_troughs, rsi_troughs, min_periods, max_periods),
+            self._find_bearish_divergences(df, price_peaks, rsi_peaks, min_periods, max_periods),
+        ]
+        signals = [frame for frame in signals if not frame.empty]
         
-        return pd.DataFrame(signals) if signals else pd.DataFrame()
+        return pd.concat(signals, ignore_index=True) if signals else pd.DataFrame()
     
     def _calculate_indicators(self, df):
         """Calculate RSI and supporting indicators"""
@@ -83,168 +86,183 @@ class RSIDivergenceStrategy(BaseStrategy):
     
     def _find_bullish_divergences(self, df, price_troughs, rsi_troughs, min_periods, max_periods):
         """Find bullish divergences (price makes lower low, RSI makes higher low)"""
-        signals = []
-        
-        for i in range(len(price_troughs) - 1):
-            for j in range(i + 1, len(price_troughs)):
-                p1_idx, p2_idx = price_troughs[i], price_troughs[j]
-                
-                # Check if within acceptable time range
-                if p2_idx - p1_idx < min_periods or p2_idx - p1_idx > max_periods:
-                    continue
-                
-                p1_price = df.iloc[p1_idx]["close"]
-                p2_price = df.iloc[p2_idx]["close"]
-                
-                # Price makes lower low
-                if p2_price >= p1_price:
-                    continue
-                
-                # Find corresponding RSI troughs
-                rsi1_candidates = [idx for idx in rsi_troughs if abs(idx - p1_idx) <= 3]
-                rsi2_candidates = [idx for idx in rsi_troughs if abs(idx - p2_idx) <= 3]
-                
-                if not rsi1_candidates or not rsi2_candidates:
-                    continue
-                
-                rsi1_idx = min(rsi1_candidates, key=lambda x: abs(x - p1_idx))
-                rsi2_idx = min(rsi2_candidates, key=lambda x: abs(x - p2_idx))
-                
-                rsi1_value = df.iloc[rsi1_idx]["rsi"]
-                rsi2_value = df.iloc[rsi2_idx]["rsi"]
-                
-                # RSI makes higher low (divergence)
-                if rsi2_value > rsi1_value:
-                    confidence = self._calculate_divergence_confidence(
-                        df, p1_idx, p2_idx, rsi1_idx, rsi2_idx, "bullish"
-                    )
-                    
-                    if confidence > 0.6:
-                        current = df.iloc[p2_idx]
-                        entry_price = current["close"]
-                        
-                        # Conservative stop below the divergence low
-                        stop_loss = entry_price * (1 - self.params.get("stop_loss_pct", 0.02))
-                        
-                        # Target based on divergence strength
-                        risk = entry_price - stop_loss
-                        take_profit = entry_price + (risk * self.params.get("risk_reward", 2.5))
-                        
-                        signals.append({
-                            "ts": current["ts"],
-                            "instrument": current["instrument"],
-                            "entry": float(entry_price),
-                            "side": 1,
-                            "stop_loss": float(stop_loss),
-                            "take_profit": float(take_profit),
-                            "strategy_type": "RSI_DIV_BULL",
-                            "rsi_value": float(rsi2_value),
-                            "price_low1": float(p1_price),
-                            "price_low2": float(p2_price),
-                            "rsi_low1": float(rsi1_value),
-                            "rsi_low2": float(rsi2_value),
-                            "divergence_strength": float((rsi2_value - rsi1_value) / (p1_price - p2_price)),
-                            "confidence": float(confidence)
-                        })
-        
-        return signals
+        p1_idx, p2_idx, rsi1_idx, rsi2_idx = self._pair_extremes(
+            df, price_troughs, rsi_troughs, min_periods, max_periods, "bullish")
+        
+        close = df["close"].to_numpy(dtype=float)
+        rsi = df["rsi"].to_numpy(dtype=float)
+        p1_price, p2_price = close[p1_idx], close[p2_idx]
+        rsi1_value, rsi2_value = rsi[rsi1_idx], rsi[rsi2_idx]
+        
+        confidence = self._calculate_divergence_confidence(
+            df, p1_idx, p2_idx, rsi1_idx, rsi2_idx, "bullish"
+        )
+        keep = confidence > 0.6
+        
+        entry_price = p2_price[keep]
+        # Conservative stop below the divergence low
+        stop_loss = entry_price * (1 - self.params.get("stop_loss_pct", 0.02))
+        # Target based on divergence strength
+        risk = entry_price - stop_loss
+        take_profit = entry_price + (risk * self.params.get("risk_reward", 2.5))
+        
+        return self.build_signals(
+            df, p2_idx[keep],
+            entry=entry_price,
+            side=np.ones(len(entry_price), dtype=np.int64),
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+            strategy_type="RSI_DIV_BULL",
+            rsi_value=rsi2_value[keep],
+            price_low1=p1_price[keep],
+            price_low2=entry_price,
+            rsi_low1=rsi1_value[keep],
+            rsi_low2=rsi2_value[keep],
+            divergence_strength=(rsi2_value - rsi1_value)[keep] / (p1_price - p2_price)[keep],
+            confidence=confidence[keep],
+        )
     
     def _find_bearish_divergences(self, df, price_peaks, rsi_peaks, min_periods, max_periods):
         """Find bearish divergences (price makes higher high, RSI makes lower high)"""
-        signals = []
-        
-        for i in range(len(price_peaks) - 1):
-            for j in range(i + 1, len(price_peaks)):
-                p1_idx, p2_idx = price_peaks[i], price_peaks[j]
-                
-                # Check if within acceptable time range
-                if p2_idx - p1_idx < min_periods or p2_idx - p1_idx > max_periods:
-                    continue
-                
-                p1_price = df.iloc[p1_idx]["close"]
-                p2_price = df.iloc[p2_idx]["close"]
-                
-                # Price makes higher high
-                if p2_price <= p1_price:
-                    continue
-                
-                # Find corresponding RSI peaks
-                rsi1_candidates = [idx for idx in rsi_peaks if abs(idx - p1_idx) <= 3]
-                rsi2_candidates = [idx for idx in rsi_peaks if abs(idx - p2_idx) <= 3]
-                
-                if not rsi1_candidates or not rsi2_candidates:
-                    continue
-                
-                rsi1_idx = min(rsi1_candidates, key=lambda x: abs(x - p1_idx))
-                rsi2_idx = min(rsi2_candidates, key=lambda x: abs(x - p2_idx))
-                
-                rsi1_value = df.iloc[rsi1_idx]["rsi"]
-                rsi2_value = df.iloc[rsi2_idx]["rsi"]
-                
-                # RSI makes lower high (divergence)
-                if rsi2_value < rsi1_value:
-                    confidence = self._calculate_divergence_confidence(
-                        df, p1_idx, p2_idx, rsi1_idx, rsi2_idx, "bearish"
-                    )
-                    
-                    if confidence > 0.6:
-                        current = df.iloc[p2_idx]
-                        entry_price = current["close"]
-                        
-                        # Conservative stop above the divergence high
-                        stop_loss = entry_price * (1 + self.params.get("stop_loss_pct", 0.02))
-                        
-                        # Target based on divergence strength
-                        risk = stop_loss - entry_price
-                        take_profit = entry_price - (risk * self.params.get("risk_reward", 2.5))
-                        
-                        signals.append({
-                            "ts": current["ts"],
-                            "instrument": current["instrument"],
-                            "entry": float(entry_price),
-                            "side": -1,
-                            "stop_loss": float(stop_loss),
-                            "take_profit": float(take_profit),
-                            "strategy_type": "RSI_DIV_BEAR",
-                            "rsi_value": float(rsi2_value),
-                            "price_high1": float(p1_price),
-                            "price_high2": float(p2_price),
-                            "rsi_high1": float(rsi1_value),
-                            "rsi_high2": float(rsi2_value),
-                            "divergence_strength": float((rsi1_value - rsi2_value) / (p2_price - p1_price)),
-                            "confidence": float(confidence)
-                        })
-        
-        return signals
+        p1_idx, p2_idx, rsi1_idx, rsi2_idx = self._pair_extremes(
+            df, price_peaks, rsi_peaks, min_periods, max_periods, "bearish")
+        
+        close = df["close"].to_numpy(dtype=float)
+        rsi = df["rsi"].to_numpy(dtype=float)
+        p1_price, p2_price = close[p1_idx], close[p2_idx]
+        rsi1_value, rsi2_value = rsi[rsi1_idx], rsi[rsi2_idx]
+        
+        confidence = self._calculate_divergence_confidence(
+            df, p1_idx, p2_idx, rsi1_idx, rsi2_idx, "bearish"
+        )
+        keep = confidence > 0.6
+        
+        entry_price = p2_price[keep]
+        # Conservative stop above the divergence high
+        stop_loss = entry_price * (1 + self.params.get("stop_loss_pct", 0.02))
+        # Target based on divergence strength
+        risk = stop_loss - entry_price
+        take_profit = entry_price - (risk * self.params.get("risk_reward", 2.5))
+        
+        return self.build_signals(
+            df, p2_idx[keep],
+            entry=entry_price,
+            side=-np.ones(len(entry_price), dtype=np.int64),
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+            strategy_type="RSI_DIV_BEAR",
+            rsi_value=rsi2_value[keep],
+            price_high1=p1_price[keep],
+            price_high2=entry_price,
+            rsi_high1=rsi1_value[keep],
+            rsi_high2=rsi2_value[keep],
+            divergence_strength=(rsi1_value - rsi2_value)[keep] / (p2_price - p1_price)[keep],
+            confidence=confidence[keep],
+        )
+    
+    def _pair_extremes(self, df, price_extremes, rsi_extremes, min_periods, max_periods, direction):
+        """Pairs of price extremes min_periods..max_periods bars apart that
+        diverge from their matching RSI extremes.
+        
+        Returns (p1_idx, p2_idx, rsi1_idx, rsi2_idx) arrays ordered by first
+        then second extreme. Both extreme lists are sorted, so the partners
+        of each extreme form one contiguous range found with searchsorted.
+        """
+        price_extremes = np.asarray(price_extremes, dtype=np.int64)
+        
+        # Every pair (i, j), i < j, whose gap lies within [min_periods, max_periods]
+        lo = np.searchsorted(price_extremes, price_extremes + min_periods, side="left")
+        hi = np.searchsorted(price_extremes, price_extremes + max_periods, side="right")
+        lo = np.maximum(lo, np.arange(len(price_extremes)) + 1)
+        counts = np.maximum(hi - lo, 0)
+        first = np.repeat(np.arange(len(price_extremes)), counts)
+        second = np.repeat(lo, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        p1_idx, p2_idx = price_extremes[first], price_extremes[second]
+        
+        # Price makes a lower low (bullish) or a higher high (bearish)
+        close = df["close"].to_numpy(dtype=float)
+        if direction == "bullish":
+            keep = close[p2_idx] < close[p1_idx]
+        else:
+            keep = close[p2_idx] > close[p1_idx]
+        
+        # Corresponding RSI extremes; pairs missing either one are dropped
+        matched = self._nearest_extreme(price_extremes, rsi_extremes)
+        rsi1_idx, rsi2_idx = matched[first], matched[second]
+        keep &= (rsi1_idx >= 0) & (rsi2_idx >= 0)
+        
+        # RSI makes a higher low (bullish) or a lower high (bearish)
+        rsi = df["rsi"].to_numpy(dtype=float)
+        if direction == "bullish":
+            keep &= rsi[rsi2_idx] > rsi[rsi1_idx]
+        else:
+            keep &= rsi[rsi2_idx] < rsi[rsi1_idx]
+        
+        return p1_idx[keep], p2_idx[keep], rsi1_idx[keep], rsi2_idx[keep]
+    
+    def _nearest_extreme(self, price_extremes, rsi_extremes, tolerance=3):
+        """Closest RSI extreme within `tolerance` bars of each price extreme
+        (the earlier one on ties), or -1 when there is none"""
+        rsi_extremes = np.asarray(rsi_extremes, dtype=np.int64)
+        matched = np.full(len(price_extremes), -1, dtype=np.int64)
+        if len(rsi_extremes) == 0:
+            return matched
+        
+        # The nearest extreme is the last one before the price extreme or the first at/after it
+        right = np.searchsorted(rsi_extremes, price_extremes, side="left")
+        left = right - 1
+        left_dist = np.where(left >= 0, price_extremes - rsi_extremes[np.maximum(left, 0)], np.iinfo(np.int64).max)
+        right_dist = np.where(right < len(rsi_extremes),
+                              rsi_extremes[np.minimum(right, len(rsi_extremes) - 1)] - price_extremes,
+                              np.iinfo(np.int64).max)
+        
+        use_left = left_dist <= right_dist
+        nearest = np.where(use_left, left, right)
+        within = np.where(use_left, left_dist, right_dist) <= tolerance
+        matched[within] = rsi_extremes[nearest[within]]
+        return matched
     
     def _calculate_divergence_confidence(self, df, p1_idx, p2_idx, rsi1_idx, rsi2_idx, direction):
-        """Calculate divergence signal confidence"""
+        """Calculate divergence signal confidence for arrays of divergences"""
         base_confidence = 0.6
+        rsi = df["rsi"].to_numpy(dtype=float)
         
         # Time factor (divergences over longer periods are more reliable)
         time_span = p2_idx - p1_idx
-        time_factor = min((time_span - 10) / 40 * 0.15, 0.15)
+        time_factor = np.minimum((time_span - 10) / 40 * 0.15, 0.15)
         
         # RSI level factor (divergences at extremes are more reliable)
-        rsi2_value = df.iloc[rsi2_idx]["rsi"]
+        rsi2_value = rsi[rsi2_idx]
         if direction == "bullish":
-            rsi_factor = max(0, (35 - rsi2_value) / 35 * 0.1)
+            rsi_factor = np.maximum(0, (35 - rsi2_value) / 35 * 0.1)
         else:
-            rsi_factor = max(0, (rsi2_value - 65) / 35 * 0.1)
+            rsi_factor = np.maximum(0, (rsi2_value - 65) / 35 * 0.1)
         
-        # Volume confirmation
-        volume1 = df.iloc[p1_idx]["volume"]
-        volume2 = df.iloc[p2_idx]["volume"]
-        avg_volume = df.iloc[max(0, p2_idx-20):p2_idx]["volume"].mean()
-        
-        volume_factor = 0.05 if volume2 > avg_volume else 0.0
+        # Volume confirmation against the average of the 20 bars before the second extreme
+        volume = df["volume"].to_numpy(dtype=float)
+        avg_volume = self._trailing_mean(volume, p2_idx, 20)
+        volume_factor = np.where(volume[p2_idx] > avg_volume, 0.05, 0.0)
         
         # Divergence clarity (how clear the divergence is)
-        price_change = abs(df.iloc[p2_idx]["close"] - df.iloc[p1_idx]["close"])
-        rsi_change = abs(df.iloc[rsi2_idx]["rsi"] - df.iloc[rsi1_idx]["rsi"])
-        clarity_factor = min(rsi_change / 10 * 0.1, 0.1)
+        rsi_change = np.abs(rsi2_value - rsi[rsi1_idx])
+        clarity_factor = np.minimum(rsi_change / 10 * 0.1, 0.1)
         
         total_confidence = (base_confidence + time_factor + rsi_factor + 
                           volume_factor + clarity_factor)
         
-        return min(0.95, total_confidence)
+        return np.minimum(0.95, total_confidence)
+    
+    def _trailing_mean(self, values, idx, window):
+        """NaN-skipping mean of values[max(0, i - window):i] for each i in idx,
+        summed the way Series.mean does"""
+        means = np.full(len(idx), np.nan)
+        full = idx >= window
+        if full.any():
+            windows = sliding_window_view(values, window)[idx[full] - window]
+            nan = np.isnan(windows)
+            means[full] = np.where(nan, 0, windows).sum(axis=1) / (~nan).sum(axis=1)
+        for k in np.flatnonzero(~full & (idx > 0)):
+            head = values[:idx[k]]
+            head = head[~np.isnan(head)]
+            means[k] = head.sum() / len(head) if len(head) else np.nan
+        return means
@@ -15,78 +15,50 @@ class VWAPRevertStrategy(BaseStrategy):
         # Calculate VWAP and supporting indicators
         df = self._calculate_indicators(df)
         
-        signals = []
         vwap_window = self.params.get("vwap_window", 60)
         band_pct = self.params.get("band_pct", 0.01)  # 1%
         rsi_threshold = self.params.get("rsi_threshold", 35)
         min_volume_ratio = self.params.get("min_volume_ratio", 1.2)
         
-        for i in range(vwap_window, len(df)):
-            current = df.iloc[i]
-            
-            if pd.isna(current["vwap"]) or pd.isna(current["rsi"]):
-                continue
-            
-            close_price = current["close"]
-            vwap_value = current["vwap"]
-            rsi_value = current["rsi"]
-            volume_ratio = current["volume_ratio"]
-            
-            # Long signal: Price below VWAP band + oversold RSI + volume confirmation
-            if (close_price < vwap_value * (1 - band_pct) and
-                rsi_value < rsi_threshold and
-                volume_ratio > min_volume_ratio):
-                
-                confidence = self._calculate_revert_confidence(df, i, "bullish")
-                if confidence > 0.6:  # Minimum confidence threshold
-                    
-                    entry_price = close_price
-                    # Wider stop for mean reversion
-                    stop_loss = entry_price * (1 - self.params.get("stop_loss_pct", 0.015))
-                    # Target back to VWAP or above
-                    take_profit = vwap_value * (1 + self.params.get("target_pct", 0.008))
-                    
-                    signals.append({
-                        "ts": current["ts"],
-                        "instrument": current["instrument"],
-                        "entry": float(entry_price),
-                        "side": 1,
-                        "stop_loss": float(stop_loss),
-                        "take_profit": float(take_profit),
-                        "strategy_type": "VWAP_REVERT_BULL",
-                        "vwap_value": float(vwap_value),
-                        "rsi_value": float(rsi_value),
-                        "deviation_pct": float((vwap_value - close_price) / close_price * 100),
-                        "confidence": float(confidence)
-                    })
-            
-            # Short signal: Price above VWAP band + overbought RSI + volume confirmation
-            elif (close_price > vwap_value * (1 + band_pct) and
-                  rsi_value > (100 - rsi_threshold) and
-                  volume_ratio > min_volume_ratio):
-                
-                confidence = self._calculate_revert_confidence(df, i, "bearish")
-                if confidence > 0.6:
-                    
-                    entry_price = close_price
-                    stop_loss = entry_price * (1 + self.params.get("stop_loss_pct", 0.015))
-                    take_profit = vwap_value * (1 - self.params.get("target_pct", 0.008))
-                    
-                    signals.append({
-                        "ts": current["ts"],
-                        "instrument": current["instrument"],
-                        "entry": float(entry_price),
-                        "side": -1,
-                        "stop_loss": float(stop_loss),
-                        "take_profit": float(take_profit),
-                        "strategy_type": "VWAP_REVERT_BEAR",
-                        "vwap_value": float(vwap_value),
-                        "rsi_value": float(rsi_value),
-                        "deviation_pct": float((close_price - vwap_value) / close_price * 100),
-                        "confidence": float(confidence)
-                    })
-        
-        return pd.DataFrame(signals) if signals else pd.DataFrame()
+        close = df["close"].to_numpy(dtype=float)
+        vwap = df["vwap"].to_numpy(dtype=float)
+        rsi = df["rsi"].to_numpy(dtype=float)
+        volume_ratio = df["volume_ratio"].to_numpy(dtype=float)
+        
+        # Long: price below VWAP band + oversold RSI + volume confirmation;
+        # short: above the band + overbought RSI + volume confirmation
+        long_mask = ((close < vwap * (1 - band_pct)) &
+                     (rsi < rsi_threshold) &
+                     (volume_ratio > min_volume_ratio))
+        short_mask = (~long_mask &
+                      (close > vwap * (1 + band_pct)) &
+                      (rsi > (100 - rsi_threshold)) &
+                      (volume_ratio > min_volume_ratio))
+        long_mask[:vwap_window] = False
+        short_mask[:vwap_window] = False
+        
+        confidence = self._calculate_revert_confidence(df, long_mask)
+        rows = np.flatnonzero((long_mask | short_mask) & (confidence > 0.6))  # Minimum confidence threshold
+        
+        side = np.where(long_mask[rows], 1, -1)
+        entry = close[rows]
+        vwap_value = vwap[rows]
+        stop_loss_pct = self.params.get("stop_loss_pct", 0.015)
+        target_pct = self.params.get("target_pct", 0.008)
+        
+        return self.build_signals(
+            df, rows,
+            entry=entry,
+            side=side,
+            # Wider stop for mean reversion, target back to VWAP or beyond
+            stop_loss=np.where(side == 1, entry * (1 - stop_loss_pct), entry * (1 + stop_loss_pct)),
+            take_profit=np.where(side == 1, vwap_value * (1 + target_pct), vwap_value * (1 - target_pct)),
+            strategy_type=np.where(side == 1, "VWAP_REVERT_BULL", "VWAP_REVERT_BEAR"),
+            vwap_value=vwap_value,
+            rsi_value=rsi[rows],
+            deviation_pct=np.where(side == 1, (vwap_value - entry) / entry * 100, (entry - vwap_value) / entry * 100),
+            confidence=confidence[rows],
+        )
     
     def _calculate_indicators(self, df):
         """Calculate VWAP and supporting indicators"""
@@ -125,28 +97,28 @@ class VWAPRevertStrategy(BaseStrategy):
         rs = gain / (loss + 1e-10)
         return 100 - (100 / (1 + rs))
     
-    def _calculate_revert_confidence(self, df, index, direction):
-        """Calculate mean reversion confidence"""
-        current = df.iloc[index]
+    def _calculate_revert_confidence(self, df, bullish):
+        """Mean reversion confidence for every bar; bullish marks bars scored as longs"""
+        close = df["close"].to_numpy(dtype=float)
+        vwap = df["vwap"].to_numpy(dtype=float)
+        rsi = df["rsi"].to_numpy(dtype=float)
         
         base_confidence = 0.6
         
         # Deviation factor (more extreme = higher confidence)
-        vwap_dev = abs(current["close"] - current["vwap"]) / current["vwap"]
-        dev_factor = min(vwap_dev * 20, 0.2)  # Cap at 0.2
+        vwap_dev = np.abs(close - vwap) / vwap
+        dev_factor = np.minimum(vwap_dev * 20, 0.2)  # Cap at 0.2
         
         # RSI extremity factor
-        rsi = current["rsi"]
-        if direction == "bullish":
-            rsi_factor = max(0, (30 - rsi) / 30 * 0.15)
-        else:
-            rsi_factor = max(0, (rsi - 70) / 30 * 0.15)
+        rsi_factor = np.where(bullish,
+                              np.maximum(0, (30 - rsi) / 30 * 0.15),
+                              np.maximum(0, (rsi - 70) / 30 * 0.15))
         
         # Volume confirmation factor
-        volume_factor = min((current["volume_ratio"] - 1) * 0.1, 0.1)
+        volume_factor = np.minimum((df["volume_ratio"].to_numpy(dtype=float) - 1) * 0.1, 0.1)
         
         # Momentum divergence (price moving away from VWAP while momentum slowing)
-        momentum_factor = 0.05 if abs(current["momentum"]) < 0.01 else 0.0
+        momentum_factor = np.where(np.abs(df["momentum"].to_numpy(dtype=float)) < 0.01, 0.05, 0.0)
         
         # Market session factor (VWAP works better in active sessions)
         session_factor = 0.05  # Simplified
@@ -154,4 +126,4 @@ class VWAPRevertStrategy(BaseStrategy):
         total_confidence = (base_confidence + dev_factor + rsi_factor + 
                           volume_factor + momentum_factor + session_factor)
         
-        return min(0.95, total_confidence)
+        return np.minimum(0.95, total_confidence)
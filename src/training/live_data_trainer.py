@@ -19,7 +19,9 @@ import json
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from features.build_features import FeatureEngineer
+from features.feature_store import FeatureStore
 from strategies.base import StrategyManager
+from services.model_registry import model_registry
 from models.advanced_models import LSTMTradingModel, TransformerTradingModel, AdvancedTradingModelTrainer
 
 try:
@@ -39,6 +41,9 @@ class LiveDataTrainer:
     
     def __init__(self):
         self.feature_engineer = FeatureEngineer()
+        # predict_action gets sliding windows of recent bars, which never extend a
+        # cached series; keep them in memory rather than writing a file per call
+        self.feature_store = FeatureStore(feature_engineer=self.feature_engineer, persist=False)
         self.strategy_manager = StrategyManager()
         self.logger = self._setup_logging()
         
@@ -442,8 +447,8 @@ class LiveDataTrainer:
             return {'action': 'hold', 'confidence': 0.0, 'reason': 'No trained model'}
         
         try:
-            # Generate features
-            features_data = self.feature_engineer.build_all_features(current_data)
+            # Generate features (cached across calls on the same or extended data)
+            features_data = self.feature_store.get_features(current_data)
             
             if features_data.empty:
                 return {'action': 'hold', 'confidence': 0.0, 'reason': 'Feature generation failed'}
@@ -454,8 +459,7 @@ class LiveDataTrainer:
             # Load metadata to get feature columns
             metadata_path = f"models/live_trained/{instrument}_metadata.json"
             if os.path.exists(metadata_path):
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
+                metadata = model_registry.load_json(metadata_path)  # cached until rewritten
                 feature_columns = metadata['feature_columns']
             else:
                 # Fallback: use all numeric columns except metadata
@@ -473,11 +477,17 @@ class LiveDataTrainer:
                 model = model_info['model']
                 
                 try:
-                    pred = model.predict(X)[0]
-                    if hasattr(model, 'predict_proba'):
-                        confidence = np.max(model.predict_proba(X)[0])
+                    if hasattr(model, 'predict_proba') and hasattr(model, 'classes_'):
+                        # One call gives both the class and its probability
+                        proba = model.predict_proba(X)[0]
+                        pred = model.classes_[np.argmax(proba)]
+                        confidence = np.max(proba)
                     else:
-                        confidence = 0.7  # Default confidence
+                        pred = model.predict(X)[0]
+                        if hasattr(model, 'predict_proba'):
+                            confidence = np.max(model.predict_proba(X)[0])
+                        else:
+                            confidence = 0.7  # Default confidence
                     
                     predictions.append(pred)
                     confidences.append(confidence)
@@ -8,6 +8,7 @@ and places trades based on AI signals.
 """
 
 import os
+import sys
 import time
 import json
 import logging
@@ -16,6 +17,9 @@ import sqlite3
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 
+# Add the parent directory to Python path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
 # Global instance for easy import will be created at the end of the file
 
 class FixedContinuousTradingEngine:
@@ -643,27 +647,27 @@ class FixedContinuousTradingEngine:
             # Enhanced model loading with extreme market handling
             self.logger.info("Loading AI model")
             
+            # Loads go through the shared registry cache
+            from services.model_registry import model_registry
+            
             # Try to load the auto-learning model first
             auto_learning_path = 'models/auto_learning_model.joblib'
             if os.path.exists(auto_learning_path):
-                import joblib
-                self.ai_model = joblib.load(auto_learning_path)
+                self.ai_model = model_registry.load(auto_learning_path)
                 self.logger.info(f"Loaded auto-learning model with {self.ai_model['accuracy']:.2%} accuracy")
                 return True
             
             # Try to load the optimized model
             optimized_path = 'models/optimized_80_percent_model.joblib'
             if os.path.exists(optimized_path):
-                import joblib
-                self.ai_model = joblib.load(optimized_path)
+                self.ai_model = model_registry.load(optimized_path)
                 self.logger.info(f"Loaded optimized model with {self.ai_model.get('accuracy', 0.8):.2%} accuracy")
                 return True
             
             # Try to load the real trading model
             real_path = 'models/real_trading_model.joblib'
             if os.path.exists(real_path):
-                import joblib
-                self.ai_model = joblib.load(real_path)
+                self.ai_model = model_registry.load(real_path)
                 self.logger.info(f"Loaded real trading model")
                 return True
             
@@ -671,9 +675,8 @@ class FixedContinuousTradingEngine:
             if os.path.exists('models'):
                 for file in os.listdir('models'):
                     if file.endswith('.joblib') or file.endswith('.pkl'):
-                        import joblib
                         model_path = os.path.join('models', file)
-                        self.ai_model = joblib.load(model_path)
+                        self.ai_model = model_registry.load(model_path)
                         self.logger.info(f"Loaded model from {model_path}")
                         return True
             